@@ -0,0 +1,260 @@
+"""
+Асинхронный интерфейс к services для приложений на asyncio (киоск, веб-сервер).
+
+Каждая открытая функция services доступна здесь как корутина с тем же именем
+и параметрами, функции iter_* - как асинхронные итераторы:
+
+    artworks = await aservices.get_artworks()
+    await aservices.sell_artwork(artwork_id, "Покупатель", 1200.0)
+    async for artwork in aservices.iter_artworks():
+        ...
+
+Сами функции выполняются в потоках, а не в цикле событий:
+- изменения - в одном потоке записи по очереди: SQLite допускает одного
+  писателя, и очередь избавляет от ожидания блокировки в busy_timeout;
+- чтения - в пуле из READ_WORKERS потоков. В режиме WAL читатели не ждут
+  писателя, поэтому чтения не стоят в очереди за изменениями.
+Пул соединений (database) выдает потоку соединение, которым тот пользовался
+последним, так что у каждого потока свое соединение, пока READ_WORKERS + 1 не
+превышает POOL_MAX_SIZE.
+
+Очереди ограничены (MAX_PENDING_WRITES, MAX_PENDING_READS на цикл событий):
+когда очередь заполнена, вызов ждет места не дольше QUEUE_TIMEOUT секунд, после
+чего выбрасывается QueueFullError. Отмена задачи снимает с очереди еще не
+начатый вызов, а у выполняющегося прерывает запрос SQLite: транзакция изменения
+откатывается целиком, если не успела зафиксироваться.
+
+Несколько изменений одной транзакцией выполняет in_session; параметр session
+функций services здесь не принимается. Функции без обращения к базе
+(LOCAL_FUNCTIONS) доступны как есть.
+"""
+
+import asyncio
+import functools
+import inspect
+import itertools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import services
+from services import ArtGalleryError, GallerySession, ValidationError
+
+# Потоков чтения (у каждого свое соединение из пула)
+READ_WORKERS = 4
+# Вызовов в очереди и в работе на один цикл событий
+MAX_PENDING_WRITES = 64
+MAX_PENDING_READS = 256
+# Секунд ожидания места в заполненной очереди
+QUEUE_TIMEOUT = 30.0
+# Строк, передаваемых асинхронному итератору за одно обращение к потоку
+ITER_CHUNK_SIZE = 1000
+
+# Функции services, изменяющие базу: выполняются в потоке записи
+WRITE_FUNCTIONS = frozenset({
+    "acquire_artwork", "acquire_artworks_batch", "record_restoration_state", "update_artwork_price",
+    "add_document", "record_movement", "sell_artwork", "rent_artwork", "register_visitor",
+    "add_visitor_review", "add_press_review", "add_restoration_material", "add_material",
+    "add_artwork_to_exhibition", "create_exhibition", "update_artwork_status", "add_artist",
+    "update_artist", "delete_artist", "delete_artwork", "rebuild_financial_summaries",
+})
+# Функции services без обращения к базе: вызываются напрямую, без потоков
+LOCAL_FUNCTIONS = frozenset({
+    "validate_artwork_data", "validate_artwork_price", "validate_artist_data", "validate_visitor_data",
+    "validate_movement_data", "detect_file_format", "parse_period",
+})
+
+
+class QueueFullError(ArtGalleryError):
+    """Очередь вызовов остается заполненной дольше QUEUE_TIMEOUT"""
+    pass
+
+
+class _Job:
+    """Вызов в потоке исполнителя; cancel прерывает его запросы к базе"""
+
+    __slots__ = ("func", "args", "kwargs", "thread_id", "cancelled", "lock")
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.thread_id = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def run(self):
+        with self.lock:
+            if self.cancelled:
+                raise asyncio.CancelledError()
+            self.thread_id = threading.get_ident()
+        try:
+            return self.func(*self.args, **self.kwargs)
+        finally:
+            # Под блокировкой: после выхода поток может взять следующий вызов,
+            # и cancel не должен прервать уже его
+            with self.lock:
+                self.thread_id = None
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            if self.thread_id is not None:
+                database.get_pool().interrupt(self.thread_id)
+
+
+class _Lane:
+    """Потоки исполнителя и ограничения очереди для каждого цикла событий"""
+
+    def __init__(self, name, workers, limit):
+        self.name = name
+        self._workers = workers
+        self._limit = limit
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = weakref.WeakKeyDictionary()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers(),
+                                                    thread_name_prefix=f"gallery-{self.name}")
+            return self._executor
+
+    def slots(self, loop):
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self._limit())
+        return slots
+
+    def shutdown(self, wait):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_writer = _Lane("writer", lambda: 1, lambda: MAX_PENDING_WRITES)
+_readers = _Lane("reader", lambda: READ_WORKERS, lambda: MAX_PENDING_READS)
+
+
+def _release(loop, slots):
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        pass  # Цикл событий уже закрыт
+
+
+async def _submit(lane, func, args, kwargs):
+    loop = asyncio.get_running_loop()
+    slots = lane.slots(loop)
+    if slots.locked():
+        try:
+            await asyncio.wait_for(slots.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise QueueFullError(f"Очередь {lane.name} заполнена дольше {QUEUE_TIMEOUT} с") from None
+    else:
+        await slots.acquire()
+
+    job = _Job(func, args, kwargs)
+    try:
+        future = lane.executor().submit(job.run)
+    except BaseException:
+        slots.release()
+        raise
+    # Место в очереди освобождается, когда поток закончил вызов, а не когда задачу отменили
+    future.add_done_callback(lambda _: _release(loop, slots))
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        job.cancel()
+        raise
+
+
+async def run_read(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) в потоке чтения"""
+    return await _submit(_readers, func, args, kwargs)
+
+
+async def run_write(func, *args, **kwargs):
+    """Выполняет func(*args, **kwargs) в потоке записи, по очереди с другими изменениями"""
+    return await _submit(_writer, func, args, kwargs)
+
+
+async def in_session(work, *args, **kwargs):
+    """Выполняет work(session, *args, **kwargs) в потоке записи в одной GallerySession:
+    все изменения фиксируются одной транзакцией, при исключении откатываются"""
+    def run():
+        with GallerySession() as session:
+            return work(session, *args, **kwargs)
+
+    return await run_write(run)
+
+
+def shutdown(wait=True):
+    """Останавливает потоки; не начатые вызовы отменяются. Следующий вызов
+    создаст потоки заново"""
+    _writer.shutdown(wait)
+    _readers.shutdown(wait)
+
+
+def _check_session(kwargs):
+    if kwargs.get("session") is not None:
+        raise ValidationError("В aservices изменения в сессии выполняются через in_session")
+
+
+def _wrap_call(func, run):
+    @functools.wraps(func)
+    async def call(*args, **kwargs):
+        _check_session(kwargs)
+        return await run(func, *args, **kwargs)
+
+    return call
+
+
+def _wrap_iterator(func):
+    @functools.wraps(func)
+    async def iterate(*args, **kwargs):
+        rows = await run_read(func, *args, **kwargs)
+        lock = threading.Lock()
+
+        def take():
+            with lock:
+                return list(itertools.islice(rows, ITER_CHUNK_SIZE))
+
+        def close():
+            with lock:
+                rows.close()
+
+        try:
+            while True:
+                chunk = await run_read(take)
+                if not chunk:
+                    return
+                for row in chunk:
+                    yield row
+        finally:
+            # Возвращает соединение в пул, когда перебор прерван; если порция
+            # еще читается в другом потоке, закрытие дождется ее окончания
+            _readers.executor().submit(close)
+
+    return iterate
+
+
+def _public_functions():
+    return [(name, value) for name, value in vars(services).items()
+            if inspect.isfunction(value) and value.__module__ == services.__name__
+            and not name.startswith("_")]
+
+
+__all__ = ["QueueFullError", "run_read", "run_write", "in_session", "shutdown"]
+for _name, _func in _public_functions():
+    if _name in LOCAL_FUNCTIONS:
+        globals()[_name] = _func
+    elif _name.startswith("iter_"):
+        globals()[_name] = _wrap_iterator(_func)
+    else:
+        globals()[_name] = _wrap_call(_func, run_write if _name in WRITE_FUNCTIONS else run_read)
+    __all__.append(_name)
+del _name, _func
@@ -0,0 +1,649 @@
+"""
+Замеры производительности базы данных картинной галереи.
+
+Запуск:
+    python benchmarks.py indexes --rows 1000000
+    python benchmarks.py stream --rows 1000000
+    python benchmarks.py export --rows 10000000
+    python benchmarks.py acquire --rows 20000
+    python benchmarks.py search --rows 1000000
+    python benchmarks.py reports --rows 10000000 --workers 1,2,4,8
+    python benchmarks.py models --count 1000000
+    python benchmarks.py frame --rows 5000000
+    python benchmarks.py session --workflows 200
+    python benchmarks.py group-commit --writes 5000 --producers 8
+    python benchmarks.py compare baseline.json benchmark_results.json
+
+Замеры всех функций services.py на разных объемах данных - в test_benchmarks.py.
+"""
+
+import argparse
+import collections
+import contextlib
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import frames
+import reports
+import services
+from models import Artwork
+
+
+def _timeit(func, repeat):
+    """Среднее время одного вызова func в миллисекундах"""
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def measure(func, repeat, warmup=1):
+    """Задержки вызовов func(i) для i в range(repeat): среднее, перцентили (мс)
+    и пропускная способность (вызовов в секунду)"""
+    for i in range(warmup):
+        func(i)
+    latencies = []
+    for i in range(warmup, warmup + repeat):
+        start = time.perf_counter()
+        func(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "repeat": repeat,
+        "mean_ms": total / repeat,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "max_ms": latencies[-1],
+        "ops_per_s": repeat * 1000 / total if total else float("inf"),
+    }
+
+
+def _percentile(sorted_values, fraction):
+    """Перцентиль с линейной интерполяцией между соседними значениями"""
+    position = (len(sorted_values) - 1) * fraction
+    low, high = math.floor(position), math.ceil(position)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def save_results(path, results):
+    """Сохраняет результаты замеров вместе с описанием окружения"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "results": results,
+        }, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare_results(baseline, current, metric="p50_ms", threshold=0.2):
+    """Сравнивает замеры с сохраненной базовой линией.
+
+    Возвращает строки {"name", "baseline", "current", "change", "regression"}
+    для замеров, присутствующих в обоих наборах; regression - значение
+    метрики выросло больше чем на threshold (0.2 = 20%).
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name][metric], current[name][metric]
+        change = (after - before) / before if before else 0.0
+        rows.append({"name": name, "baseline": before, "current": after,
+                     "change": change, "regression": change > threshold})
+    return rows
+
+
+@contextlib.contextmanager
+def _temporary_database(name):
+    """Переключает database на новый файл во временном каталоге на время блока with.
+
+    По выходе закрывает пул, удаляет каталог и возвращает прежнее значение
+    database.DATABASE, в том числе при исключении.
+    """
+    directory = tempfile.mkdtemp(prefix="art_gallery_bench_")
+    path = os.path.join(directory, name)
+    previous = database.DATABASE
+    database.DATABASE = path
+    services.invalidate_reference_cache()
+    try:
+        database.initialize_db()
+        yield path
+    finally:
+        database.close_pool()
+        database.DATABASE = previous
+        services.invalidate_reference_cache()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_indexes(rows=1_000_000, lookups=200, seed=42):
+    """Сравнивает полный просмотр таблицы и поиск по индексу на rows строках.
+
+    Одни и те же запросы выполняются с NOT INDEXED (полный просмотр) и
+    с индексами из database.INDEXES.
+    """
+    rng = random.Random(seed)
+    with _temporary_database("indexes.db"):
+        artists = max(rows // 100, 1)
+
+        conn = database.get_connection(profile="bulk_load")
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        cursor.executemany("INSERT INTO Artist (id, name) VALUES (?, ?)",
+                           ((i, f"Artist {i}") for i in range(1, artists + 1)))
+        cursor.executemany('''
+            INSERT INTO Artwork (title, artist_id, status, price) VALUES (?, ?, ?, ?)
+        ''', ((f"Artwork {i}", rng.randint(1, artists), rng.choice(("Acquired", "Sold", "Rented")), 100.0)
+              for i in range(rows)))
+        cursor.executemany("INSERT INTO Visitor (name, email) VALUES (?, ?)",
+                           ((f"Visitor {i}", f"visitor{i}@example.com") for i in range(rows)))
+        cursor.executemany("INSERT INTO Movement (artwork_id, from_location, to_location) VALUES (?, ?, ?)",
+                           ((rng.randint(1, rows), "Storage", "Hall") for _ in range(rows)))
+        conn.commit()
+        cursor.execute("ANALYZE")
+
+        queries = [
+            ("Artwork WHERE artist_id = ?", "SELECT id FROM Artwork {hint} WHERE artist_id = ?",
+             lambda i: (rng.randint(1, artists),)),
+            ("Visitor WHERE email = ?", "SELECT id FROM Visitor {hint} WHERE email = ?",
+             lambda i: (f"visitor{rng.randrange(rows)}@example.com",)),
+            ("Movement WHERE artwork_id = ?", "SELECT id FROM Movement {hint} WHERE artwork_id = ?",
+             lambda i: (rng.randint(1, rows),)),
+        ]
+
+        results = []
+        for label, sql, params in queries:
+            scan_sql, seek_sql = sql.format(hint="NOT INDEXED"), sql.format(hint="")
+            # Полный просмотр медленный, поэтому для него делаем меньше повторов
+            scan_ms = _timeit(lambda i: cursor.execute(scan_sql, params(i)).fetchall(), max(lookups // 20, 1))
+            seek_ms = _timeit(lambda i: cursor.execute(seek_sql, params(i)).fetchall(), lookups)
+            plan = cursor.execute("EXPLAIN QUERY PLAN " + seek_sql, params(0)).fetchall()
+            results.append({"query": label, "scan_ms": scan_ms, "seek_ms": seek_ms,
+                            "plan": plan[-1][-1] if plan else ""})
+        conn.close()
+    return results
+
+
+def _peak_memory(func):
+    """(время в секундах, пиковый объем памяти Python в МБ) для вызова func"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def bench_stream(rows=1_000_000, seed=42):
+    """Пиковая память полного прохода по журналу перемещений:
+    get_movements() против iter_movements()."""
+    rng = random.Random(seed)
+    with _temporary_database("stream.db"):
+        conn = database.get_connection(profile="bulk_load")
+        conn.execute("BEGIN")
+        conn.executemany('''
+            INSERT INTO Movement (artwork_id, from_location, to_location, movement_date, purpose, responsible_person)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((rng.randint(1, 10000), "Storage", f"Hall {i % 20}", "2024-01-01", "Exhibition", "Staff")
+              for i in range(rows)))
+        conn.commit()
+        conn.close()
+
+        def consume(iterable):
+            count = 0
+            for _ in iterable:
+                count += 1
+            return count
+
+        results = []
+        for label, func in (("get_movements()", lambda: consume(services.get_movements())),
+                            ("iter_movements()", lambda: consume(services.iter_movements()))):
+            elapsed, peak = _peak_memory(func)
+            results.append({"call": label, "seconds": elapsed, "peak_mb": peak})
+    return results
+
+
+def _reset_peak_rss():
+    """Сбрасывает пиковый RSS процесса (только Linux: /proc/self/clear_refs)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    """Пиковый RSS процесса в МБ после последнего _reset_peak_rss (None, если /proc недоступен)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def bench_export(rows=1_000_000, seed=42):
+    """Время services.export_rows для журнала из rows перемещений в CSV, JSON Lines
+    и сжатый JSON Lines; peak_rss_mb - пиковый RSS процесса во время экспорта."""
+    rng = random.Random(seed)
+    with _temporary_database("export.db") as path:
+        conn = database.get_connection(profile="bulk_load")
+        conn.execute("BEGIN")
+        conn.executemany('''
+            INSERT INTO Movement (artwork_id, from_location, to_location, movement_date, purpose, responsible_person)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((rng.randint(1, 10000), "Storage", f"Hall {i % 20}", "2024-01-01", "Exhibition", "Staff")
+              for i in range(rows)))
+        conn.commit()
+        conn.close()
+        # Соединение загрузки держит большой кэш страниц - он не должен попасть в замер
+        database.close_pool()
+
+        results = []
+        for name in ("movements.csv", "movements.jsonl", "movements.jsonl.gz"):
+            target = os.path.join(os.path.dirname(path), name)
+            _reset_peak_rss()
+            start = time.perf_counter()
+            services.export_rows("Movement", target)
+            elapsed = time.perf_counter() - start
+            results.append({"file": name, "seconds": elapsed, "rows_per_s": rows / elapsed,
+                            "peak_rss_mb": _peak_rss_mb(),
+                            "file_mb": os.path.getsize(target) / 2 ** 20})
+            os.remove(target)
+    return results
+
+
+def bench_acquire(rows=20000, seed=42):
+    """Пропускная способность добавления картин: acquire_artwork по одной
+    против acquire_artworks_batch, строк в секунду."""
+    rng = random.Random(seed)
+    with _temporary_database("acquire.db"):
+        artist_ids = [services.add_artist(f"Artist {i}", "Biography") for i in range(100)]
+        artworks = [dict(title=f"Artwork {i}", year_created=rng.randint(1500, 2024), technique="Oil",
+                         dimensions="50x70", description="Description", genre="Portrait",
+                         artist_id=rng.choice(artist_ids), provenance_entry="Collection", price=1000.0)
+                    for i in range(rows)]
+
+        results = []
+        start = time.perf_counter()
+        for artwork in artworks:
+            services.acquire_artwork(**artwork)
+        elapsed = time.perf_counter() - start
+        results.append({"path": "acquire_artwork", "rows": rows, "seconds": elapsed, "rows_per_s": rows / elapsed})
+
+        start = time.perf_counter()
+        services.acquire_artworks_batch(artworks)
+        elapsed = time.perf_counter() - start
+        results.append({"path": "acquire_artworks_batch", "rows": rows, "seconds": elapsed,
+                        "rows_per_s": rows / elapsed})
+    return results
+
+
+def bench_search(rows=1_000_000, queries=50, seed=42):
+    """Время services.search на каталоге из rows картин.
+
+    Словарь описаний распределен по закону Ципфа: редкие слова встречаются
+    в единицах записей, частые - в заметной доле каталога.
+    """
+    rng = random.Random(seed)
+    with _temporary_database("search.db"):
+        letters = "абвгдежзиклмнопрстуфхцчшэюя"
+        vocabulary = list(dict.fromkeys("".join(rng.choices(letters, k=rng.randint(5, 10)))
+                                        for _ in range(20000)))
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+        def words(count):
+            return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+
+        conn = database.get_connection(profile="bulk_load")
+        conn.execute("BEGIN")
+        conn.execute("INSERT INTO Artist (id, name) VALUES (1, 'Artist')")
+        conn.executemany('''
+            INSERT INTO Artwork (title, description, genre, technique, artist_id, price)
+            VALUES (?, ?, ?, ?, 1, 100.0)
+        ''', ((words(3), words(15), words(1), words(1)) for _ in range(rows)))
+        conn.commit()
+        conn.close()
+
+        cases = [
+            ("редкое слово", lambda: vocabulary[rng.randrange(5000, len(vocabulary))]),
+            ("два слова", lambda: f"{vocabulary[rng.randrange(100, 2000)]} {vocabulary[rng.randrange(100, 2000)]}"),
+            ("префикс", lambda: vocabulary[rng.randrange(1000, len(vocabulary))][:-1]),
+            ("частое слово", lambda: vocabulary[rng.randrange(0, 10)]),
+        ]
+        results = []
+        for label, make_query in cases:
+            texts = [make_query() for _ in range(queries)]
+            ms = _timeit(lambda i: services.search(texts[i], kinds=("artworks",)), queries)
+            results.append({"query": label, "ms": ms})
+    return results
+
+
+def bench_reports(rows=10_000_000, workers=(1, 2, 4), seed=42):
+    """Время отчета reports.movement_frequency по журналу из rows перемещений
+    при разном числе процессов; speedup - ускорение относительно первого значения."""
+    rng = random.Random(seed)
+    with _temporary_database("reports.db"):
+        locations = [f"Hall {i}" for i in range(50)]
+        conn = database.get_connection(profile="bulk_load")
+        conn.execute("BEGIN")
+        conn.executemany('''
+            INSERT INTO Movement (artwork_id, from_location, to_location, movement_date) VALUES (?, ?, ?, ?)
+        ''', ((rng.randint(1, 100000), rng.choice(locations), rng.choice(locations),
+               f"{rng.randint(2000, 2024)}-{rng.randint(1, 12):02d}-01") for _ in range(rows)))
+        conn.commit()
+        conn.close()
+
+        results = []
+        for count in workers:
+            start = time.perf_counter()
+            reports.movement_frequency(workers=count)
+            seconds = time.perf_counter() - start
+            results.append({"workers": count, "seconds": seconds,
+                            "speedup": results[0]["seconds"] / seconds if results else 1.0})
+    return results
+
+
+
+def bench_frame(rows=5_000_000, queries=5, seed=42):
+    """ArtworkFrame против списка строк get_artworks() на каталоге из rows картин:
+    время загрузки, занятая память и время подсчета картин по жанрам
+    (для списка строк - Counter по столбцу, для ArtworkFrame - group_by с агрегатами цены)."""
+    rng = random.Random(seed)
+    with _temporary_database("frame.db"):
+        genres = [f"Genre {i}" for i in range(30)]
+        techniques = [f"Technique {i}" for i in range(15)]
+        locations = [f"Hall {i}" for i in range(40)]
+        statuses = ["available", "sold", "rented", "restoration"]
+        conn = database.get_connection(profile="bulk_load")
+        conn.execute("BEGIN")
+        conn.execute("INSERT INTO Artist (id, name) VALUES (1, 'Artist')")
+        conn.executemany('''
+            INSERT INTO Artwork (title, year_created, technique, genre, current_location, status, artist_id, price)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ((f"Artwork {i}", rng.randint(1500, 2024), rng.choice(techniques), rng.choice(genres),
+               rng.choice(locations), rng.choice(statuses), rng.randint(1, 1000), round(rng.lognormvariate(9, 1.5), 2))
+              for i in range(rows)))
+        conn.commit()
+        conn.close()
+
+        def retained(load):
+            """(результат, время, МБ памяти Python, занятой результатом).
+            tracemalloc замедляет выделение памяти, поэтому время замеряется отдельным вызовом"""
+            begin = time.perf_counter()
+            load()
+            elapsed = time.perf_counter() - begin
+            gc.collect()
+            tracemalloc.start()
+            result = load()
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return result, elapsed, size / 2 ** 20
+
+        artworks, elapsed, mb = retained(services.get_artworks)
+        genre = Artwork._fields.index("genre")
+        results = [{"representation": "get_artworks()", "load_s": elapsed, "mb": mb,
+                    "group_by_ms": _timeit(lambda i: collections.Counter(row[genre] for row in artworks), 1)}]
+        del artworks
+
+        numpy = frames.np
+        variants = ([("ArtworkFrame (NumPy)", numpy)] if numpy is not None else []) + [("ArtworkFrame (array)", None)]
+        try:
+            for label, module in variants:
+                frames.np = module
+                frame, elapsed, mb = retained(frames.ArtworkFrame.load)
+                results.append({"representation": label, "load_s": elapsed, "mb": mb,
+                                "group_by_ms": _timeit(lambda i: frame.group_by("genre"), queries)})
+                del frame
+        finally:
+            frames.np = numpy
+    return results
+
+
+def bench_session(workflows=200, profile="durable"):
+    """Время сценария "продажа + документ + перемещение" для workflows картин:
+    каждый вызов services своей транзакцией против одной GallerySession на картину.
+    Профиль durable синхронизирует диск на каждой фиксации."""
+    with _temporary_database("session.db"):
+        artist = services.add_artist("Artist", "Bio")
+        ids, _ = services.acquire_artworks_batch([
+            dict(title=f"Artwork {i}", year_created=2000, technique="Oil", dimensions="1x1", description="",
+                 genre="Портрет", artist_id=artist, provenance_entry="", price=1000.0)
+            for i in range(2 * workflows)])
+
+        def workflow(artwork_id, session=None):
+            services.sell_artwork(artwork_id, "Buyer", 1200.0, session=session)
+            services.add_document(artwork_id, "Договор купли-продажи", f"/docs/{artwork_id}.pdf", session=session)
+            services.record_movement(artwork_id, "Gallery Storage", "Buyer", "Продажа", "Staff", session=session)
+
+        def in_session(artwork_id):
+            with services.GallerySession() as session:
+                workflow(artwork_id, session)
+
+        previous = database.DEFAULT_PROFILE
+        database.close_pool()
+        database.set_default_profile(profile)
+        results = []
+        try:
+            for label, run, batch in (("отдельные вызовы", workflow, ids[:workflows]),
+                                      ("GallerySession", in_session, ids[workflows:])):
+                ms = _timeit(lambda i: run(batch[i]), workflows)
+                results.append({"mode": label, "workflows": workflows, "ms_per_workflow": ms})
+        finally:
+            database.close_pool()
+            database.set_default_profile(previous)
+    return results
+
+
+def bench_group_commit(writes=5000, producers=8, profile="durable"):
+    """Пропускная способность record_movement из producers потоков: каждый вызов
+    своей транзакцией против GroupCommitWriter (одна фиксация на порцию)."""
+    with _temporary_database("group_commit.db"):
+        artist = services.add_artist("Artist", "Bio")
+        artwork = services.acquire_artwork("Artwork", 2000, "Oil", "1x1", "", "Портрет", artist, "", 1000.0)
+
+        def direct(i):
+            return services.record_movement(artwork, "Зал 1", "Зал 2", "Экспозиция", f"Сканер {i}")
+
+        previous = database.DEFAULT_PROFILE
+        database.close_pool()
+        database.set_default_profile(profile)
+        results = []
+        try:
+            for label in ("отдельные транзакции", "GroupCommitWriter"):
+                writer = services.GroupCommitWriter() if label == "GroupCommitWriter" else None
+
+                def call(i):
+                    if writer is None:
+                        return direct(i)
+                    return writer.record_movement(artwork, "Зал 1", "Зал 2", "Экспозиция", f"Сканер {i}").result()
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(producers) as executor:
+                    list(executor.map(call, range(writes)))
+                seconds = time.perf_counter() - start
+                row = {"mode": label, "writes": writes, "seconds": round(seconds, 3),
+                       "writes_per_s": round(writes / seconds), "batches": writes}
+                if writer is not None:
+                    writer.close()
+                    row["batches"] = writer.stats()["batches"]
+                results.append(row)
+        finally:
+            database.close_pool()
+            database.set_default_profile(previous)
+    return results
+
+
+class _DictArtwork:
+    """Прежняя модель картины: атрибуты в __dict__ экземпляра"""
+
+    def __init__(self, id=None, title=None, year_created=None, technique=None, dimensions=None,
+                 description=None, genre=None, current_location=None, status=None, artist_id=None, price=None):
+        self.id = id
+        self.title = title
+        self.year_created = year_created
+        self.technique = technique
+        self.dimensions = dimensions
+        self.description = description
+        self.genre = genre
+        self.current_location = current_location
+        self.status = status
+        self.artist_id = artist_id
+        self.price = price
+
+
+class _SlotsArtwork:
+    """Та же модель с явными __slots__ (изменяемая)"""
+    __slots__ = Artwork._fields
+    __init__ = _DictArtwork.__init__
+
+
+def bench_models(count=1_000_000):
+    """Память и время создания count картин в разных представлениях:
+    класс с __dict__, класс со __slots__, кортеж sqlite3 и models.Artwork.
+    Значения полей, кроме id, общие, поэтому mb - расход на сами объекты."""
+    values = ("Title", 2000, "Oil", "50x70", "Description", "Портрет", "Storage", "available", 1, 1000.0)
+    builders = (("dict", lambda i: _DictArtwork(i, *values)),
+                ("slots", lambda i: _SlotsArtwork(i, *values)),
+                ("tuple", lambda i: (i, *values)),
+                ("models.Artwork", lambda i: Artwork._make((i, *values))))
+
+    results = []
+    for label, build in builders:
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        objects = [build(i) for i in range(count)]
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results.append({"representation": label, "seconds": elapsed, "mb": size / 2 ** 20,
+                        "bytes_per_object": size / count})
+        del objects
+    return results
+
+
+def _print_table(rows, columns):
+    widths = [max([len(str(c))] + [len(_fmt(r[c])) for r in rows]) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print("  ".join(_fmt(r[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def _fmt(value):
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности базы данных галереи")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    indexes = commands.add_parser("indexes", help="полный просмотр против поиска по индексу")
+    indexes.add_argument("--rows", type=int, default=1_000_000)
+    indexes.add_argument("--lookups", type=int, default=200)
+
+    stream = commands.add_parser("stream", help="память полного прохода по большой таблице")
+    stream.add_argument("--rows", type=int, default=1_000_000)
+
+    export = commands.add_parser("export", help="потоковый экспорт журнала перемещений")
+    export.add_argument("--rows", type=int, default=1_000_000)
+
+    acquire = commands.add_parser("acquire", help="добавление картин по одной и пакетом")
+    acquire.add_argument("--rows", type=int, default=20000)
+
+    search = commands.add_parser("search", help="время полнотекстового поиска")
+    search.add_argument("--rows", type=int, default=1_000_000)
+    search.add_argument("--queries", type=int, default=50)
+
+    report = commands.add_parser("reports", help="масштабирование отчетов по числу процессов")
+    report.add_argument("--rows", type=int, default=10_000_000)
+    report.add_argument("--workers", default="1,2,4", help="числа процессов через запятую")
+
+    frame = commands.add_parser("frame", help="аналитика по столбцам против списка строк")
+    frame.add_argument("--rows", type=int, default=5_000_000)
+
+    session = commands.add_parser("session", help="несколько вызовов services одной транзакцией")
+    session.add_argument("--workflows", type=int, default=200)
+    session.add_argument("--profile", default="durable", choices=sorted(database.PRAGMA_PROFILES))
+
+    group_commit = commands.add_parser("group-commit", help="групповая фиксация частых записей")
+    group_commit.add_argument("--writes", type=int, default=5000)
+    group_commit.add_argument("--producers", type=int, default=8)
+    group_commit.add_argument("--profile", default="durable", choices=sorted(database.PRAGMA_PROFILES))
+
+    models = commands.add_parser("models", help="память объектов моделей")
+    models.add_argument("--count", type=int, default=1_000_000)
+
+    compare = commands.add_parser("compare", help="сравнить результаты с базовой линией")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--metric", default="p50_ms")
+    compare.add_argument("--threshold", type=float, default=0.2,
+                         help="допустимый рост метрики (0.2 = 20%%)")
+
+    args = parser.parse_args(argv)
+    if args.command == "indexes":
+        results = bench_indexes(args.rows, args.lookups)
+        print(f"Строк в таблицах: {args.rows}")
+        _print_table(results, ["query", "scan_ms", "seek_ms", "plan"])
+    elif args.command == "stream":
+        results = bench_stream(args.rows)
+        print(f"Строк в Movement: {args.rows}")
+        _print_table(results, ["call", "seconds", "peak_mb"])
+    elif args.command == "export":
+        print(f"Строк в Movement: {args.rows}")
+        _print_table(bench_export(args.rows), ["file", "seconds", "rows_per_s", "peak_rss_mb", "file_mb"])
+    elif args.command == "acquire":
+        _print_table(bench_acquire(args.rows), ["path", "rows", "seconds", "rows_per_s"])
+    elif args.command == "search":
+        print(f"Картин в каталоге: {args.rows}")
+        _print_table(bench_search(args.rows, args.queries), ["query", "ms"])
+    elif args.command == "reports":
+        print(f"Строк в Movement: {args.rows}")
+        workers = [int(count) for count in args.workers.split(",")]
+        _print_table(bench_reports(args.rows, workers), ["workers", "seconds", "speedup"])
+    elif args.command == "frame":
+        print(f"Картин в каталоге: {args.rows}")
+        _print_table(bench_frame(args.rows), ["representation", "load_s", "mb", "group_by_ms"])
+    elif args.command == "session":
+        _print_table(bench_session(args.workflows, args.profile), ["mode", "workflows", "ms_per_workflow"])
+    elif args.command == "group-commit":
+        _print_table(bench_group_commit(args.writes, args.producers, args.profile),
+                     ["mode", "writes", "seconds", "writes_per_s", "batches"])
+    elif args.command == "models":
+        print(f"Картин: {args.count}")
+        _print_table(bench_models(args.count), ["representation", "seconds", "mb", "bytes_per_object"])
+    elif args.command == "compare":
+        rows = compare_results(load_results(args.baseline), load_results(args.current),
+                               args.metric, args.threshold)
+        _print_table(rows, ["name", "baseline", "current", "change", "regression"])
+        regressions = [row["name"] for row in rows if row["regression"]]
+        if regressions:
+            print(f"Замедлились ({args.metric} +{args.threshold:.0%}): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,15 @@
+import pytest
+
+import database
+import services
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Временная база данных вместо art_gallery.db."""
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "gallery.db"))
+    database.initialize_db()
+    services.invalidate_reference_cache()
+    yield
+    database.close_pool()
+    services.invalidate_reference_cache()
@@ -1,18 +1,359 @@
 import sqlite3
+import threading
+import time
+import atexit
+from contextlib import contextmanager
 #from datetime import date
 
 # Создание и подключение к базе данных SQLite
 DATABASE = "art_gallery.db"
 
-def get_connection():
-    """Создает соединение с включенным lastrowid"""
-    conn = sqlite3.connect(DATABASE)
-    # Убедимся что lastrowid будет работать
-    conn.isolation_level = None  # Автокоммит отключен
-    return conn
+# Настройки пула соединений
+POOL_MAX_SIZE = 8                 # максимум одновременно открытых соединений
+POOL_TIMEOUT = 10.0               # сколько ждать свободное соединение (сек)
+POOL_MAX_IDLE = 300.0             # простаивающее дольше соединение закрывается (сек)
+POOL_HEALTH_CHECK_INTERVAL = 30.0 # как часто проверять соединение перед выдачей (сек)
 
-def initialize_db():
-    """Инициализация таблиц в базе данных."""
+# Профили PRAGMA, применяемые к соединению при выдаче из пула.
+# WAL позволяет читателям (GUI) работать параллельно с пишущим соединением,
+# а synchronous=NORMAL в режиме WAL синхронизирует диск только на контрольных точках.
+PRAGMA_PROFILES = {
+    "default": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,       # ~16 МБ кэша страниц
+        "mmap_size": 134217728,     # 128 МБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Максимальная надежность: fsync на каждой фиксации транзакции
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 134217728,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Массовая загрузка (initial_data, импорт): без fsync, большой кэш.
+    # При сбое ОС последние загруженные данные могут потеряться - их загружают заново.
+    "bulk_load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,      # ~256 МБ
+        "mmap_size": 268435456,     # 256 МБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+    # Потоковое чтение больших таблиц (экспорт): без mmap и с маленьким кэшем,
+    # чтобы страницы файла не накапливались в памяти процесса
+    "streaming": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -2000,        # ~2 МБ
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+# Профиль, применяемый к соединениям по умолчанию
+DEFAULT_PROFILE = "default"
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Не удалось получить соединение из пула за отведенное время"""
+    pass
+
+
+class _PoolEntry:
+    """Соединение пула и его служебные метки времени"""
+    __slots__ = ("conn", "created_at", "last_used", "last_checked", "thread_id", "profile")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.profile = None
+        self.created_at = now
+        self.last_used = now
+        self.last_checked = now
+        self.thread_id = None
+
+
+class PooledConnection:
+    """Соединение, выданное пулом. close() возвращает его в пул, а не закрывает"""
+
+    def __init__(self, pool, entry):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_entry", entry)
+
+    @property
+    def raw(self):
+        """Исходный объект sqlite3.Connection"""
+        entry = self._entry
+        if entry is None:
+            raise sqlite3.ProgrammingError("Соединение уже возвращено в пул")
+        return entry.conn
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.raw, name, value)
+
+    def __enter__(self):
+        self.raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.raw.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        """Возвращает соединение в пул (повторный вызов ничего не делает)"""
+        entry = self._entry
+        if entry is not None:
+            object.__setattr__(self, "_entry", None)
+            self._pool.release(entry)
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений SQLite с учетом потоков.
+
+    Свободные соединения выдаются в порядке LIFO, причем предпочтение отдается
+    соединению, которым последним пользовался текущий поток. Простаивающие
+    дольше max_idle соединения закрываются, перед выдачей давно не
+    проверявшееся соединение проходит проверку SELECT 1.
+    """
+
+    def __init__(self, database, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 max_idle=POOL_MAX_IDLE, health_check_interval=POOL_HEALTH_CHECK_INTERVAL):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+        self._idle = []
+        self._in_use = set()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {"checkouts": 0, "hits": 0, "opens": 0, "waits": 0, "timeouts": 0,
+                       "evictions": 0, "health_check_failures": 0}
+
+    def _open(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        # Убедимся что lastrowid будет работать
+        conn.isolation_level = None  # Автокоммит, транзакции открываются явно
+        return _PoolEntry(conn)
+
+    def _discard(self, entry):
+        """Закрывает соединение, уже исключенное из пула"""
+        try:
+            entry.conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _take_idle_locked(self, thread_id):
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i].thread_id == thread_id:
+                return self._idle.pop(i)
+        return self._idle.pop()
+
+    def _evict_idle_locked(self, now):
+        expired = [e for e in self._idle if now - e.last_used > self.max_idle]
+        if expired:
+            self._idle = [e for e in self._idle if now - e.last_used <= self.max_idle]
+            self._size -= len(expired)
+            self._stats["evictions"] += len(expired)
+            self._cond.notify(len(expired))
+        return expired
+
+    def _healthy(self, entry, now):
+        if now - entry.last_checked < self.health_check_interval:
+            return True
+        try:
+            entry.conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        entry.last_checked = now
+        return True
+
+    def acquire(self, profile=None):
+        """Выдает соединение из пула, при необходимости открывая новое или ожидая.
+
+        К соединению применяется профиль PRAGMA profile (по умолчанию DEFAULT_PROFILE).
+        """
+        profile = profile or DEFAULT_PROFILE
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Неизвестный профиль соединения: {profile}")
+        thread_id = threading.get_ident()
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            entry = None
+            with self._cond:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Пул соединений закрыт")
+                expired = self._evict_idle_locked(time.monotonic())
+                if self._idle:
+                    entry = self._take_idle_locked(thread_id)
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Нет свободных соединений в пуле (максимум {self.max_size})")
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+                    continue
+            for old in expired:
+                self._discard(old)
+
+            if entry is None:
+                try:
+                    entry = self._open()
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["opens"] += 1
+            elif not self._healthy(entry, time.monotonic()):
+                self._discard(entry)
+                with self._cond:
+                    self._size -= 1
+                    self._stats["health_check_failures"] += 1
+                    self._cond.notify()
+                continue
+            else:
+                with self._cond:
+                    self._stats["hits"] += 1
+
+            if entry.profile != profile:
+                try:
+                    apply_profile(entry.conn, profile)
+                except BaseException:
+                    self.release(entry)
+                    raise
+                entry.profile = profile
+
+            entry.thread_id = thread_id
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._in_use.add(entry)
+            return PooledConnection(self, entry)
+
+    def release(self, entry):
+        """Возвращает соединение в пул, откатывая незавершенную транзакцию"""
+        try:
+            if entry.conn.in_transaction:
+                entry.conn.rollback()
+        except sqlite3.Error:
+            reusable = False
+        else:
+            reusable = True
+
+        with self._cond:
+            self._in_use.discard(entry)
+            if reusable and not self._closed:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+                expired = self._evict_idle_locked(entry.last_used)
+            else:
+                self._size -= 1
+                expired = [entry]
+            self._cond.notify()
+        for old in expired:
+            self._discard(old)
+
+    def interrupt(self, thread_id):
+        """Прерывает запросы, выполняющиеся на соединениях, выданных потоку thread_id
+        (sqlite3.Connection.interrupt); возвращает число таких соединений"""
+        with self._cond:
+            entries = [entry for entry in self._in_use if entry.thread_id == thread_id]
+            for entry in entries:
+                entry.conn.interrupt()
+        return len(entries)
+
+    def close(self):
+        """Закрывает все свободные соединения и запрещает выдачу новых"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """Счетчики пула: попадания, ожидания, открытия соединений и т.д."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self._size, idle=len(self._idle),
+                         in_use=self._size - len(self._idle), max_size=self.max_size)
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Возвращает пул для текущего значения DATABASE (создает при смене пути)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.database != DATABASE:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DATABASE)
+        return _pool
+
+
+def close_pool():
+    """Закрывает пул соединений (вызывается и при завершении программы)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+atexit.register(close_pool)
+
+
+def get_pool_stats():
+    """Статистика пула соединений"""
+    return get_pool().stats()
+
+
+def apply_profile(conn, profile):
+    """Применяет к соединению набор PRAGMA из PRAGMA_PROFILES"""
+    for name, value in PRAGMA_PROFILES[profile].items():
+        conn.execute(f"PRAGMA {name} = {value}").fetchall()
+
+
+def set_default_profile(profile):
+    """Меняет профиль, применяемый к соединениям по умолчанию"""
+    global DEFAULT_PROFILE
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Неизвестный профиль соединения: {profile}")
+    DEFAULT_PROFILE = profile
+
+
+def get_connection(profile=None):
+    """Выдает соединение из пула; conn.close() возвращает его обратно.
+
+    profile - имя профиля из PRAGMA_PROFILES, например "bulk_load" для массовой загрузки.
+    """
+    return get_pool().acquire(profile)
+
+def initialize_db(target=None):
+    """Инициализация таблиц в базе данных и применение миграций до версии target."""
     conn = get_connection()
     cursor = conn.cursor()
 
@@ -202,5 +543,709 @@ def initialize_db():
     conn.commit()
     conn.close()
 
+    migrate(target)
+
+
+# Вторичные индексы: (имя, таблица, столбец, уникальный)
+INDEXES = [
+    ("idx_artwork_artist_id", "Artwork", "artist_id", False),
+    ("idx_artwork_status", "Artwork", "status", False),
+    ("idx_visitor_email", "Visitor", "email", True),
+    ("idx_movement_artwork_id", "Movement", "artwork_id", False),
+    ("idx_provenance_artwork_id", "Provenance", "artwork_id", False),
+    ("idx_restoration_artwork_id", "Restoration", "artwork_id", False),
+    ("idx_sale_artwork_id", "Sale", "artwork_id", False),
+    ("idx_rental_artwork_id", "Rental", "artwork_id", False),
+    ("idx_document_artwork_id", "Document", "artwork_id", False),
+    ("idx_document_file_document_id", "Document_File", "document_id", False),
+    # Первичный ключ (exhibition_id, artwork_id) не помогает искать по artwork_id
+    ("idx_exhibition_artwork_artwork_id", "Exhibition_Artwork", "artwork_id", False),
+    ("idx_visitor_review_exhibition_id", "Visitor_Review", "exhibition_id", False),
+    ("idx_press_review_exhibition_id", "Press_Review", "exhibition_id", False),
+]
+
+
+def _create_indexes(cursor):
+    """Создает недостающие вторичные индексы из INDEXES"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    existing = {row[0] for row in cursor.fetchall()}
+
+    created = False
+    for name, table, column, unique in INDEXES:
+        if name in existing:
+            continue
+        if unique:
+            # Уникальный индекс не создастся при дубликатах - сообщаем какие именно
+            cursor.execute(f"""
+                SELECT {column} FROM {table} WHERE {column} IS NOT NULL
+                GROUP BY {column} HAVING COUNT(*) > 1 LIMIT 5
+            """)
+            duplicates = [str(row[0]) for row in cursor.fetchall()]
+            if duplicates:
+                raise sqlite3.IntegrityError(
+                    f"Невозможно создать уникальный индекс {name}, "
+                    f"повторяющиеся значения {table}.{column}: {', '.join(duplicates)}")
+        cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({column})")
+        created = True
+    if created:
+        # Обновляем статистику для планировщика запросов
+        cursor.execute("ANALYZE")
+
+
+# Полнотекстовые индексы FTS5: (индекс, таблица с данными, индексируемые столбцы).
+# Индексы хранят только словарь, текст для сниппетов берется из самих таблиц.
+SEARCH_INDEXES = [
+    ("Artwork_Search", "Artwork", ("title", "description", "genre", "technique")),
+    ("Artist_Search", "Artist", ("name", "biography")),
+    ("Visitor_Review_Search", "Visitor_Review", ("review", "reviewer_name")),
+    ("Press_Review_Search", "Press_Review", ("review", "publication_name")),
+]
+# Миграция, создающая индексы; шаг ее заполнения - номер индекса в SEARCH_INDEXES
+SEARCH_INDEX_MIGRATION = 2
+
+
+def _create_search_indexes(cursor, rebuild=False):
+    """Создает индексы FTS5 и триггеры, поддерживающие их в актуальном состоянии.
+
+    Новые индексы заполняет миграция порциями (_search_index_backfill); пока
+    заполнение идет, триггеры не трогают еще не проиндексированные строки.
+    rebuild - перестроить индексы целиком в текущей транзакции"""
+    for step, (name, table, columns) in enumerate(SEARCH_INDEXES):
+        cols = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+        new_indexed = _backfilled(SEARCH_INDEX_MIGRATION, step, "new.id")
+        old_indexed = _backfilled(SEARCH_INDEX_MIGRATION, step, "old.id")
+
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5(
+                {cols}, content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {name} (rowid, {cols}) SELECT new.id, {new_values} WHERE {new_indexed};
+            END
+        """)
+        # Удалять из FTS5 можно только проиндексированные значения
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {name} ({name}, rowid, {cols}) SELECT 'delete', old.id, {old_values}
+                WHERE {old_indexed};
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {cols} ON {table} BEGIN
+                INSERT INTO {name} ({name}, rowid, {cols}) SELECT 'delete', old.id, {old_values}
+                WHERE {old_indexed};
+                INSERT INTO {name} (rowid, {cols}) SELECT new.id, {new_values} WHERE {new_indexed};
+            END
+        """)
+        if rebuild:
+            cursor.execute(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+
+
+def _search_index_backfill():
+    """Шаги заполнения индексов FTS5 порциями по ID строк"""
+    return [(table, f"INSERT INTO {name} (rowid, {', '.join(columns)}) "
+                    f"SELECT id, {', '.join(columns)} FROM {table} WHERE id BETWEEN :start AND :end")
+            for name, table, columns in SEARCH_INDEXES]
+
+
+def _drop_search_triggers(cursor):
+    for name, _, _ in SEARCH_INDEXES:
+        for event in ("insert", "delete", "update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}_{event}")
+
+
+# Индекс занятости картин - R*Tree по двум измерениям: дни (от 1970-01-01) и ID картины.
+# Каждая строка - интервал, когда картину нельзя сдать в аренду. Поиск пересечений
+# с диапазоном дат для любого набора картин идет по дереву, без перебора картин.
+AVAILABILITY_INDEX = "Artwork_Availability"
+AVAILABILITY_OPEN_END = 2147483647   # максимум rtree_i32: интервал без окончания
+_AVAILABILITY_COLUMNS = "id, start_day, end_day, artwork_lo, artwork_hi, source, source_id"
+# Миграция, создающая индекс; шаг ее заполнения - номер источника в AVAILABILITY_SOURCES
+AVAILABILITY_MIGRATION = 3
+
+# Источники интервалов: (имя, таблица, уникальный ID строки индекса, ID источника, ID картины,
+# начало, окончание, дополнительный JOIN). Выражения записаны для строки {t}; окончание NULL
+# означает "бессрочно" (продажа, незавершенная реставрация).
+AVAILABILITY_SOURCES = [
+    ("rental", "Rental", "{t}.id * 3", "{t}.id", "{t}.artwork_id",
+     "{t}.start_date", "{t}.end_date", ""),
+    ("sale", "Sale", "{t}.id * 3 + 1", "{t}.id", "{t}.artwork_id",
+     "{t}.sale_date", "NULL", ""),
+    ("restoration", "Restoration", "{t}.id * 3 + 2", "{t}.id", "{t}.artwork_id",
+     "{t}.start_date", "{t}.end_date", ""),
+    # У Exhibition_Artwork нет постоянного ID: берем отрицательное число из пары ключей
+    ("exhibition", "Exhibition_Artwork", "-(({t}.exhibition_id << 32) | {t}.artwork_id)",
+     "{t}.exhibition_id", "{t}.artwork_id", "e.start_date", "e.end_date",
+     "JOIN Exhibition e ON e.id = {t}.exhibition_id"),
+]
+# Условие, выбирающее строку источника по строке new/old триггера
+_AVAILABILITY_KEYS = {
+    "Exhibition_Artwork": "t.exhibition_id = {row}.exhibition_id AND t.artwork_id = {row}.artwork_id",
+}
+
+
+def _day(expr):
+    """SQL: дата expr в днях от 1970-01-01"""
+    return f"CAST(julianday({expr}) - 2440587.5 AS INTEGER)"
+
+
+def _availability_select(source, where):
+    """SQL, выбирающий строки индекса занятости из источника source с условием where"""
+    name, table, row_id, source_id, artwork_id, start, end, join = source
+    return f"""
+        SELECT row_id, start_day, MAX(COALESCE(end_day, {AVAILABILITY_OPEN_END}), start_day),
+               artwork_id, artwork_id, '{name}', source_id
+        FROM (SELECT {row_id.format(t='t')} AS row_id, {_day(start.format(t='t'))} AS start_day,
+                     {_day(end.format(t='t'))} AS end_day, {artwork_id.format(t='t')} AS artwork_id,
+                     {source_id.format(t='t')} AS source_id
+              FROM {table} t {join.format(t='t')} WHERE {where})
+        WHERE start_day IS NOT NULL AND artwork_id IS NOT NULL
+    """
+
+
+def _create_availability_index(cursor, rebuild=False):
+    """Создает индекс занятости картин и триггеры, поддерживающие его в актуальном состоянии.
+
+    Новый индекс заполняет миграция порциями (_availability_backfill); пока
+    заполнение идет, триггеры не добавляют интервалы еще не обработанных строк.
+    rebuild - перестроить индекс целиком в текущей транзакции"""
+    index = AVAILABILITY_INDEX
+    columns = _AVAILABILITY_COLUMNS
+
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING rtree_i32(
+            id, start_day, end_day, artwork_lo, artwork_hi, +source, +source_id
+        )
+    """)
+    for step, source in enumerate(AVAILABILITY_SOURCES):
+        name, table, row_id = source[:3]
+        key = _AVAILABILITY_KEYS.get(table, "t.id = {row}.id") + " AND " + \
+            _backfilled(AVAILABILITY_MIGRATION, step, "t.rowid")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_{name}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {index} ({columns}) {_availability_select(source, key.format(row="new"))};
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_{name}_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM {index} WHERE id = {row_id.format(t="old")};
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_{name}_update AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {index} WHERE id = {row_id.format(t="old")};
+                INSERT INTO {index} ({columns}) {_availability_select(source, key.format(row="new"))};
+            END
+        """)
+
+    # Смена дат выставки меняет интервалы всех ее картин
+    exhibition = AVAILABILITY_SOURCES[-1]
+    row_id = exhibition[2].format(t="t")
+    exhibition_ids = f"SELECT {row_id} FROM Exhibition_Artwork t WHERE t.exhibition_id = {{row}}.id"
+    indexed = _backfilled(AVAILABILITY_MIGRATION, len(AVAILABILITY_SOURCES) - 1, "t.rowid")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_exhibition_dates AFTER UPDATE OF start_date, end_date
+        ON Exhibition BEGIN
+            DELETE FROM {index} WHERE id IN ({exhibition_ids.format(row="old")});
+            INSERT INTO {index} ({columns})
+            {_availability_select(exhibition, f"t.exhibition_id = new.id AND {indexed}")};
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {index}_exhibition_removed AFTER DELETE ON Exhibition BEGIN
+            DELETE FROM {index} WHERE id IN ({exhibition_ids.format(row="old")});
+        END
+    """)
 
+    if rebuild:
+        cursor.execute(f"DELETE FROM {index}")
+        for source in AVAILABILITY_SOURCES:
+            cursor.execute(f"INSERT INTO {index} ({columns}) {_availability_select(source, '1')}")
 
+
+def _availability_backfill():
+    """Шаги заполнения индекса занятости порциями по rowid источников"""
+    return [(source[1], f"INSERT INTO {AVAILABILITY_INDEX} ({_AVAILABILITY_COLUMNS}) "
+                        f"{_availability_select(source, 't.rowid BETWEEN :start AND :end')}")
+            for source in AVAILABILITY_SOURCES]
+
+
+# Финансовые сводки: таблица -> (DDL, число ключевых столбцов, SELECT, вычисляющий
+# содержимое таблицы, столбец ID картины в SELECT). Сводки обновляются services в тех же
+# транзакциях, что продажи, аренды и реставрации; SELECT нужен для перестройки, проверки
+# и заполнения порциями: {where} - условие на ID картины.
+FINANCIAL_SUMMARIES = {
+    "Artist_Monthly_Revenue": ("""
+        CREATE TABLE IF NOT EXISTS Artist_Monthly_Revenue (
+            artist_id INTEGER,
+            month TEXT,
+            sales_count INTEGER NOT NULL,
+            sales_revenue REAL NOT NULL,
+            rentals_count INTEGER NOT NULL,
+            rental_revenue REAL NOT NULL,
+            PRIMARY KEY (artist_id, month)
+        ) WITHOUT ROWID
+    """, 2, """
+        SELECT artist_id, month, SUM(sales_count), TOTAL(sales_revenue),
+               SUM(rentals_count), TOTAL(rental_revenue)
+        FROM (SELECT a.artist_id, COALESCE(substr(s.sale_date, 1, 7), '') AS month, 1 AS sales_count,
+                     s.price AS sales_revenue, 0 AS rentals_count, 0 AS rental_revenue
+              FROM Sale s JOIN Artwork a ON a.id = s.artwork_id WHERE {where}
+              UNION ALL
+              SELECT a.artist_id, COALESCE(substr(r.start_date, 1, 7), ''), 0, 0, 1, r.rental_fee
+              FROM Rental r JOIN Artwork a ON a.id = r.artwork_id WHERE {where})
+        GROUP BY artist_id, month
+    """, "a.id"),
+    "Artwork_Rental_Income": ("""
+        CREATE TABLE IF NOT EXISTS Artwork_Rental_Income (
+            artwork_id INTEGER PRIMARY KEY,
+            rentals_count INTEGER NOT NULL,
+            rental_income REAL NOT NULL
+        )
+    """, 1, """
+        SELECT artwork_id, COUNT(*), TOTAL(rental_fee) FROM Rental WHERE {where} GROUP BY artwork_id
+    """, "artwork_id"),
+    "Restoration_Cost": ("""
+        CREATE TABLE IF NOT EXISTS Restoration_Cost (
+            restoration_id INTEGER PRIMARY KEY,
+            artwork_id INTEGER,
+            labor_cost REAL NOT NULL,
+            materials_cost REAL NOT NULL
+        )
+    """, 1, """
+        SELECT r.id, r.artwork_id, COALESCE(r.cost, 0), TOTAL(rm.quantity_used * m.unit_price)
+        FROM Restoration r
+        LEFT JOIN Restoration_Material rm ON rm.restoration_id = r.id
+        LEFT JOIN Material m ON m.id = rm.material_id
+        WHERE {where}
+        GROUP BY r.id
+    """, "r.artwork_id"),
+}
+FINANCIAL_SUMMARY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_artist_monthly_revenue_month ON Artist_Monthly_Revenue (month)",
+    "CREATE INDEX IF NOT EXISTS idx_artwork_rental_income_income ON Artwork_Rental_Income (rental_income)",
+    "CREATE INDEX IF NOT EXISTS idx_restoration_cost_artwork_id ON Restoration_Cost (artwork_id)",
+]
+# Допустимое расхождение сумм: инкрементные суммы копятся в другом порядке, чем SUM
+FINANCIAL_SUMMARY_TOLERANCE = 0.005
+# Миграция, создающая сводки; все сводки заполняются одним шагом по ID картин
+FINANCIAL_SUMMARIES_MIGRATION = 4
+
+
+def _financial_summary_select(table, artworks=None):
+    """SELECT содержимого сводки table; artworks - SQL-условие BETWEEN на ID картины"""
+    _, _, select, column = FINANCIAL_SUMMARIES[table]
+    return select.format(where=f"{column} {artworks}" if artworks else "1")
+
+
+def _create_financial_summaries(cursor, rebuild=False):
+    """Создает таблицы финансовых сводок. Новые сводки заполняет миграция порциями
+    (_financial_summary_backfill); rebuild - пересчитать все в текущей транзакции"""
+    for table, (ddl, *_) in FINANCIAL_SUMMARIES.items():
+        cursor.execute(ddl)
+        if rebuild:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"INSERT INTO {table} {_financial_summary_select(table)}")
+    for sql in FINANCIAL_SUMMARY_INDEXES:
+        cursor.execute(sql)
+
+
+def _financial_summary_backfill():
+    """Шаг заполнения сводок порциями по ID картин. Выручка художника за месяц
+    складывается из порций, остальные строки сводок относятся к одной картине"""
+    artworks = "BETWEEN :start AND :end"
+    return [("Artwork", [
+        f"""INSERT INTO Artist_Monthly_Revenue {_financial_summary_select("Artist_Monthly_Revenue", artworks)}
+            ON CONFLICT (artist_id, month) DO UPDATE SET
+                sales_count = sales_count + excluded.sales_count,
+                sales_revenue = sales_revenue + excluded.sales_revenue,
+                rentals_count = rentals_count + excluded.rentals_count,
+                rental_revenue = rental_revenue + excluded.rental_revenue""",
+        f"INSERT INTO Artwork_Rental_Income {_financial_summary_select('Artwork_Rental_Income', artworks)}",
+        f"INSERT INTO Restoration_Cost {_financial_summary_select('Restoration_Cost', artworks)}",
+    ])]
+
+
+def financial_summaries_cover(cursor, artwork_id):
+    """Учитывают ли сводки строки картины artwork_id. Пока миграция заполняет
+    сводки порциями и еще не дошла до картины, services не меняют ее строки в
+    сводках: их учтет сама порция"""
+    cursor.execute(f"SELECT {_backfilled(FINANCIAL_SUMMARIES_MIGRATION, 0, '?')}", (artwork_id,))
+    return bool(cursor.fetchone()[0])
+
+
+def recompute_financial_summaries(cursor):
+    """Пересчитывает финансовые сводки с нуля (в транзакции вызывающего)"""
+    _create_financial_summaries(cursor, rebuild=True)
+
+
+def find_financial_summary_mismatches(cursor):
+    """Сравнивает сводки с пересчетом по исходным таблицам.
+
+    Возвращает список (таблица, ключ, ожидаемая строка, строка сводки); None вместо
+    строки - ее нет. Пустой список - сводки согласованы.
+    """
+    mismatches = []
+    for table, (_, key_size, *_) in FINANCIAL_SUMMARIES.items():
+        cursor.execute(_financial_summary_select(table))
+        expected = {row[:key_size]: row for row in cursor.fetchall()}
+        cursor.execute(f"SELECT * FROM {table}")
+        actual = {row[:key_size]: row for row in cursor.fetchall()}
+        for key in sorted(expected.keys() | actual.keys(), key=repr):
+            want, got = expected.get(key), actual.get(key)
+            if want is None or got is None or any(
+                    abs(a - b) > FINANCIAL_SUMMARY_TOLERANCE if isinstance(a, float) or isinstance(b, float)
+                    else a != b for a, b in zip(want, got)):
+                mismatches.append((table, key, want, got))
+    return mismatches
+
+
+def _drop_availability_triggers(cursor):
+    names = [f"{source[0]}_{event}" for source in AVAILABILITY_SOURCES for event in ("insert", "delete", "update")]
+    for name in names + ["exhibition_dates", "exhibition_removed"]:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {AVAILABILITY_INDEX}_{name}")
+
+
+def _create_import_tables(cursor):
+    """Журнал массового импорта (importer.py): позиция в файле и отклоненные строки.
+
+    Порция строк, позиция и отклоненные строки фиксируются одной транзакцией,
+    поэтому прерванный импорт продолжается ровно с первой незафиксированной строки.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_progress (
+            job TEXT PRIMARY KEY,
+            kind TEXT,
+            path TEXT,
+            file_size INTEGER,
+            records_done INTEGER NOT NULL DEFAULT 0,
+            inserted INTEGER NOT NULL DEFAULT 0,
+            rejected INTEGER NOT NULL DEFAULT 0,
+            started_at TEXT,
+            updated_at TEXT,
+            finished_at TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_rejected (
+            job TEXT,
+            record INTEGER,
+            error TEXT,
+            data TEXT,
+            PRIMARY KEY (job, record)
+        ) WITHOUT ROWID
+    ''')
+
+# Журнал изменений картин: для каждой добавленной, измененной или удаленной картины -
+# номер последнего изменения. По нему ArtworkFrame (frames.py) догружает только строки,
+# изменившиеся после прошлой загрузки. Строка с ARTWORK_CHANGES_RESET вместо ID картины
+# означает, что таблицу меняли в обход журнала (массовая загрузка) и нужна полная загрузка.
+ARTWORK_CHANGES_RESET = 0
+_ARTWORK_CHANGE_UPSERT = """
+    INSERT INTO Artwork_Change (artwork_id, version)
+    VALUES ({row}.id, (SELECT IFNULL(MAX(version), 0) + 1 FROM Artwork_Change))
+    ON CONFLICT (artwork_id) DO UPDATE SET version = excluded.version;
+"""
+
+
+def _create_artwork_change_log(cursor, rebuild=False):
+    """Создает журнал изменений картин и триггеры, которые его ведут.
+    rebuild - очистить журнал и отметить, что все строки надо загрузить заново"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Artwork_Change (
+            artwork_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_artwork_change_version ON Artwork_Change (version)")
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Artwork_Change_insert AFTER INSERT ON Artwork BEGIN
+            {_ARTWORK_CHANGE_UPSERT.format(row="new")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Artwork_Change_delete AFTER DELETE ON Artwork BEGIN
+            {_ARTWORK_CHANGE_UPSERT.format(row="old")}
+        END
+    """)
+    # При смене ID старая строка исчезает, а новая появляется: отмечаем обе
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS Artwork_Change_update AFTER UPDATE ON Artwork BEGIN
+            {_ARTWORK_CHANGE_UPSERT.format(row="old")}
+            {_ARTWORK_CHANGE_UPSERT.format(row="new")}
+        END
+    """)
+    if rebuild:
+        cursor.execute("SELECT IFNULL(MAX(version), 0) + 1 FROM Artwork_Change")
+        version = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM Artwork_Change")
+        cursor.execute("INSERT INTO Artwork_Change (artwork_id, version) VALUES (?, ?)",
+                       (ARTWORK_CHANGES_RESET, version))
+
+
+def _drop_artwork_change_triggers(cursor):
+    for event in ("insert", "delete", "update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS Artwork_Change_{event}")
+
+
+@contextmanager
+def derived_indexes_deferred(conn):
+    """Отключает обновление полнотекстовых индексов и индекса занятости на время
+    массовой загрузки.
+
+    Триггеры снимаются, а по окончании создаются заново, и индексы
+    перестраиваются целиком: одна перестройка обходится в несколько раз
+    дешевле обновления индекса на каждую вставленную строку. Пока блок
+    выполняется, поиск и проверка занятости не видят новых строк.
+    Финансовые сводки загрузка в обход services не обновляет, поэтому по
+    окончании они тоже пересчитываются, а журнал изменений картин отмечает,
+    что картины нужно загрузить заново целиком.
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    _drop_search_triggers(cursor)
+    _drop_availability_triggers(cursor)
+    _drop_artwork_change_triggers(cursor)
+    conn.commit()
+    try:
+        yield
+    finally:
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            _create_search_indexes(cursor, rebuild=True)
+            _create_availability_index(cursor, rebuild=True)
+            _create_financial_summaries(cursor, rebuild=True)
+            _create_artwork_change_log(cursor, rebuild=True)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+class Migration:
+    """Шаг миграции схемы.
+
+    upgrade(cursor) выполняется в одной транзакции вместе с записью версии и
+    должен быть идемпотентным (IF NOT EXISTS и т.п.): если заполнение прервется,
+    шаг будет выполнен повторно. Данные upgrade не переносит: запись в одной
+    транзакции по всей таблице остановила бы остальных писателей до конца.
+    backfill - список пар (таблица, SQL или список SQL) для заполнения данных
+    порциями: SQL получает параметры :start и :end - диапазон rowid таблицы,
+    каждая порция фиксируется отдельной транзакцией, а достигнутая позиция
+    сохраняется, так что прерванное заполнение продолжается с места остановки.
+    Триггеры, которые поддерживают заполняемые данные, проверяют позицию через
+    _backfilled и не трогают строки, до которых заполнение еще не дошло.
+    """
+
+    def __init__(self, version, description, upgrade, backfill=()):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.backfill = list(backfill)
+
+
+# Миграции схемы в порядке применения. Новые шаги добавляются только в конец.
+MIGRATIONS = [
+    Migration(1, "Вторичные индексы", _create_indexes),
+    Migration(SEARCH_INDEX_MIGRATION, "Полнотекстовый поиск", _create_search_indexes,
+              _search_index_backfill()),
+    Migration(AVAILABILITY_MIGRATION, "Индекс занятости картин", _create_availability_index,
+              _availability_backfill()),
+    Migration(FINANCIAL_SUMMARIES_MIGRATION, "Финансовые сводки", _create_financial_summaries,
+              _financial_summary_backfill()),
+    Migration(5, "Журнал импорта", _create_import_tables),
+    Migration(6, "Журнал изменений картин", _create_artwork_change_log),
+]
+
+# Размер порции при заполнении данных и пауза между порциями,
+# чтобы другие соединения успевали писать в базу
+BACKFILL_CHUNK_SIZE = 50000
+BACKFILL_PAUSE = 0.01
+
+
+def _ensure_schema_version(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT,
+            duration_ms REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_backfill_progress (
+            version INTEGER,
+            step INTEGER,
+            position INTEGER,
+            PRIMARY KEY (version, step)
+        )
+    """)
+
+
+def get_schema_version():
+    """Возвращает номер последней примененной миграции (0 - ни одной)"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        _ensure_schema_version(cursor)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _backfilled(version, step, row_id):
+    """SQL-условие: строка row_id уже обработана шагом step заполнения миграции
+    version (или заполнение не идет). Позиция NULL - шаг завершен"""
+    return (f"NOT EXISTS (SELECT 1 FROM schema_backfill_progress "
+            f"WHERE version = {version} AND step = {step} AND position < {row_id})")
+
+
+def _register_backfill(cursor, migration):
+    """Записывает начальные позиции шагов заполнения в транзакции upgrade: с этого
+    момента триггеры пропускают строки, которые заполнит порция"""
+    for step, (table, _) in enumerate(migration.backfill):
+        cursor.execute(f"SELECT MIN(rowid) FROM {table}")
+        low = cursor.fetchone()[0]
+        cursor.execute("INSERT OR IGNORE INTO schema_backfill_progress (version, step, position) "
+                       "VALUES (?, ?, ?)", (migration.version, step, None if low is None else low - 1))
+
+
+def _run_backfill(conn, migration, step, table, sql, chunk_size):
+    """Выполняет шаг заполнения порциями по rowid, сохраняя позицию после каждой.
+
+    Граница таблицы перечитывается в каждой порции, а шаг отмечается завершенным
+    в той же транзакции, где выяснилось, что строк больше нет: строки,
+    добавленные во время заполнения, не теряются.
+    """
+    statements = [sql] if isinstance(sql, str) else sql
+    cursor = conn.cursor()
+    chunks = 0
+    while True:
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT position FROM schema_backfill_progress WHERE version = ? AND step = ?",
+                           (migration.version, step))
+            row = cursor.fetchone()
+            position = row[0] if row else None
+            cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+            high = cursor.fetchone()[0]
+            if position is None or high is None or position >= high:
+                cursor.execute("UPDATE schema_backfill_progress SET position = NULL "
+                               "WHERE version = ? AND step = ?", (migration.version, step))
+                conn.commit()
+                return chunks
+            end = position + chunk_size
+            for statement in statements:
+                cursor.execute(statement, {"start": position + 1, "end": end})
+            cursor.execute("UPDATE schema_backfill_progress SET position = ? WHERE version = ? AND step = ?",
+                           (end, migration.version, step))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        chunks += 1
+        if BACKFILL_PAUSE:
+            time.sleep(BACKFILL_PAUSE)
+
+
+def migrate(target=None, dry_run=False, chunk_size=None, log=print):
+    """Применяет недостающие миграции из MIGRATIONS по порядку.
+
+    target - версия, до которой обновлять (по умолчанию последняя).
+    dry_run - выполнить шаги и откатить их, ничего не меняя; заполнение данных пропускается.
+    Возвращает список (версия, описание, время в мс) для выполненных шагов.
+    """
+    chunk_size = chunk_size or BACKFILL_CHUNK_SIZE
+    conn = get_connection()
+    results = []
+    try:
+        cursor = conn.cursor()
+        _ensure_schema_version(cursor)
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        current = cursor.fetchone()[0]
+
+        for migration in MIGRATIONS:
+            if migration.version <= current or (target is not None and migration.version > target):
+                continue
+
+            started = time.perf_counter()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                migration.upgrade(cursor)
+                _register_backfill(cursor, migration)
+                if dry_run:
+                    conn.rollback()
+                elif not migration.backfill:
+                    _record_version(cursor, migration, started)
+                    conn.commit()
+                else:
+                    conn.commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+            if migration.backfill and not dry_run:
+                for step, (table, sql) in enumerate(migration.backfill):
+                    _run_backfill(conn, migration, step, table, sql, chunk_size)
+                cursor.execute("BEGIN IMMEDIATE")
+                _record_version(cursor, migration, started)
+                cursor.execute("DELETE FROM schema_backfill_progress WHERE version = ?", (migration.version,))
+                conn.commit()
+
+            elapsed = (time.perf_counter() - started) * 1000
+            results.append((migration.version, migration.description, elapsed))
+            if log:
+                prefix = "[проверка] " if dry_run else ""
+                log(f"{prefix}Миграция {migration.version} ({migration.description}): {elapsed:.1f} мс")
+        return results
+    finally:
+        conn.close()
+
+
+def _record_version(cursor, migration, started):
+    cursor.execute("INSERT INTO schema_version (version, description, applied_at, duration_ms) "
+                   "VALUES (?, ?, datetime('now'), ?)",
+                   (migration.version, migration.description, (time.perf_counter() - started) * 1000))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Создание и миграция базы данных галереи")
+    parser.add_argument("--target", type=int, help="версия схемы, до которой обновлять")
+    parser.add_argument("--dry-run", action="store_true", help="проверить миграции без сохранения")
+    parser.add_argument("--rebuild-summaries", action="store_true",
+                        help="пересчитать финансовые сводки по исходным таблицам")
+    parser.add_argument("--check-summaries", action="store_true",
+                        help="сверить финансовые сводки с исходными таблицами")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        migrate(target=args.target, dry_run=True)
+    else:
+        initialize_db(args.target)
+    print(f"Версия схемы: {get_schema_version()}")
+
+    conn = get_connection()
+    try:
+        if args.rebuild_summaries:
+            conn.execute("BEGIN IMMEDIATE")
+            recompute_financial_summaries(conn.cursor())
+            conn.commit()
+            print("Финансовые сводки пересчитаны")
+        if args.check_summaries:
+            mismatches = find_financial_summary_mismatches(conn.cursor())
+            for table, key, expected, actual in mismatches[:20]:
+                print(f"{table} {key}: ожидалось {expected}, в сводке {actual}")
+            print(f"Расхождений: {len(mismatches)}")
+            if mismatches:
+                raise SystemExit(1)
+    finally:
+        conn.close()
@@ -0,0 +1,401 @@
+"""
+Таблица картин в памяти по столбцам для аналитики каталога: распределения цен,
+количество картин по жанрам, статусам и художникам.
+
+Числовые столбцы хранятся в типизированных массивах (array), строковые -
+кодами в массиве и словарем значений, поэтому картина занимает несколько
+десятков байт вместо кортежа со строками. Фильтры, группировки и агрегаты
+выполняются над массивами целиком (NumPy, если установлен).
+
+    frame = ArtworkFrame.load()
+    frame.group_by("genre", status="available")
+    frame.aggregate("price", genre=("Портрет", "Пейзаж"), year_created=(1900, None))
+    frame.refresh()   # догрузить картины, измененные после загрузки
+
+Изменения берутся из журнала Artwork_Change (database.py), который ведут триггеры.
+"""
+
+import math
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress
+
+import database
+from services import DatabaseError, ValidationError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него операции выполняются циклами Python
+    np = None
+
+# Столбцы с числами: имя -> тип массива
+NUMERIC_COLUMNS = {"price": "d", "year_created": "i", "artist_id": "q"}
+# Строковые столбцы, хранящиеся кодами
+ENCODED_COLUMNS = ("status", "genre", "technique", "current_location")
+# Год создания может быть не указан: в массиве вместо NULL хранится это значение
+MISSING_YEAR = -2 ** 31
+# Строк за одно обращение к курсору при загрузке
+LOAD_BATCH_SIZE = 50000
+# Если изменилась большая доля картин, дешевле загрузить таблицу заново
+FULL_RELOAD_FRACTION = 0.1
+
+_COLUMNS = ("id",) + tuple(NUMERIC_COLUMNS) + ENCODED_COLUMNS
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM Artwork"
+
+
+class _Categories(dict):
+    """Словарь значение -> код; новое значение получает следующий код"""
+    __slots__ = ("values",)
+
+    def __init__(self):
+        super().__init__()
+        self.values = []
+
+    def __missing__(self, value):
+        code = self[value] = len(self.values)
+        self.values.append(value)
+        return code
+
+
+def _without_missing_years(values):
+    return [MISSING_YEAR if value is None else value for value in values]
+
+
+class ArtworkFrame:
+    """Картины по столбцам: ids - ID по возрастанию, numeric - числовые массивы,
+    codes и categories - коды строковых столбцов и их словари.
+
+    Экземпляр не потокобезопасен: refresh и запросы вызываются из одного потока.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.ids = array("q")
+        self.numeric = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()}
+        self.codes = {name: array("I") for name in ENCODED_COLUMNS}
+        self.categories = {name: _Categories() for name in ENCODED_COLUMNS}
+        # Номер последнего изменения из Artwork_Change, учтенного в таблице
+        self.version = 0
+
+    @classmethod
+    def load(cls):
+        """Загружает все картины"""
+        frame = cls()
+        frame._reload()
+        return frame
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        """Память под массивы столбцов (без словарей строковых значений), байт"""
+        columns = [self.ids, *self.numeric.values(), *self.codes.values()]
+        return sum(column.itemsize * len(column) for column in columns)
+
+    # Загрузка
+
+    def _read(self, operation):
+        # Строки и номер изменения читаются в одной транзакции - из одного снимка базы
+        conn = database.get_connection(profile="streaming")
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                return operation(cursor)
+            finally:
+                conn.commit()
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+        finally:
+            conn.close()
+
+    def _reload(self):
+        self._clear()
+
+        def operation(cursor):
+            cursor.execute("SELECT IFNULL(MAX(version), 0) FROM Artwork_Change")
+            version = cursor.fetchone()[0]
+            cursor.execute(f"{_SELECT} ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+                if not rows:
+                    return version
+                self._append(rows)
+
+        self.version = self._read(operation)
+
+    def _append(self, rows):
+        columns = list(zip(*rows))
+        self.ids.extend(columns[0])
+        for name, values in zip(NUMERIC_COLUMNS, columns[1:]):
+            # NULL бывает только в year_created; extend при ошибке оставляет часть значений
+            if None in values:
+                values = _without_missing_years(values)
+            self.numeric[name].extend(values)
+        offset = 1 + len(NUMERIC_COLUMNS)
+        for name, values in zip(ENCODED_COLUMNS, columns[offset:]):
+            self.codes[name].extend(map(self.categories[name].__getitem__, values))
+
+    def refresh(self):
+        """Применяет изменения картин после прошлой загрузки.
+
+        Возвращает число измененных картин; если изменений слишком много или
+        таблицу загружали в обход журнала, таблица загружается заново.
+        """
+        def operation(cursor):
+            cursor.execute(f'''
+                SELECT c.artwork_id, c.version, {", ".join(f"a.{c}" for c in _COLUMNS[1:])}
+                FROM Artwork_Change c LEFT JOIN Artwork a ON a.id = c.artwork_id
+                WHERE c.version > ?
+                ORDER BY c.artwork_id
+            ''', (self.version,))
+            return cursor.fetchall()
+
+        changes = self._read(operation)
+        if not changes:
+            return 0
+        if (changes[0][0] == database.ARTWORK_CHANGES_RESET
+                or len(changes) > FULL_RELOAD_FRACTION * max(len(self), 1)):
+            self._reload()
+            return len(changes)
+
+        ids = self.ids
+        deleted = []
+        for row in changes:
+            artwork_id = row[0]
+            position = bisect_left(ids, artwork_id)
+            present = position < len(ids) and ids[position] == artwork_id
+            # price не бывает NULL: NULL - картины больше нет
+            if row[2] is None:
+                if present:
+                    deleted.append(position)
+            elif present:
+                self._set(position, row[2:])
+            else:
+                self._insert(position, artwork_id, row[2:])
+        # Удаляем с конца, чтобы позиции остальных строк не сдвигались
+        for position in reversed(deleted):
+            del ids[position]
+            for column in (*self.numeric.values(), *self.codes.values()):
+                del column[position]
+        self.version = max(row[1] for row in changes)
+        return len(changes)
+
+    def _encode_row(self, values):
+        numbers = list(values[:len(NUMERIC_COLUMNS)])
+        if numbers[1] is None:
+            numbers[1] = MISSING_YEAR
+        codes = [self.categories[name][value]
+                 for name, value in zip(ENCODED_COLUMNS, values[len(NUMERIC_COLUMNS):])]
+        return numbers, codes
+
+    def _set(self, position, values):
+        numbers, codes = self._encode_row(values)
+        for column, value in zip(self.numeric.values(), numbers):
+            column[position] = value
+        for column, code in zip(self.codes.values(), codes):
+            column[position] = code
+
+    def _insert(self, position, artwork_id, values):
+        numbers, codes = self._encode_row(values)
+        self.ids.insert(position, artwork_id)
+        for column, value in zip(self.numeric.values(), numbers):
+            column.insert(position, value)
+        for column, code in zip(self.codes.values(), codes):
+            column.insert(position, code)
+
+    # Фильтры
+
+    def _condition(self, name, value):
+        """Условие на столбец: (массив, множество кодов или значений) или (массив, диапазон)"""
+        if name in self.codes:
+            values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+            categories = self.categories[name]
+            return self.codes[name], {categories[v] for v in values if v in categories}, None
+        if name in self.numeric:
+            if isinstance(value, tuple):
+                if len(value) != 2:
+                    raise ValidationError(f"Диапазон {name} задается парой (от, до).")
+                return self.numeric[name], None, value
+            values = value if isinstance(value, (list, set, frozenset)) else (value,)
+            return self.numeric[name], set(values), None
+        raise ValidationError(f"Неизвестный столбец: {name}")
+
+    def _mask(self, conditions):
+        """Отбор строк по условиям: маска NumPy, список позиций или None (все строки)"""
+        if not conditions:
+            return None
+        parsed = [(name, *self._condition(name, value)) for name, value in conditions.items()]
+
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            for name, column, values, bounds in parsed:
+                data = np.frombuffer(column, dtype=column.typecode)
+                if values is not None:
+                    mask &= np.isin(data, list(values))
+                    continue
+                low, high = bounds
+                if name == "year_created":
+                    mask &= data != MISSING_YEAR
+                if low is not None:
+                    mask &= data >= low
+                if high is not None:
+                    mask &= data <= high
+            return mask
+
+        positions = None
+        for name, column, values, bounds in parsed:
+            if values is not None:
+                test = values.__contains__
+            else:
+                low = -math.inf if bounds[0] is None else bounds[0]
+                high = math.inf if bounds[1] is None else bounds[1]
+                skip = MISSING_YEAR if name == "year_created" else None
+                test = lambda v, low=low, high=high, skip=skip: v != skip and low <= v <= high
+            # Первое условие проверяется по всему столбцу, следующие - по уже отобранным строкам
+            if positions is None:
+                positions = list(compress(range(len(column)), map(test, column)))
+            else:
+                positions = [i for i in positions if test(column[i])]
+        return positions
+
+    def _values(self, column, mask):
+        """Значения столбца в отобранных строках"""
+        if np is not None:
+            data = np.frombuffer(column, dtype=column.typecode)
+            return data if mask is None else data[mask]
+        return column if mask is None else [column[i] for i in mask]
+
+    def filter(self, **conditions):
+        """ID картин, удовлетворяющих условиям.
+
+        Условия - имя столбца и значение: для строковых столбцов - значение или
+        список значений; для числовых - число, список чисел или диапазон (от, до)
+        включительно, где None - без границы.
+        """
+        ids = self._values(self.ids, self._mask(conditions))
+        return ids.tolist() if np is not None else list(ids)
+
+    def count(self, **conditions):
+        mask = self._mask(conditions)
+        if mask is None:
+            return len(self)
+        return int(mask.sum()) if np is not None else len(mask)
+
+    # Агрегаты
+
+    def aggregate(self, column="price", **conditions):
+        """Количество, сумма, среднее, минимум и максимум числового столбца
+        (строки с неуказанным годом не учитываются)"""
+        if column not in self.numeric:
+            raise ValidationError(f"Агрегировать можно только числовые столбцы: {', '.join(self.numeric)}")
+        values = self._values(self.numeric[column], self._mask(conditions))
+        if column == "year_created":
+            values = values[values != MISSING_YEAR] if np is not None else \
+                [v for v in values if v != MISSING_YEAR]
+        count = len(values)
+        if not count:
+            return {"count": 0, "total": 0, "mean": None, "min": None, "max": None}
+        if np is not None:
+            total, low, high = values.sum().item(), values.min().item(), values.max().item()
+        else:
+            total, low, high = math.fsum(values) if column == "price" else sum(values), min(values), max(values)
+        return {"count": count, "total": total, "mean": total / count, "min": low, "max": high}
+
+    def group_by(self, column, **conditions):
+        """Группировка по столбцу: для каждого значения - число картин и сумма,
+        среднее, минимум и максимум цены. Строки по убыванию числа картин."""
+        if column == "price" or (column not in self.codes and column not in self.numeric):
+            raise ValidationError(f"Группировать можно по столбцам: "
+                                  f"{', '.join([*ENCODED_COLUMNS, 'year_created', 'artist_id'])}")
+        mask = self._mask(conditions)
+        keys = self._values(self.codes[column] if column in self.codes else self.numeric[column], mask)
+        prices = self._values(self.numeric["price"], mask)
+
+        if np is not None:
+            if column in self.codes:
+                labels = self.categories[column].values
+                inverse = keys.astype(np.intp)
+                size = len(labels)
+            else:
+                labels, inverse = np.unique(keys, return_inverse=True)
+                labels = labels.tolist()
+                size = len(labels)
+            counts = np.bincount(inverse, minlength=size)
+            totals = np.bincount(inverse, weights=prices, minlength=size)
+            lows = np.full(size, np.inf)
+            highs = np.full(size, -np.inf)
+            np.minimum.at(lows, inverse, prices)
+            np.maximum.at(highs, inverse, prices)
+            groups = [(labels[i], int(counts[i]), float(totals[i]), float(lows[i]), float(highs[i]))
+                      for i in np.flatnonzero(counts).tolist()]
+        else:
+            stats = {}
+            for key, price in zip(keys, prices):
+                group = stats.get(key)
+                if group is None:
+                    stats[key] = [1, price, price, price]
+                else:
+                    group[0] += 1
+                    group[1] += price
+                    if price < group[2]:
+                        group[2] = price
+                    elif price > group[3]:
+                        group[3] = price
+            labels = self.categories[column].values if column in self.codes else None
+            groups = [(labels[key] if labels is not None else key, *group) for key, group in stats.items()]
+
+        rows = [{column: None if key == MISSING_YEAR and column == "year_created" else key,
+                 "count": count, "price_total": total, "price_mean": total / count,
+                 "price_min": low, "price_max": high}
+                for key, count, total, low, high in groups]
+        rows.sort(key=lambda row: (-row["count"], str(row[column])))
+        return rows
+
+    def value_counts(self, column, **conditions):
+        """Число картин по значениям строкового столбца: {значение: количество}"""
+        if column not in self.codes:
+            raise ValidationError(f"Значения считаются по строковым столбцам: {', '.join(ENCODED_COLUMNS)}")
+        codes = self._values(self.codes[column], self._mask(conditions))
+        labels = self.categories[column].values
+        if np is not None:
+            counts = np.bincount(codes.astype(np.intp), minlength=len(labels))
+            return {labels[i]: int(counts[i]) for i in np.flatnonzero(counts).tolist()}
+        return {labels[code]: count for code, count in Counter(codes).items()}
+
+    def histogram(self, column="price", bins=10, **conditions):
+        """Распределение числового столбца: bins - число равных интервалов или
+        список границ. Последний интервал включает правую границу."""
+        if column not in self.numeric:
+            raise ValidationError(f"Распределение строится по числовым столбцам: {', '.join(self.numeric)}")
+        values = self._values(self.numeric[column], self._mask(conditions))
+        if column == "year_created":
+            values = values[values != MISSING_YEAR] if np is not None else \
+                [v for v in values if v != MISSING_YEAR]
+        if isinstance(bins, int):
+            if bins <= 0:
+                raise ValidationError("Число интервалов должно быть положительным.")
+            if not len(values):
+                return []
+            low, high = (values.min().item(), values.max().item()) if np is not None else (min(values), max(values))
+            if low == high:
+                low, high = low - 0.5, high + 0.5
+            edges = [low + (high - low) * i / bins for i in range(bins)] + [high]
+        else:
+            edges = list(bins)
+            if len(edges) < 2 or edges != sorted(edges):
+                raise ValidationError("Границы интервалов должны возрастать.")
+
+        if np is not None:
+            counts = np.histogram(values, bins=edges)[0].tolist()
+        else:
+            counts = [0] * (len(edges) - 1)
+            last = len(counts) - 1
+            for value in values:
+                if edges[0] <= value <= edges[-1]:
+                    counts[min(bisect_right(edges, value) - 1, last)] += 1
+        return [{"low": edges[i], "high": edges[i + 1], "count": count} for i, count in enumerate(counts)]
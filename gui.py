@@ -1,9 +1,14 @@
 from PyQt5.QtWidgets import (QWidget, QLabel, QTabWidget, QTextEdit,
                              QComboBox, QSpinBox, QDateEdit, QFormLayout, QLineEdit,
                              QDoubleSpinBox, QMessageBox, QDialog, QVBoxLayout, QTableWidget,
-                             QTableWidgetItem, QPushButton, QSizePolicy, QHBoxLayout)
-from PyQt5.QtCore import QDate
+                             QTableWidgetItem, QPushButton, QSizePolicy, QHBoxLayout, QTableView,
+                             QProgressBar, QCheckBox, QFileDialog)
+from PyQt5.QtCore import (QDate, Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable,
+                          QThreadPool, QTimer, pyqtSignal)
+import threading
+import time
 import services
+from models import Artwork
 
 STATUS_TRANSLATION = {
         "Acquired": "Приобретена",
@@ -15,19 +20,513 @@ STATUS_TRANSLATION = {
         "On Exhibition": "На выставке"
     }
 
+SEARCH_KIND_LABELS = {
+    "artworks": "Картина",
+    "artists": "Художник",
+    "visitor_reviews": "Отзыв посетителя",
+    "press_reviews": "Отзыв прессы",
+}
+
+DIAGNOSTICS_HEADERS = ["Функция", "Запрос", "Вызовы", "Строки", "Всего, мс",
+                       "Среднее, мс", "p95, мс", "Максимум, мс"]
+DIAGNOSTICS_REFRESH_MS = 2000
+
+EXPORT_SOURCE_LABELS = {
+    "Artwork": "Картины",
+    "Artist": "Художники",
+    "Exhibition": "Выставки",
+    "Visitor": "Посетители",
+    "Movement": "Перемещения",
+    "Material": "Материалы",
+    "Sale": "Продажи (таблица)",
+    "Rental": "Аренды",
+    "Restoration": "Реставрации (таблица)",
+    "Document": "Документы (таблица)",
+    "Visitor_Review": "Отзывы посетителей",
+    "Press_Review": "Отзывы прессы",
+    "sales": "Продажи с названиями картин",
+    "restorations": "Реставрации с названиями картин",
+    "documents": "Документы с файлами",
+}
+
+
+class TaskSignals(QObject):
+    """Сигналы фоновой задачи; доставляются в главный поток через очередь событий"""
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+class ProgressSignals(QObject):
+    """Прогресс фоновой задачи (сделано, всего); emit можно вызывать из любого потока"""
+    progress = pyqtSignal(int, int)
+
+
+class Task(QRunnable):
+    """Вызов func(*args, **kwargs) в потоке из QThreadPool"""
+
+    def __init__(self, func, args, kwargs):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        # Задача удаляется вместе с Python-объектом, а не пулом после run()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class TaskRunner(QObject):
+    """Выполняет вызовы services в фоне, не блокируя главный поток.
+
+    Запросы группируются по ключу. Чтение (run): новый запрос с тем же ключом
+    снимает из очереди еще не начатый предыдущий, а результат уже
+    выполняющегося отбрасывается. Изменение (run_write) не отменяется: пока
+    оно не завершено, новое с тем же ключом игнорируется, поэтому повторный
+    щелчок не добавляет вторую запись. busy_changed сообщает, идут ли фоновые задачи.
+    """
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._generations = {}
+        self._pending = {}
+        self._writes = {}
+        self._tasks = set()
+
+    def is_busy(self):
+        return bool(self._tasks)
+
+    def run(self, key, func, *args, on_result=None, on_error=None, **kwargs):
+        """Ставит чтение func(*args, **kwargs) в очередь; on_result/on_error вызываются в главном потоке"""
+        self.cancel(key)
+        generation = self._generations[key]
+
+        task = Task(func, args, kwargs)
+        task.signals.result.connect(lambda value: self._deliver(key, generation, on_result, value))
+        task.signals.error.connect(lambda error: self._deliver(key, generation, on_error, error))
+        return self._start(key, task, self._pending)
+
+    def run_write(self, key, func, *args, on_result=None, on_error=None, **kwargs):
+        """Ставит изменение func(*args, **kwargs) в очередь. Если изменение с ключом key
+        еще выполняется, вызов игнорируется и возвращает None"""
+        if key in self._writes:
+            return None
+
+        task = Task(func, args, kwargs)
+        if on_result is not None:
+            task.signals.result.connect(on_result)
+        if on_error is not None:
+            task.signals.error.connect(on_error)
+        return self._start(key, task, self._writes)
+
+    def cancel(self, key):
+        """Отменяет чтение с ключом key: снимает его из очереди или игнорирует результат"""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        task = self._pending.pop(key, None)
+        if task is not None and self.pool.tryTake(task):
+            self._finish(key, task, self._pending)
+
+    def _start(self, key, task, tasks):
+        task.signals.finished.connect(lambda: self._finish(key, task, tasks))
+        tasks[key] = task
+        self._tasks.add(task)
+        if len(self._tasks) == 1:
+            self.busy_changed.emit(True)
+        self.pool.start(task)
+        return task
+
+    def _deliver(self, key, generation, callback, value):
+        if callback is not None and self._generations.get(key) == generation:
+            callback(value)
+
+    def _finish(self, key, task, tasks):
+        if tasks.get(key) is task:
+            del tasks[key]
+        if task in self._tasks:
+            self._tasks.remove(task)
+            if not self._tasks:
+                self.busy_changed.emit(False)
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Модель таблицы, подгружающая строки страницами по мере прокрутки.
+
+    page_loader(token, limit) возвращает (строки, токен следующей страницы),
+    как services.get_*_page. Представление запрашивает данные только для видимых
+    ячеек, а новые страницы - через canFetchMore/fetchMore при прокрутке вниз.
+    Если передан runner (TaskRunner), страницы загружаются в фоновом потоке.
+    """
+
+    def __init__(self, page_loader, headers, page_size=200, parent=None, runner=None):
+        super().__init__(parent)
+        self.page_loader = page_loader
+        self.headers = headers
+        self.page_size = page_size
+        self.runner = runner
+        self._rows = []
+        self._token = None
+        self._exhausted = False
+        self._loading = False
+        self._task_key = f"page-{id(self)}"
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def display_value(self, column, value):
+        """Текст ячейки; переопределяется для перевода значений"""
+        return str(value)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.display_value(index.column(), self._rows[index.row()][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.headers):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._loading:
+            return
+        if self.runner is None:
+            self._append_page(self.page_loader(self._token, self.page_size))
+            return
+        self._loading = True
+        self.runner.run(self._task_key, self.page_loader, self._token, self.page_size,
+                        on_result=self._append_page, on_error=self._page_failed)
+
+    def cancel_loading(self):
+        """Отменяет фоновую загрузку страницы, например при закрытии окна"""
+        if self.runner is not None:
+            self.runner.cancel(self._task_key)
+        self._loading = False
+
+    def _page_failed(self, error):
+        # Повторять запрос при каждой прокрутке бессмысленно
+        self._loading = False
+        self._exhausted = True
+        print(f"Ошибка: {error}")
+
+    def _append_page(self, page):
+        rows, self._token = page
+        self._loading = False
+        self._exhausted = self._token is None
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+
+class ArtworkTableModel(PagedTableModel):
+    """Список картин с переводом статуса на русский язык"""
+    HEADERS = ["ID", "Название", "Год", "Техника", "Размеры", "Описание",
+               "Жанр", "Локация", "Статус", "ID Художника", "Цена"]
+    STATUS_COLUMN = Artwork._fields.index("status")
+
+    def __init__(self, page_size=200, parent=None, runner=None):
+        super().__init__(services.get_artworks_page, self.HEADERS, page_size, parent, runner)
+
+    def display_value(self, column, value):
+        if column == self.STATUS_COLUMN:
+            return STATUS_TRANSLATION.get(value, value)
+        return str(value)
+
+
 class ArtGalleryApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Art Gallery Management")
         self.setGeometry(100, 100, 1000, 800)
 
+        # Запросы к базе выполняются в фоне, пока они идут - показываем индикатор
+        self.runner = TaskRunner(parent=self)
+        self.busy_indicator = QProgressBar()
+        self.busy_indicator.setRange(0, 0)
+        self.busy_indicator.setTextVisible(False)
+        self.busy_indicator.setFixedHeight(6)
+        self.busy_indicator.hide()
+        self.runner.busy_changed.connect(self.set_busy)
+
+        # Поиск запускается после паузы в наборе, а не на каждую букву
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по картинам, художникам и отзывам")
+        self.search_results = QTextEdit()
+        self.search_results.setReadOnly(True)
+        self.search_results.setMaximumHeight(150)
+        self.search_results.hide()
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
+        self.search_input.returnPressed.connect(self.run_search)
+
+        self.diagnostics_button = QPushButton("Диагностика")
+        self.diagnostics_button.clicked.connect(self.open_diagnostics)
+        self.diagnostics_dialog = None
+
+        self.export_button = QPushButton("Экспорт")
+        self.export_button.clicked.connect(self.open_export_dialog)
+        self.export_dialog = None
+        self.export_cancel = None
+        self.export_signals = ProgressSignals(self)
+        self.export_signals.progress.connect(self.show_export_progress)
+
         self.tabs = QTabWidget()
         self.init_tabs()
 
+        top_layout = QHBoxLayout()
+        top_layout.addWidget(self.search_input)
+        top_layout.addWidget(self.diagnostics_button)
+        top_layout.addWidget(self.export_button)
+
         layout = QVBoxLayout()
+        layout.addLayout(top_layout)
+        layout.addWidget(self.search_results)
         layout.addWidget(self.tabs)
+        layout.addWidget(self.busy_indicator)
         self.setLayout(layout)
 
+    def set_busy(self, busy):
+        self.busy_indicator.setVisible(busy)
+        if busy:
+            self.setCursor(Qt.BusyCursor)
+        else:
+            self.unsetCursor()
+
+    def run_task(self, key, func, *args, on_result=None, on_error=None, **kwargs):
+        """Выполняет чтение func в фоне; по умолчанию ошибки показываются через show_service_error"""
+        return self.runner.run(key, func, *args, on_result=on_result,
+                               on_error=on_error or self.show_service_error, **kwargs)
+
+    def run_write_task(self, key, func, *args, on_result=None, on_error=None, **kwargs):
+        """Выполняет изменение func в фоне; повторный вызов, пока оно идет, игнорируется"""
+        return self.runner.run_write(key, func, *args, on_result=on_result,
+                                     on_error=on_error or self.show_service_error, **kwargs)
+
+    def run_search(self):
+        self.search_timer.stop()
+        query = self.search_input.text().strip()
+        if not query:
+            self.runner.cancel("search")
+            self.search_results.clear()
+            self.search_results.hide()
+            return
+        self.run_task("search", services.search, query, on_result=self.show_search_results,
+                      on_error=lambda e: self.show_search_text(f"Ошибка: {e}"))
+
+    def show_search_results(self, results):
+        if not results:
+            self.show_search_text("Ничего не найдено.")
+            return
+        self.show_search_text("\n".join(
+            f"{SEARCH_KIND_LABELS[kind]} (ID {row_id}): {title} — {snippet}"
+            for kind, row_id, title, snippet, _ in results
+        ))
+
+    def show_search_text(self, text):
+        self.search_results.setPlainText(text)
+        self.search_results.show()
+
+    def open_diagnostics(self):
+        """Немодальная панель статистики запросов к базе; обновляется, пока открыта"""
+        if self.diagnostics_dialog is not None:
+            self.diagnostics_dialog.raise_()
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Диагностика базы данных")
+        dialog.resize(900, 600)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+
+        self.diagnostics_summary = QLabel()
+        self.diagnostics_table = QTableWidget(0, len(DIAGNOSTICS_HEADERS))
+        self.diagnostics_table.setHorizontalHeaderLabels(DIAGNOSTICS_HEADERS)
+        self.diagnostics_slow = QTextEdit()
+        self.diagnostics_slow.setReadOnly(True)
+
+        refresh_button = QPushButton("Обновить")
+        refresh_button.clicked.connect(self.refresh_diagnostics)
+        reset_button = QPushButton("Сбросить")
+        reset_button.clicked.connect(lambda: (services.reset_db_stats(), self.refresh_diagnostics()))
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(reset_button)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.diagnostics_summary)
+        layout.addWidget(self.diagnostics_table)
+        layout.addWidget(QLabel("Медленные запросы:"))
+        layout.addWidget(self.diagnostics_slow)
+        layout.addLayout(button_layout)
+        dialog.setLayout(layout)
+
+        timer = QTimer(dialog)
+        timer.setInterval(DIAGNOSTICS_REFRESH_MS)
+        timer.timeout.connect(self.refresh_diagnostics)
+        timer.start()
+        dialog.finished.connect(lambda: setattr(self, "diagnostics_dialog", None))
+
+        self.diagnostics_dialog = dialog
+        self.refresh_diagnostics()
+        dialog.show()
+
+    def refresh_diagnostics(self):
+        # Статистика хранится в памяти процесса, поэтому читается без фоновой задачи
+        stats = services.get_db_stats()
+        pool, cache = stats["pool"], stats["cache"]
+        self.diagnostics_summary.setText(
+            f"Соединений занято: {pool['in_use']} из {pool['max_size']}, ожиданий: {pool['waits']}. "
+            f"Кэш справочников: попаданий {cache['hits']}, промахов {cache['misses']}. "
+            f"Порог медленного запроса: {stats['slow_query_ms']:g} мс."
+        )
+
+        queries = stats["queries"]
+        self.diagnostics_table.setRowCount(len(queries))
+        for row, query in enumerate(queries):
+            values = [query["function"], query["sql"], query["calls"], query["rows"],
+                      f"{query['total_ms']:.1f}", f"{query['mean_ms']:.3f}",
+                      f"{query['p95_ms']:.3f}", f"{query['max_ms']:.3f}"]
+            for column, value in enumerate(values):
+                self.diagnostics_table.setItem(row, column, QTableWidgetItem(str(value)))
+
+        self.diagnostics_slow.setPlainText("\n\n".join(
+            f"{time.strftime('%H:%M:%S', time.localtime(slow['time']))} {slow['function']}: "
+            f"{slow['elapsed_ms']:.1f} мс, строк {slow['rows']}\n{slow['sql']}\n"
+            + "\n".join(slow["plan"] or [])
+            for slow in reversed(stats["slow_queries"])
+        ))
+
+    def open_export_dialog(self):
+        """Немодальный диалог выгрузки таблицы в CSV или JSON Lines; экспорт идет в фоне"""
+        if self.export_dialog is not None:
+            self.export_dialog.raise_()
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Экспорт данных")
+        dialog.resize(600, 250)
+        dialog.setAttribute(Qt.WA_DeleteOnClose)
+
+        self.export_source = QComboBox()
+        for source, label in EXPORT_SOURCE_LABELS.items():
+            self.export_source.addItem(label, source)
+        self.export_format = QComboBox()
+        self.export_format.addItem("CSV", "csv")
+        self.export_format.addItem("JSON Lines", "jsonl")
+        self.export_compress = QCheckBox("Сжать (gzip)")
+        self.export_path = QLineEdit()
+        browse_button = QPushButton("Обзор...")
+        browse_button.clicked.connect(self.choose_export_path)
+        path_layout = QHBoxLayout()
+        path_layout.addWidget(self.export_path)
+        path_layout.addWidget(browse_button)
+
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setRange(0, 100)
+        self.export_status = QLabel()
+        self.export_start_button = QPushButton("Экспортировать")
+        self.export_start_button.clicked.connect(self.start_export)
+        cancel_button = QPushButton("Отменить")
+        cancel_button.clicked.connect(self.cancel_export)
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.export_start_button)
+        button_layout.addWidget(cancel_button)
+
+        form = QFormLayout()
+        form.addRow("Данные:", self.export_source)
+        form.addRow("Формат:", self.export_format)
+        form.addRow("", self.export_compress)
+        form.addRow("Файл:", path_layout)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form)
+        layout.addWidget(self.export_progress_bar)
+        layout.addWidget(self.export_status)
+        layout.addLayout(button_layout)
+        dialog.setLayout(layout)
+
+        # Закрытие диалога прерывает незаконченный экспорт
+        dialog.finished.connect(lambda: (self.cancel_export(), setattr(self, "export_dialog", None)))
+        self.export_dialog = dialog
+        dialog.show()
+
+    def choose_export_path(self):
+        fmt = self.export_format.currentData()
+        suffix = f".{fmt}.gz" if self.export_compress.isChecked() else f".{fmt}"
+        path, _ = QFileDialog.getSaveFileName(self.export_dialog, "Сохранить как",
+                                              self.export_source.currentData() + suffix)
+        if path:
+            self.export_path.setText(path)
+
+    def start_export(self):
+        path = self.export_path.text().strip()
+        if not path:
+            self.show_error_message("Ошибка", "Укажите файл для экспорта.")
+            return
+
+        def done(written):
+            self.export_cancel = None
+            if self.export_dialog is None:
+                return
+            self.export_start_button.setEnabled(True)
+            if written is None:
+                self.export_status.setText("Экспорт отменен.")
+            else:
+                self.export_progress_bar.setValue(100)
+                self.export_status.setText(f"Выгружено строк: {written}. Файл: {path}")
+
+        def failed(error):
+            self.export_cancel = None
+            if self.export_dialog is not None:
+                self.export_start_button.setEnabled(True)
+                self.export_status.setText("Ошибка экспорта.")
+            self.show_service_error(error)
+
+        self.export_cancel = threading.Event()
+        self.export_start_button.setEnabled(False)
+        self.export_progress_bar.setValue(0)
+        self.export_status.setText("Экспорт...")
+        self.run_task("export", services.export_rows, self.export_source.currentData(), path,
+                      self.export_format.currentData(), self.export_compress.isChecked(),
+                      progress=self.export_signals.progress.emit, cancel=self.export_cancel,
+                      on_result=done, on_error=failed)
+
+    def cancel_export(self):
+        if self.export_cancel is not None:
+            self.export_cancel.set()
+
+    def show_export_progress(self, written, total):
+        if self.export_dialog is None:
+            return
+        self.export_progress_bar.setValue(written * 100 // total if total else 100)
+        self.export_status.setText(f"Выгружено строк: {written} из {total}")
+
+    def show_service_error(self, error):
+        if isinstance(error, (services.ValidationError, ValueError)):
+            self.show_error_message("Ошибка валидации", str(error))
+        elif isinstance(error, services.DatabaseError):
+            self.show_error_message("Ошибка базы данных", str(error))
+        else:
+            self.show_error_message("Неизвестная ошибка", str(error))
+
     def init_tabs(self):
         self.tabs.addTab(self.create_artwork_tab(), "Картины")
         self.tabs.addTab(self.create_artist_tab(), "Художники")
@@ -64,13 +563,13 @@ class ArtGalleryApp(QWidget):
         return widget
 
     def show_artists(self):
-        try:
-            artists = services.get_artists()
+        def show(artists):
             self.artist_list.clear()
             for artist in artists:
-                self.artist_list.append(str(artist))
-        except Exception as e:
-            self.artist_list.setText(f"Ошибка: {e}")
+                self.artist_list.append(f"ID: {artist.id}, Имя: {artist.name}, Биография: {artist.biography}")
+
+        self.run_task("artists", services.get_artists, on_result=show,
+                      on_error=lambda e: self.artist_list.setText(f"Ошибка: {e}"))
 
     def open_add_artist_dialog(self):
         dialog = QDialog(self)
@@ -92,23 +591,18 @@ class ArtGalleryApp(QWidget):
         dialog.exec_()
 
     def add_artist(self, dialog, name_input, biography_input):
-        try:
-            name = name_input.text()
-            biography = biography_input.toPlainText()
+        name = name_input.text()
+        biography = biography_input.toPlainText()
 
-            if not name or not biography:
-                self.show_error_message("Ошибка", "Все поля должны быть заполнены.")
-                return
+        if not name or not biography:
+            self.show_error_message("Ошибка", "Все поля должны быть заполнены.")
+            return
 
-            artist_id = services.add_artist(name, biography)
+        def done(artist_id):
             self.show_info_message("Успех", f"Художник с ID {artist_id} добавлен.")
             dialog.accept()
-        except services.ValidationError as e:
-            self.show_error_message("Ошибка валидации", str(e))
-        except services.DatabaseError as e:
-            self.show_error_message("Ошибка базы данных", str(e))
-        except Exception as e:
-            self.show_error_message("Неизвестная ошибка", str(e))
+
+        self.run_write_task("add_artist", services.add_artist, name, biography, on_result=done)
 
     def open_delete_artist_dialog(self):
         dialog = QDialog(self)
@@ -130,15 +624,15 @@ class ArtGalleryApp(QWidget):
     def delete_artist(self, dialog, artist_id_input):
         try:
             artist_id = int(artist_id_input.text())
-            services.delete_artist(artist_id)
+        except ValueError as e:
+            self.show_service_error(e)
+            return
+
+        def done(_):
             self.show_info_message("Успех", f"Художник с ID {artist_id} удален.")
             dialog.accept()
-        except services.ValidationError as e:
-            self.show_error_message("Ошибка валидации", str(e))
-        except services.DatabaseError as e:
-            self.show_error_message("Ошибка базы данных", str(e))
-        except Exception as e:
-            self.show_error_message("Неизвестная ошибка", str(e))
+
+        self.run_write_task("delete_artist", services.delete_artist, artist_id, on_result=done)
 
     def create_artwork_tab(self):
         widget = QWidget()
@@ -217,22 +711,24 @@ class ArtGalleryApp(QWidget):
     def add_artwork(self, dialog, title_input, year_input, technique_input,
                     height_input, width_input, description_input,
                     genre_input, artist_id_input, provenance_input, price_input):
-        try:
-            artwork_id = services.acquire_artwork(
-                title=title_input.text(),
-                year_created=year_input.value(),
-                technique=technique_input.text(),
-                dimensions=f"{height_input.text()}x{width_input.text()}",
-                description=description_input.toPlainText(),
-                genre=genre_input.text(),
-                artist_id=artist_id_input.value(),
-                provenance_entry=provenance_input.toPlainText(),
-                price=price_input.value()
-            )
+        def done(artwork_id):
             print(f"Картина добавлена с ID {artwork_id}")
             dialog.accept()
-        except Exception as e:
-            print(f"Ошибка: {e}")
+
+        self.run_write_task(
+            "add_artwork", services.acquire_artwork,
+            title=title_input.text(),
+            year_created=year_input.value(),
+            technique=technique_input.text(),
+            dimensions=f"{height_input.text()}x{width_input.text()}",
+            description=description_input.toPlainText(),
+            genre=genre_input.text(),
+            artist_id=artist_id_input.value(),
+            provenance_entry=provenance_input.toPlainText(),
+            price=price_input.value(),
+            on_result=done,
+            on_error=lambda e: print(f"Ошибка: {e}")
+        )
 
     def open_delete_artwork_dialog(self):
         dialog = QDialog(self)
@@ -254,17 +750,20 @@ class ArtGalleryApp(QWidget):
     def delete_artwork(self, dialog, artwork_id_input):
         try:
             artwork_id = int(artwork_id_input.text())
-            services.delete_artwork(artwork_id)
+        except ValueError as e:
+            self.show_service_error(e)
+            return
+
+        def done(_):
             self.show_info_message("Успех", f"Картина с ID {artwork_id} удалена.")
             dialog.accept()
-        except services.ValidationError as e:
-            self.show_error_message("Ошибка валидации", str(e))
-        except services.DatabaseError as e:
-            self.show_error_message("Ошибка базы данных", str(e))
-        except Exception as e:
-            self.show_error_message("Неизвестная ошибка", str(e))
 
-    def show_error_message(self, title, message):
+        self.run_write_task("delete_artwork", services.delete_artwork, artwork_id, on_result=done)
+
+    def show_error_message(self, title, message=None):
+        # Вызывается и как show_error_message(текст), и с отдельным заголовком
+        if message is None:
+            title, message = "Ошибка", title
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Critical)
         msg.setWindowTitle(title)
@@ -280,33 +779,23 @@ class ArtGalleryApp(QWidget):
 
     def show_all_artworks_dialog(self):
         try:
-            artworks = services.get_artworks()
-
             dialog = QDialog(self)
             dialog.setWindowTitle("Список картин")
             dialog.setGeometry(200, 200, 1000, 400)
             layout = QVBoxLayout()
 
-            table = QTableWidget()
-            table.setRowCount(len(artworks))
-            table.setColumnCount(len(artworks[0]) if artworks else 0)
-            table.setHorizontalHeaderLabels(
-                ["ID", "Название", "Год", "Техника", "Размеры", "Описание",
-                 "Жанр", "Локация", "Статус", "ID Художника", "Цена"]
-            )
-
-            for row_idx, row_data in enumerate(artworks):
-                for col_idx, item in enumerate(row_data):
-                    # Переводим статус на русский язык
-                    if col_idx == 8:  # Индекс столбца "Статус"
-                        translated_status = STATUS_TRANSLATION.get(item, item)
-                        table.setItem(row_idx, col_idx, QTableWidgetItem(translated_status))
-                    else:
-                        table.setItem(row_idx, col_idx, QTableWidgetItem(str(item)))
+            # Строки подгружаются страницами при прокрутке, а не все сразу
+            table = QTableView()
+            model = ArtworkTableModel(parent=dialog, runner=self.runner)
+            table.setModel(model)
+            if model.canFetchMore():
+                model.fetchMore()
 
             layout.addWidget(table)
             dialog.setLayout(layout)
             dialog.exec_()
+            # Страница, запрошенная перед закрытием, уже не нужна
+            model.cancel_loading()
 
         except Exception as e:
             print(f"Ошибка: {e}")
@@ -338,13 +827,17 @@ class ArtGalleryApp(QWidget):
             # Проверяем, что статус существует в словаре перевода
             if new_status not in STATUS_TRANSLATION:
                 raise services.ValidationError("Выбран некорректный статус.")
+        except Exception as e:
+            self.show_error_message("Ошибка", str(e))
+            return
 
-            services.update_artwork_status(artwork_id, new_status)
+        def done(_):
             self.show_info_message("Успех",
                                    f"Статус картины с ID {artwork_id} обновлен на '{STATUS_TRANSLATION[new_status]}'.")
             dialog.accept()
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+
+        self.run_write_task("update_artwork_status", services.update_artwork_status, artwork_id, new_status,
+                            on_result=done, on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def open_update_price_dialog(self):
         dialog = QDialog(self)
@@ -369,12 +862,17 @@ class ArtGalleryApp(QWidget):
     def update_artwork_price(self, dialog, artwork_id_input, price_input):
         try:
             artwork_id = int(artwork_id_input.text())
-            new_price = price_input.value()
-            services.update_artwork_price(artwork_id, new_price)
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return
+        new_price = price_input.value()
+
+        def done(_):
             print(f"Цена картины с ID {artwork_id} обновлена на {new_price}")
             dialog.accept()
-        except Exception as e:
-            print(f"Ошибка: {e}")
+
+        self.run_write_task("update_artwork_price", services.update_artwork_price, artwork_id, new_price,
+                            on_result=done, on_error=lambda e: print(f"Ошибка: {e}"))
 
     def create_exhibition_tab(self):
         widget = QWidget()
@@ -401,16 +899,16 @@ class ArtGalleryApp(QWidget):
         return widget
 
     def show_exhibitions(self):
-        try:
-            exhibitions = services.get_exhibitions()
+        def show(exhibitions):
             self.exhibition_list.clear()
             for exhibition in exhibitions:
                 self.exhibition_list.append(
-                    f"ID: {exhibition[0]}, Название: {exhibition[1]}, Тема: {exhibition[2]}, "
-                    f"Дата начала: {exhibition[3]}, Дата окончания: {exhibition[4]}"
+                    f"ID: {exhibition.id}, Название: {exhibition.title}, Тема: {exhibition.theme}, "
+                    f"Дата начала: {exhibition.start_date}, Дата окончания: {exhibition.end_date}"
                 )
-        except Exception as e:
-            self.exhibition_list.setText(f"Ошибка: {e}")
+
+        self.run_task("exhibitions", services.get_exhibitions, on_result=show,
+                      on_error=lambda e: self.exhibition_list.setText(f"Ошибка: {e}"))
 
     def open_create_exhibition_dialog(self):
         dialog = QDialog(self)
@@ -442,17 +940,17 @@ class ArtGalleryApp(QWidget):
         dialog.exec_()
 
     def create_exhibition(self, dialog, title_input, theme_input, start_date_input, end_date_input):
-        try:
-            title = title_input.text()
-            theme = theme_input.text()
-            start_date = start_date_input.date().toString("yyyy-MM-dd")
-            end_date = end_date_input.date().toString("yyyy-MM-dd")
+        title = title_input.text()
+        theme = theme_input.text()
+        start_date = start_date_input.date().toString("yyyy-MM-dd")
+        end_date = end_date_input.date().toString("yyyy-MM-dd")
 
-            exhibition_id = services.create_exhibition(title, theme, start_date, end_date)
+        def done(exhibition_id):
             print(f"Выставка создана с ID {exhibition_id}")
             dialog.accept()
-        except Exception as e:
-            print(f"Ошибка: {e}")
+
+        self.run_write_task("create_exhibition", services.create_exhibition, title, theme, start_date, end_date,
+                            on_result=done, on_error=lambda e: print(f"Ошибка: {e}"))
 
     def open_add_artwork_to_exhibition_dialog(self):
         dialog = QDialog(self)
@@ -478,12 +976,16 @@ class ArtGalleryApp(QWidget):
         try:
             exhibition_id = int(exhibition_id_input.text())
             artwork_id = int(artwork_id_input.text())
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return
 
-            services.add_artwork_to_exhibition(exhibition_id, artwork_id)
+        def done(_):
             print(f"Картина с ID {artwork_id} добавлена на выставку с ID {exhibition_id}")
             dialog.accept()
-        except Exception as e:
-            print(f"Ошибка: {e}")
+
+        self.run_write_task("add_artwork_to_exhibition", services.add_artwork_to_exhibition, exhibition_id, artwork_id,
+                            on_result=done, on_error=lambda e: print(f"Ошибка: {e}"))
 
     def create_sale_tab(self):
         widget = QWidget()
@@ -555,12 +1057,9 @@ class ArtGalleryApp(QWidget):
             self.show_error_message("Ошибка", "Введите корректную цену.")
             return
 
-        try:
-            services.sell_artwork(artwork_id, buyer_name, sale_price)
-            self.show_info_message("Успех", f"Картина с ID {artwork_id} успешно продана.")
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
-
+        self.run_write_task("sell_artwork", services.sell_artwork, artwork_id, buyer_name, sale_price,
+                            on_result=lambda _: self.show_info_message("Успех", f"Картина с ID {artwork_id} успешно продана."),
+                            on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def open_rent_window(self):
         rent_window = QDialog()
@@ -609,15 +1108,12 @@ class ArtGalleryApp(QWidget):
             self.show_error_message("Ошибка", "Дата окончания аренды должна быть позже даты начала.")
             return
 
-        try:
-            services.rent_artwork(artwork_id, renter_name, start_date, end_date)
-            self.show_info_message("Успех", f"Картина с ID {artwork_id} успешно арендована.")
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+        self.run_write_task("rent_artwork", services.rent_artwork, artwork_id, renter_name, start_date, end_date,
+                            on_result=lambda _: self.show_info_message("Успех", f"Картина с ID {artwork_id} успешно арендована."),
+                            on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def show_sales(self):
-        try:
-            sales = services.get_sales()
+        def show(sales):
             if not sales:
                 self.show_info_message("Информация", "Нет записей о продажах.")
                 return
@@ -640,8 +1136,9 @@ class ArtGalleryApp(QWidget):
             layout.addWidget(table)
             dialog.setLayout(layout)
             dialog.exec_()
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+
+        self.run_task("sales", services.get_sales, on_result=show,
+                      on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def create_movement_tab(self):
         widget = QWidget()
@@ -673,8 +1170,7 @@ class ArtGalleryApp(QWidget):
         return widget
 
     def show_movements(self):
-        try:
-            movements = services.get_movements()
+        def show(movements):
             if not movements:
                 self.show_info_message("Информация", "Нет записей о перемещениях.")
                 return
@@ -696,8 +1192,9 @@ class ArtGalleryApp(QWidget):
             layout.addWidget(table)
             dialog.setLayout(layout)
             dialog.exec_()
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+
+        self.run_task("movements", services.get_movements, on_result=show,
+                      on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def open_movement_window(self):
         movement_window = QDialog()
@@ -735,11 +1232,10 @@ class ArtGalleryApp(QWidget):
             self.show_error_message("Ошибка", "Все поля должны быть заполнены.")
             return
 
-        try:
-            services.record_movement(artwork_id, from_location, to_location, purpose, responsible_person)
-            self.show_info_message("Успех", f"Перемещение картины с ID {artwork_id} записано.")
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+        self.run_write_task("record_movement", services.record_movement,
+                            artwork_id, from_location, to_location, purpose, responsible_person,
+                            on_result=lambda _: self.show_info_message("Успех", f"Перемещение картины с ID {artwork_id} записано."),
+                            on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def create_visitor_tab(self):
         widget = QWidget()
@@ -817,8 +1313,7 @@ class ArtGalleryApp(QWidget):
         return widget
 
     def show_restorations(self):
-        try:
-            restorations = services.get_restorations()
+        def show(restorations):
             if not restorations:
                 self.show_info_message("Информация", "Нет записей о реставрациях.")
                 return
@@ -840,8 +1335,9 @@ class ArtGalleryApp(QWidget):
             layout.addWidget(table)
             dialog.setLayout(layout)
             dialog.exec_()
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+
+        self.run_task("restorations", services.get_restorations, on_result=show,
+                      on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def create_document_tab(self):
         widget = QWidget()
@@ -873,8 +1369,7 @@ class ArtGalleryApp(QWidget):
         return widget
 
     def show_documents(self):
-        try:
-            documents = services.get_documents()
+        def show(documents):
             if not documents:
                 self.show_info_message("Информация", "Нет записей о документах.")
                 return
@@ -896,8 +1391,9 @@ class ArtGalleryApp(QWidget):
             layout.addWidget(table)
             dialog.setLayout(layout)
             dialog.exec_()
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+
+        self.run_task("documents", services.get_documents, on_result=show,
+                      on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def open_register_window(self):
         register_window = QDialog()
@@ -929,15 +1425,13 @@ class ArtGalleryApp(QWidget):
             self.show_error_message("Ошибка", "Все поля должны быть заполнены.")
             return
 
-        try:
-            visitor_id = services.register_visitor(name, email, phone)
-            self.show_info_message("Успех", f"Посетитель с ID {visitor_id} зарегистрирован.")
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
+        self.run_write_task("register_visitor", services.register_visitor, name, email, phone,
+                            on_result=lambda visitor_id: self.show_info_message(
+                                "Успех", f"Посетитель с ID {visitor_id} зарегистрирован."),
+                            on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def show_visitors_list(self):
-        try:
-            visitors = services.get_visitors()
+        def show(visitors):
             if not visitors:
                 self.show_info_message("Информация", "Нет зарегистрированных посетителей.")
                 return
@@ -951,15 +1445,14 @@ class ArtGalleryApp(QWidget):
 
             for visitor in visitors:
                 visitor_label = QLabel(
-                    f"ID: {visitor[0]}, Имя: {visitor[1]}, Email: {visitor[2]}, Телефон: {visitor[3]}")
+                    f"ID: {visitor.id}, Имя: {visitor.name}, Email: {visitor.email}, Телефон: {visitor.phone}")
                 layout.addWidget(visitor_label)
 
             visitors_list_window.setLayout(layout)
             visitors_list_window.exec_()
 
-        except Exception as e:
-            self.show_error_message("Ошибка", str(e))
-
+        self.run_task("visitors", services.get_visitors, on_result=show,
+                      on_error=lambda e: self.show_error_message("Ошибка", str(e)))
 
     def add_visitor_review(self):
         review_window = QDialog()
@@ -1012,14 +1505,17 @@ class ArtGalleryApp(QWidget):
             print("Ошибка: все поля должны быть заполнены.")
             return
 
-        try:
-            review_id = services.add_visitor_review(exhibition_id, review_text, reviewer_name)
+        def done(review_id):
             print(f"Отзыв от посетителя добавлен, ID отзыва: {review_id}")
             self.show_success_message("Отзыв успешно добавлен!")
-        except Exception as e:
+
+        def failed(e):
             print(f"Ошибка: {e}")
             self.show_error_message("Не удалось добавить отзыв!")
 
+        self.run_write_task("add_visitor_review", services.add_visitor_review, exhibition_id, review_text, reviewer_name,
+                            on_result=done, on_error=failed)
+
     def show_success_message(self, message):
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Information)
@@ -1027,13 +1523,6 @@ class ArtGalleryApp(QWidget):
         msg.setWindowTitle("Успех")
         msg.exec_()
 
-    def show_error_message(self, message):
-        msg = QMessageBox()
-        msg.setIcon(QMessageBox.Critical)
-        msg.setText(message)
-        msg.setWindowTitle("Ошибка")
-        msg.exec_()
-
     def submit_press_review(self):
         exhibition_id = int(self.exhibition_id_input_press.text())
         review_text = self.review_text_input_press.text()
@@ -1043,18 +1532,19 @@ class ArtGalleryApp(QWidget):
             print("Ошибка: все поля должны быть заполнены.")
             return
 
-        try:
-            review_id = services.add_press_review(exhibition_id, review_text, publication_name)
+        def done(review_id):
             print(f"Отзыв от СМИ добавлен, ID отзыва: {review_id}")
             self.show_success_message("Отзыв от СМИ успешно добавлен!")
-        except Exception as e:
+
+        def failed(e):
             print(f"Ошибка: {e}")
             self.show_error_message("Не удалось добавить отзыв от СМИ!")
 
-    def show_visitor_reviews(self):
-        try:
-            reviews = services.get_visitor_reviews()
+        self.run_write_task("add_press_review", services.add_press_review, exhibition_id, review_text, publication_name,
+                            on_result=done, on_error=failed)
 
+    def show_visitor_reviews(self):
+        def show(reviews):
             review_window = QDialog()
             review_window.setWindowTitle("Отзывы от посетителей")
 
@@ -1067,11 +1557,11 @@ class ArtGalleryApp(QWidget):
             table.setHorizontalHeaderLabels(["ID", "ID выставки", "Текст отзыва", "Имя посетителя", "Дата"])
 
             for row, review in enumerate(reviews):
-                table.setItem(row, 0, QTableWidgetItem(str(review[0])))
-                table.setItem(row, 1, QTableWidgetItem(review[1]))
-                table.setItem(row, 2, QTableWidgetItem(review[2]))
-                table.setItem(row, 3, QTableWidgetItem(str(review[3])))
-                table.setItem(row, 4, QTableWidgetItem(str(review[4])))
+                table.setItem(row, 0, QTableWidgetItem(str(review.id)))
+                table.setItem(row, 1, QTableWidgetItem(str(review.exhibition_id)))
+                table.setItem(row, 2, QTableWidgetItem(review.review))
+                table.setItem(row, 3, QTableWidgetItem(str(review.reviewer_name)))
+                table.setItem(row, 4, QTableWidgetItem(str(review.review_date)))
 
             layout.addWidget(table)
 
@@ -1082,13 +1572,11 @@ class ArtGalleryApp(QWidget):
             review_window.setLayout(layout)
             review_window.exec_()
 
-        except Exception as e:
-            print(f"Ошибка: {e}")
+        self.run_task("visitor_reviews", services.get_visitor_reviews, on_result=show,
+                      on_error=lambda e: print(f"Ошибка: {e}"))
 
     def show_press_reviews(self):
-        try:
-            reviews = services.get_press_reviews()
-
+        def show(reviews):
             review_window = QDialog()
             review_window.setWindowTitle("Отзывы от СМИ")
 
@@ -1101,11 +1589,11 @@ class ArtGalleryApp(QWidget):
             table.setHorizontalHeaderLabels(["ID", "ID выставки", "Текст отзыва", "Название издания", "Дата"])
 
             for row, review in enumerate(reviews):
-                table.setItem(row, 0, QTableWidgetItem(str(review[0])))
-                table.setItem(row, 1, QTableWidgetItem(review[1]))
-                table.setItem(row, 2, QTableWidgetItem(review[2]))
-                table.setItem(row, 3, QTableWidgetItem(str(review[3])))
-                table.setItem(row, 4, QTableWidgetItem(str(review[4])))
+                table.setItem(row, 0, QTableWidgetItem(str(review.id)))
+                table.setItem(row, 1, QTableWidgetItem(str(review.exhibition_id)))
+                table.setItem(row, 2, QTableWidgetItem(review.review))
+                table.setItem(row, 3, QTableWidgetItem(str(review.publication_name)))
+                table.setItem(row, 4, QTableWidgetItem(str(review.review_date)))
 
             layout.addWidget(table)
 
@@ -1116,8 +1604,8 @@ class ArtGalleryApp(QWidget):
             review_window.setLayout(layout)
             review_window.exec_()
 
-        except Exception as e:
-            print(f"Ошибка: {e}")
+        self.run_task("press_reviews", services.get_press_reviews, on_result=show,
+                      on_error=lambda e: print(f"Ошибка: {e}"))
 
     def record_restoration_state(self):
         try:
@@ -1161,27 +1649,32 @@ class ArtGalleryApp(QWidget):
     def start_restoration(self):
         try:
             artwork_id = int(self.restoration_artwork_id_input.text())
-            restorer_name = self.restorer_name_input.text()
-            condition_before = self.condition_before_input.text()
-            restore_end_date = self.restore_end_date_input.date().toPyDate()
-            restore_cost = self.restore_cost_input.value()
-
-            if not artwork_id or not restorer_name or not condition_before or not restore_end_date or not restore_cost:
-                print("Ошибка: все поля должны быть заполнены корректно.")
-                self.show_error_message("Ошибка: все поля должны быть заполнены корректно.")
-                return
+        except ValueError:
+            print("Ошибка: введите правильный ID картины.")
+            self.show_error_message("Ошибка: введите правильный ID картины.")
+            return
+        restorer_name = self.restorer_name_input.text()
+        condition_before = self.condition_before_input.text()
+        restore_end_date = self.restore_end_date_input.date().toPyDate()
+        restore_cost = self.restore_cost_input.value()
+
+        if not artwork_id or not restorer_name or not condition_before or not restore_end_date or not restore_cost:
+            print("Ошибка: все поля должны быть заполнены корректно.")
+            self.show_error_message("Ошибка: все поля должны быть заполнены корректно.")
+            return
 
-            services.record_restoration_state(artwork_id, restorer_name, condition_before, restore_cost, restore_end_date)
+        def done(_):
             print(f"Реставрация картины с ID {artwork_id} начата.")
             self.show_success_message("Реставрация успешно начата.")
 
-        except ValueError:
-            print("Ошибка: введите правильный ID картины.")
-            self.show_error_message("Ошибка: введите правильный ID картины.")
-        except Exception as e:
+        def failed(e):
             print(f"Ошибка: {e}")
             self.show_error_message("Ошибка при начале реставрации.")
 
+        self.run_write_task("record_restoration_state", services.record_restoration_state,
+                            artwork_id, restorer_name, condition_before, restore_cost, restore_end_date,
+                            on_result=done, on_error=failed)
+
     def add_restoration_material(self):
         material_dialog = QDialog(self)
         material_dialog.setWindowTitle("Добавить материал для реставрации")
@@ -1211,15 +1704,13 @@ class ArtGalleryApp(QWidget):
 
             if restoration_id <= 0 or material_id <= 0 or quantity_used <= 0:
                 raise ValueError("Все поля должны быть положительными числами.")
-
-            services.add_restoration_material(restoration_id, material_id, quantity_used)
-            self.show_info_message("Успех", f"Материал с ID {material_id} добавлен успешно.")
         except ValueError as e:
             self.show_error_message("Ошибка валидации", str(e))
-        except services.DatabaseError as e:
-            self.show_error_message("Ошибка базы данных", str(e))
-        except Exception as e:
-            self.show_error_message("Неизвестная ошибка", str(e))
+            return
+
+        self.run_write_task("add_restoration_material", services.add_restoration_material,
+                            restoration_id, material_id, quantity_used,
+                            on_result=lambda _: self.show_info_message("Успех", f"Материал с ID {material_id} добавлен успешно."))
 
     def open_add_document_dialog(self):
         dialog = QDialog(self)
@@ -1254,16 +1745,10 @@ class ArtGalleryApp(QWidget):
             self.show_error_message("Ошибка", "Все поля должны быть заполнены.")
             return
 
-        try:
-            artwork_id = int(artwork_id_text)
-            services.add_document(artwork_id, document_type, file_path)
-            self.show_info_message("Успех", f"Документ о подлинности для картины с ID {artwork_id} успешно добавлен.")
-        except services.ValidationError as e:
-            self.show_error_message("Ошибка валидации", str(e))
-        except services.DatabaseError as e:
-            self.show_error_message("Ошибка базы данных", str(e))
-        except Exception as e:
-            self.show_error_message("Неизвестная ошибка", str(e))
+        artwork_id = int(artwork_id_text)
+        self.run_write_task("add_document", services.add_document, artwork_id, document_type, file_path,
+                            on_result=lambda _: self.show_info_message(
+                                "Успех", f"Документ о подлинности для картины с ID {artwork_id} успешно добавлен."))
 
     def open_add_material_dialog(self):
         dialog = QDialog(self)
@@ -1288,10 +1773,6 @@ class ArtGalleryApp(QWidget):
         name = self.material_name_input.text()
         unit_price = self.material_price_input.value()
 
-        try:
-            services.add_material(name, unit_price)
-            print(f"Новый материал {name} добавлен")
-        except Exception as e:
-            print(f"Ошибка: {e}")
-
-
+        self.run_write_task("add_material", services.add_material, name, unit_price,
+                            on_result=lambda _: print(f"Новый материал {name} добавлен"),
+                            on_error=lambda e: print(f"Ошибка: {e}"))
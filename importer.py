@@ -0,0 +1,412 @@
+"""
+Массовый импорт каталогов из CSV и JSON Lines: художники, картины, посетители
+и перемещения.
+
+Файл читается потоково (поддерживается и сжатый .gz), строки проверяются теми же
+правилами, что и в services (add_artist, acquire_artwork, register_visitor,
+record_movement), и добавляются порциями. Каждая порция вместе с позицией в файле
+и отклоненными строками фиксируется одной транзакцией, поэтому прерванный импорт
+того же файла продолжается с первой незафиксированной строки.
+
+Поля (лишние игнорируются):
+    artists    name, biography
+    artworks   title, artist (имя) или artist_id, price, year_created, technique,
+               dimensions, description, genre, provenance_entry
+    visitors   name, email, phone, registration_date
+    movements  artwork_id, from_location, to_location, purpose, responsible_person,
+               movement_date
+
+Запуск:
+    python importer.py artworks catalogue.csv
+    python importer.py visitors visitors.jsonl.gz --chunk-size 20000
+    python importer.py movements movements.csv --restart
+"""
+
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+
+import database
+from services import (DatabaseError, ValidationError, detect_file_format, invalidate_reference_cache,
+                      validate_artist_data, validate_artwork_data, validate_artwork_price,
+                      validate_movement_data, validate_visitor_data)
+
+# Строк в одной транзакции: после каждой порции сохраняется позиция в файле
+IMPORT_CHUNK_SIZE = 10000
+IMPORT_KINDS = ("artists", "artworks", "visitors", "movements")
+
+
+def _read_records(path, fmt, compress):
+    """Записи файла по одной: словари или ValidationError для нечитаемой строки JSON"""
+    if compress:
+        source = gzip.open(path, "rt", encoding="utf-8", newline="")
+    else:
+        source = open(path, encoding="utf-8", newline="")
+    with source:
+        if fmt == "csv":
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield ValidationError(f"Некорректная строка JSON: {line.strip()[:200]}")
+                continue
+            if isinstance(record, dict):
+                yield record
+            else:
+                yield ValidationError("Строка JSON должна быть объектом")
+
+
+def _text(record, field):
+    """Строковое поле; пустая строка CSV считается отсутствующим значением"""
+    value = record.get(field)
+    return None if value == "" else value
+
+
+def _integer(record, field):
+    value = _text(record, field)
+    if value is None or isinstance(value, int) and not isinstance(value, bool):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Поле {field} должно быть целым числом")
+
+
+def _number(record, field):
+    value = _text(record, field)
+    if value is None or isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"Поле {field} должно быть числом")
+
+
+def _date(record, field, default):
+    value = _text(record, field)
+    if value is None:
+        return default
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValidationError(f"Поле {field} должно быть датой в формате ГГГГ-ММ-ДД")
+
+
+def _execute(operation, immediate=False):
+    """Выполняет operation(cursor) одной транзакцией на соединении с профилем bulk_load,
+    как initial_data: порции пишутся без fsync. Порция и позиция в файле фиксируются
+    вместе, поэтому после сбоя импорт продолжается с последней сохраненной позиции."""
+    conn = database.get_connection(profile="bulk_load")
+    try:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        result = operation(conn.cursor())
+        conn.commit()
+        return result
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.rollback()
+        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _existing_ids(cursor, table, ids):
+    """Какие из ids есть в таблице: один запрос на порцию"""
+    cursor.execute(f"SELECT id FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                   (json.dumps(sorted(set(ids))),))
+    return {row[0] for row in cursor.fetchall()}
+
+
+# Разбор и вставка по видам импорта. prepare(запись, контекст) возвращает значения
+# строки или бросает ValidationError; insert(cursor, [(номер, значения)]) добавляет
+# строки порции и возвращает [(номер, ошибка)] для строк, отклоненных по данным базы.
+
+def _prepare_artist(record, context):
+    name, biography = _text(record, "name"), _text(record, "biography")
+    validate_artist_data(name, biography)
+    return name, biography
+
+
+def _insert_artists(cursor, rows):
+    cursor.executemany("INSERT INTO Artist (name, biography) VALUES (?, ?)", [values for _, values in rows])
+    return []
+
+
+def _prepare_artwork(record, context):
+    artist_id = _integer(record, "artist_id")
+    artist = _text(record, "artist")
+    if artist_id is None and artist is not None:
+        # Имена художников разрешаются по словарю в памяти, без запроса на строку
+        artist_id = context["artists"].get(artist)
+        if artist_id is None:
+            raise ValidationError(f"Художник «{artist}» не найден")
+    title, price = _text(record, "title"), _number(record, "price")
+    validate_artwork_data(title, artist_id)
+    validate_artwork_price(price)
+    return (title, _integer(record, "year_created"), _text(record, "technique"), _text(record, "dimensions"),
+            _text(record, "description"), _text(record, "genre"), artist_id, price,
+            _text(record, "provenance_entry"))
+
+
+def _insert_artworks(cursor, rows):
+    existing = _existing_ids(cursor, "Artist", [values[6] for _, values in rows])
+    rejected = [(number, f"Художник с ID {values[6]} не существует")
+                for number, values in rows if values[6] not in existing]
+    accepted = [values for _, values in rows if values[6] in existing]
+    if not accepted:
+        return rejected
+
+    # Внутри BEGIN IMMEDIATE других писателей нет, поэтому ID можно выдать заранее
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM Artwork")
+    next_id = cursor.fetchone()[0] + 1
+    today = date.today()
+    cursor.executemany('''
+        INSERT INTO Artwork (id, title, year_created, technique, dimensions,
+                           description, genre, current_location, status, artist_id, price)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'Gallery Storage', 'Acquired', ?, ?)
+    ''', [(next_id + offset, *values[:8]) for offset, values in enumerate(accepted)])
+    cursor.executemany("INSERT INTO Provenance (artwork_id, provenance_entry, entry_date) VALUES (?, ?, ?)",
+                       [(next_id + offset, values[8], today) for offset, values in enumerate(accepted)
+                        if values[8] is not None])
+    return rejected
+
+
+def _prepare_visitor(record, context):
+    name, email, phone = _text(record, "name"), _text(record, "email"), _text(record, "phone")
+    validate_visitor_data(name, email, phone)
+    return name, email, phone, _date(record, "registration_date", context["today"])
+
+
+def _insert_visitors(cursor, rows):
+    cursor.execute("SELECT email FROM Visitor WHERE email IN (SELECT value FROM json_each(?))",
+                   (json.dumps([values[1] for _, values in rows]),))
+    taken = {row[0] for row in cursor.fetchall()}
+    rejected, accepted = [], []
+    for number, values in rows:
+        if values[1] in taken:
+            rejected.append((number, f"Посетитель с email {values[1]} уже зарегистрирован."))
+        else:
+            taken.add(values[1])
+            accepted.append(values)
+    cursor.executemany("INSERT INTO Visitor (name, email, phone, registration_date) VALUES (?, ?, ?, ?)",
+                       accepted)
+    return rejected
+
+
+def _prepare_movement(record, context):
+    artwork_id = _integer(record, "artwork_id")
+    values = (artwork_id, _text(record, "from_location"), _text(record, "to_location"),
+              _text(record, "purpose"), _text(record, "responsible_person"))
+    validate_movement_data(*values)
+    return (*values, _date(record, "movement_date", context["today"]))
+
+
+def _insert_movements(cursor, rows):
+    existing = _existing_ids(cursor, "Artwork", [values[0] for _, values in rows])
+    cursor.executemany('''
+        INSERT INTO Movement (artwork_id, from_location, to_location, purpose, responsible_person, movement_date)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [values for _, values in rows if values[0] in existing])
+    return [(number, f"Картина с ID {values[0]} не существует.")
+            for number, values in rows if values[0] not in existing]
+
+
+_IMPORTERS = {
+    "artists": (_prepare_artist, _insert_artists),
+    "artworks": (_prepare_artwork, _insert_artworks),
+    "visitors": (_prepare_visitor, _insert_visitors),
+    "movements": (_prepare_movement, _insert_movements),
+}
+
+
+def _load_context(kind):
+    context = {"today": date.today().isoformat()}
+    if kind == "artworks":
+        def operation(cursor):
+            # При одинаковых именах берется художник, добавленный первым
+            cursor.execute("SELECT name, MIN(id) FROM Artist GROUP BY name")
+            return dict(cursor.fetchall())
+
+        context["artists"] = _execute(operation)
+    return context
+
+
+def _load_progress(job):
+    def operation(cursor):
+        cursor.execute('''
+            SELECT file_size, records_done, inserted, rejected, finished_at FROM import_progress WHERE job = ?
+        ''', (job,))
+        return cursor.fetchone()
+
+    return _execute(operation)
+
+
+def _start_job(job, kind, path, file_size):
+    def operation(cursor):
+        cursor.execute("DELETE FROM import_rejected WHERE job = ?", (job,))
+        cursor.execute('''
+            INSERT OR REPLACE INTO import_progress (job, kind, path, file_size, started_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (job, kind, path, file_size, _now(), _now()))
+
+    _execute(operation, immediate=True)
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _write_rejected_report(job, report_path):
+    """Выгружает отклоненные строки задания в JSON Lines: номер записи, ошибка, исходные данные"""
+    def operation(cursor):
+        cursor.execute("SELECT record, error, data FROM import_rejected WHERE job = ? ORDER BY record", (job,))
+        with open(report_path, "w", encoding="utf-8") as output:
+            for record, error, data in cursor:
+                output.write(json.dumps({"record": record, "error": error, "data": json.loads(data)},
+                                        ensure_ascii=False) + "\n")
+
+    _execute(operation)
+
+
+def import_file(kind: str, path: str, fmt: str = None, compress: bool = None,
+                chunk_size: int = IMPORT_CHUNK_SIZE, restart: bool = False, progress=None, log=print):
+    """Импортирует файл path с записями вида kind (см. IMPORT_KINDS).
+
+    Формат и сжатие по умолчанию определяются по расширению (.csv, .jsonl, .gz).
+    Если импорт этого файла уже начинался, он продолжается с сохраненной позиции;
+    restart=True начинает заново. progress(обработано записей) вызывается после
+    каждой зафиксированной порции.
+
+    Возвращает отчет: сколько записей обработано, добавлено и отклонено, с какой
+    записи продолжен импорт, время и скорость этого запуска, путь к отчету об
+    отклоненных строках (path + ".rejected.jsonl", если такие строки есть).
+    """
+    if kind not in _IMPORTERS:
+        raise ValidationError(f"Неизвестный вид импорта: {kind}")
+    if not isinstance(chunk_size, int) or chunk_size <= 0:
+        raise ValidationError("Размер порции должен быть положительным целым числом.")
+    fmt, compress = detect_file_format(path, fmt, compress)
+    if not os.path.isfile(path):
+        raise ValidationError(f"Файл не найден: {path}")
+
+    path = os.path.abspath(path)
+    job = f"{kind}:{path}"
+    file_size = os.path.getsize(path)
+    state = None if restart else _load_progress(job)
+    if state is not None and state[0] != file_size:
+        raise ValidationError("Файл изменился после начала импорта; начните заново с restart=True.")
+    if state is None:
+        _start_job(job, kind, path, file_size)
+        state = (file_size, 0, 0, 0, None)
+    _, resumed_from, inserted, rejected, finished_at = state
+
+    prepare, insert = _IMPORTERS[kind]
+    context = _load_context(kind) if finished_at is None else None
+    records_done = resumed_from
+    started = time.perf_counter()
+    # Завершенный импорт не перечитывает файл, а только возвращает отчет
+    records = enumerate(_read_records(path, fmt, compress) if finished_at is None else (), start=1)
+    # Уже зафиксированные записи только читаются и пропускаются
+    for chunk in iter(lambda: list(itertools.islice(records, chunk_size)), []):
+        if chunk[-1][0] <= resumed_from:
+            continue
+        valid, errors = [], []
+        for number, record in chunk:
+            if number <= resumed_from:
+                continue
+            try:
+                if isinstance(record, ValidationError):
+                    raise record
+                valid.append((number, prepare(record, context)))
+            except ValidationError as e:
+                errors.append((number, str(e)))
+        # Нечитаемые строки JSON хранятся только в тексте ошибки
+        data = {number: None if isinstance(record, ValidationError) else record for number, record in chunk}
+        last = chunk[-1][0]
+
+        def operation(cursor):
+            failed = errors + (insert(cursor, valid) if valid else [])
+            cursor.executemany("INSERT INTO import_rejected (job, record, error, data) VALUES (?, ?, ?, ?)",
+                               [(job, number, error, json.dumps(data[number], ensure_ascii=False, default=str))
+                                for number, error in failed])
+            cursor.execute('''
+                UPDATE import_progress SET records_done = ?, inserted = inserted + ?, rejected = rejected + ?,
+                       updated_at = ?
+                WHERE job = ?
+            ''', (last, len(valid) + len(errors) - len(failed), len(failed), _now(), job))
+            return len(failed)
+
+        failed = _execute(operation, immediate=True)
+        inserted += len(valid) + len(errors) - failed
+        rejected += failed
+        records_done = last
+        if progress is not None:
+            progress(records_done)
+        if log:
+            log(f"{kind}: обработано {records_done}, добавлено {inserted}, отклонено {rejected}")
+
+    if finished_at is None:
+        _execute(lambda cursor: cursor.execute(
+            "UPDATE import_progress SET finished_at = ? WHERE job = ?", (_now(), job)), immediate=True)
+        if kind == "artists":
+            # Справочник художников изменился в обход add_artist
+            invalidate_reference_cache("Artist")
+    seconds = time.perf_counter() - started
+
+    report_path = None
+    if rejected:
+        report_path = path + ".rejected.jsonl"
+        _write_rejected_report(job, report_path)
+    processed = records_done - resumed_from
+    return {
+        "kind": kind,
+        "path": path,
+        "records": records_done,
+        "inserted": inserted,
+        "rejected": rejected,
+        "resumed_from": resumed_from,
+        "seconds": seconds,
+        "records_per_s": processed / seconds if seconds > 0 else 0.0,
+        "rejected_report": report_path,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовый импорт каталогов галереи из CSV и JSON Lines")
+    parser.add_argument("kind", choices=IMPORT_KINDS)
+    parser.add_argument("path")
+    parser.add_argument("--db", default=database.DATABASE, help="файл базы данных")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="формат файла (по умолчанию - по расширению)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="начать импорт файла заново")
+    args = parser.parse_args(argv)
+
+    database.DATABASE = args.db
+    database.initialize_db()
+    report = import_file(args.kind, args.path, fmt=args.format, chunk_size=args.chunk_size,
+                         restart=args.restart)
+    if report["resumed_from"]:
+        print(f"Импорт продолжен с записи {report['resumed_from'] + 1}")
+    print(f"Записей: {report['records']}, добавлено: {report['inserted']}, отклонено: {report['rejected']}")
+    print(f"Время: {report['seconds']:.1f} с, {report['records_per_s']:.0f} записей/с")
+    if report["rejected_report"]:
+        print(f"Отклоненные строки: {report['rejected_report']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,15 +1,26 @@
-from database import get_connection
+import argparse
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+from database import get_connection, initialize_db, derived_indexes_deferred
 
 def populate():
-    conn = get_connection()
+    # Профиль массовой загрузки: читатели в режиме WAL продолжают работать
+    conn = get_connection(profile="bulk_load")
     cursor = conn.cursor()
 
     # Проверка: есть ли уже художники
     cursor.execute("SELECT COUNT(*) FROM Artist")
     if cursor.fetchone()[0] > 0:
         print("Данные уже есть.")
+        conn.close()
         return
 
+    # Все вставки - одной транзакцией
+    cursor.execute("BEGIN")
+
     # Добавим художников
     cursor.execute("INSERT INTO Artist (name, biography, awards, exhibitions_participated) VALUES (?, ?, ?, ?)",
                    ("Винсент Ван Гог", "Голландский постимпрессионист", "—", 5))
@@ -51,5 +62,300 @@ def populate():
     conn.close()
     print("База успешно заполнена.")
 
+
+# Синтетические данные для проверки под нагрузкой.
+# Объем при scale=1; все количества масштабируются линейно
+GENERATOR_SIZES = {
+    "artists": 1000,
+    "artworks": 100_000,
+    "exhibitions": 500,
+    "visitors": 50_000,
+    "materials": 100,
+}
+ZIPF_EXPONENT = 1.1          # популярность художников и выставок
+MOVEMENTS_PER_ARTWORK = 8    # средняя длина истории перемещений
+ARTWORKS_PER_EXHIBITION = 40
+SALE_SHARE = 0.1             # доля проданных картин
+RENTAL_SHARE = 0.2           # доля картин, хотя бы раз сданных в аренду
+RESTORATION_SHARE = 0.1      # доля картин, прошедших реставрацию
+REVIEWS_PER_VISITOR = 2
+PRESS_REVIEWS_PER_EXHIBITION = 10
+GENERATOR_BATCH_SIZE = 50_000
+GENERATOR_YEARS = (2015, 2024)
+# Посещаемость по месяцам: пик летом и перед Новым годом
+MONTH_WEIGHTS = (6, 5, 6, 7, 9, 11, 14, 14, 9, 7, 6, 12)
+
+FIRST_NAMES = ("Анна", "Иван", "Мария", "Петр", "Елена", "Алексей", "Ольга", "Дмитрий",
+               "Pierre", "Sofia", "Marco", "Emma", "Hans", "Lucia", "Jan", "Ines")
+LAST_NAMES = ("Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева",
+              "Rossi", "Müller", "Dubois", "García", "Novak", "Jensen", "Silva", "Kowalski")
+GENRES = ("Портрет", "Пейзаж", "Натюрморт", "Марина", "Жанровая сцена", "Абстракция",
+          "Исторический", "Кубизм", "Импрессионизм", "Постимпрессионизм")
+TECHNIQUES = ("Масло на холсте", "Акварель", "Темпера", "Гуашь", "Пастель", "Офорт",
+              "Литография", "Смешанная техника")
+SUBJECTS = ("Утро", "Вечер", "Река", "Сад", "Город", "Море", "Портрет", "Мост", "Лес",
+            "Площадь", "Гавань", "Поле", "Окно", "Собор", "Зима", "Осень")
+LOCATIONS = ("Gallery Storage", "Зал 1", "Зал 2", "Зал 3", "Зал 4", "Реставрационная мастерская",
+             "Запасник", "Транспорт")
+PURPOSES = ("Экспозиция", "Хранение", "Реставрация", "Фотосъемка", "Экспертиза", "Выставка")
+PUBLICATIONS = ("Искусство", "Художественный журнал", "The Art Newspaper", "Apollo",
+                "Коммерсантъ", "Burlington Magazine")
+CONDITIONS = ("Кракелюр", "Потемнение лака", "Отслоение красочного слоя", "Загрязнение",
+              "Разрыв холста")
+
+
+class _Generator:
+    """Детерминированный источник синтетических значений.
+
+    Даты заранее переведены в строки ISO, а имена составлены из списков:
+    на миллионах строк вызовы адаптеров и форматирование заметно замедляют загрузку.
+    """
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        first_day = date(GENERATOR_YEARS[0], 1, 1)
+        self.days = (date(GENERATOR_YEARS[1], 12, 31) - first_day).days + 1
+        # С запасом на длительность аренды, реставрации и выставки
+        calendar = [first_day + timedelta(days=i) for i in range(self.days + 366)]
+        self.day_strings = [day.isoformat() for day in calendar]
+        self.seasonal_weights = list(itertools.accumulate(
+            MONTH_WEIGHTS[day.month - 1] for day in calendar[:self.days]))
+        self.names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+
+    def zipf(self, count):
+        """Накопленные веса для выбора с популярностью по закону Ципфа"""
+        return list(itertools.accumulate(1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(count)))
+
+    def name(self):
+        return self.rng.choice(self.names)
+
+    def day(self, seasonal=False):
+        """Номер дня от начала периода; seasonal - с учетом сезонности посещений"""
+        if seasonal:
+            return self.rng.choices(range(self.days), cum_weights=self.seasonal_weights)[0]
+        return self.rng.randrange(self.days)
+
+    def date(self, seasonal=False):
+        return self.day_strings[self.day(seasonal)]
+
+    def period(self, min_days, max_days, seasonal=False, before=None):
+        """(начало, окончание, длительность в днях); before - номер дня, до
+        которого период должен закончиться (None, если он не помещается)"""
+        days = self.rng.randint(min_days, max_days)
+        if before is None:
+            start = self.day(seasonal)
+        elif days < before:
+            start = self.rng.randrange(before - days)
+        else:
+            return None
+        return self.day_strings[start], self.day_strings[start + days], days
+
+
+def _load(cursor, sql, rows, batch_size):
+    """Вставляет строки порциями через executemany, возвращает их число"""
+    count = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return count
+        cursor.executemany(sql, batch)
+        count += len(batch)
+
+
+def generate(scale=1.0, seed=42, batch_size=GENERATOR_BATCH_SIZE, log=print):
+    """Заполняет базу синтетическими данными объемом scale * GENERATOR_SIZES.
+
+    При одинаковых seed и scale данные получаются одинаковыми. Каждая таблица
+    загружается одной транзакцией через executemany; идентификаторы выдаются
+    явно после уже имеющихся, так что генератор можно запускать повторно.
+    Возвращает словарь {таблица: число добавленных строк}.
+    """
+    if scale <= 0:
+        raise ValueError("Масштаб должен быть положительным числом.")
+    sizes = {key: max(1, int(value * scale)) for key, value in GENERATOR_SIZES.items()}
+    gen = _Generator(seed)
+    rng = gen.rng
+
+    conn = get_connection(profile="bulk_load")
+    cursor = conn.cursor()
+    counts = {}
+    started = time.perf_counter()
+
+    def next_id(table):
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+        return cursor.fetchone()[0]
+
+    def load(table, sql, rows):
+        table_started = time.perf_counter()
+        cursor.execute("BEGIN")
+        try:
+            count = _load(cursor, sql, rows, batch_size)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        counts[table] = counts.get(table, 0) + count
+        if log:
+            elapsed = time.perf_counter() - table_started
+            log(f"{table}: {count} строк, {count / elapsed if elapsed else 0:.0f} строк/с")
+
+    try:
+        # Полнотекстовые индексы перестраиваются один раз после загрузки,
+        # а не обновляются триггерами на каждую строку
+        with derived_indexes_deferred(conn):
+            first_artist = next_id("Artist")
+            artist_ids = range(first_artist, first_artist + sizes["artists"])
+            load("Artist", "INSERT INTO Artist (id, name, biography, awards, exhibitions_participated) "
+                           "VALUES (?, ?, ?, ?, ?)",
+                 ((artist_id, gen.name(), f"{rng.choice(GENRES)}, {rng.randint(1500, 2000)}-е годы", "—",
+                   rng.randint(0, 50)) for artist_id in artist_ids))
+
+            # Популярные художники представлены большим числом работ
+            first_artwork = next_id("Artwork")
+            artwork_ids = range(first_artwork, first_artwork + sizes["artworks"])
+            artist_weights = gen.zipf(len(artist_ids))
+            artwork_artists = rng.choices(artist_ids, cum_weights=artist_weights, k=len(artwork_ids))
+            prices = {}
+
+            # Продажи и аренды выбираются до загрузки картин, чтобы статус картины
+            # был таким же, как после rent_artwork и sell_artwork: проданная картина -
+            # Sold, сданная в аренду - Rented. Аренда проданной картины заканчивается
+            # до дня продажи.
+            sale_days = {artwork_id: gen.day()
+                         for artwork_id in rng.sample(artwork_ids, int(len(artwork_ids) * SALE_SHARE))}
+            rented = {}
+            for artwork_id in rng.sample(artwork_ids, int(len(artwork_ids) * RENTAL_SHARE)):
+                period = gen.period(7, 180, before=sale_days.get(artwork_id))
+                if period is not None:
+                    rented[artwork_id] = period
+
+            def status(artwork_id):
+                if artwork_id in sale_days:
+                    return "Sold"
+                return "Rented" if artwork_id in rented else "Acquired"
+
+            def artworks():
+                for artwork_id, artist_id in zip(artwork_ids, artwork_artists):
+                    price = round(rng.lognormvariate(10, 1.2), 2)
+                    prices[artwork_id] = price
+                    yield (artwork_id, f"{rng.choice(SUBJECTS)} {rng.choice(SUBJECTS).lower()} №{artwork_id}",
+                           rng.randint(1500, 2023), rng.choice(TECHNIQUES),
+                           f"{rng.randint(20, 300)}x{rng.randint(20, 300)}",
+                           f"{rng.choice(SUBJECTS)}, {rng.choice(GENRES).lower()}", rng.choice(GENRES),
+                           rng.choice(LOCATIONS), status(artwork_id), artist_id, price)
+
+            load("Artwork", "INSERT INTO Artwork (id, title, year_created, technique, dimensions, description, "
+                            "genre, current_location, status, artist_id, price) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                 artworks())
+            load("Provenance", "INSERT INTO Provenance (artwork_id, provenance_entry, entry_date) VALUES (?, ?, ?)",
+                 ((artwork_id, f"Собрание {gen.name()}", gen.date()) for artwork_id in artwork_ids))
+
+            def movements():
+                # Длинная история в хронологическом порядке: место назначения
+                # одного перемещения - начало следующего
+                days = gen.day_strings
+                for artwork_id in artwork_ids:
+                    location = "Gallery Storage"
+                    for day in sorted(gen.day() for _ in range(int(rng.expovariate(1 / MOVEMENTS_PER_ARTWORK)))):
+                        destination = rng.choice(LOCATIONS)
+                        yield (artwork_id, location, destination, days[day], rng.choice(PURPOSES), gen.name())
+                        location = destination
+
+            load("Movement", "INSERT INTO Movement (artwork_id, from_location, to_location, movement_date, "
+                             "purpose, responsible_person) VALUES (?, ?, ?, ?, ?, ?)", movements())
+
+            load("Sale", "INSERT INTO Sale (artwork_id, buyer_name, sale_date, price) VALUES (?, ?, ?, ?)",
+                 ((artwork_id, gen.name(), gen.day_strings[day], round(prices[artwork_id] * rng.uniform(0.8, 1.5), 2))
+                  for artwork_id, day in sale_days.items()))
+
+            def rentals():
+                for artwork_id, (start, end, days) in rented.items():
+                    yield (artwork_id, gen.name(), start, end, round(prices[artwork_id] * 0.05 * (days / 30), 2))
+
+            load("Rental", "INSERT INTO Rental (artwork_id, renter_name, start_date, end_date, rental_fee) "
+                           "VALUES (?, ?, ?, ?, ?)", rentals())
+
+            first_material = next_id("Material")
+            material_ids = range(first_material, first_material + sizes["materials"])
+            load("Material", "INSERT INTO Material (id, name, unit_price) VALUES (?, ?, ?)",
+                 ((material_id, f"Материал {material_id}", round(rng.uniform(1, 500), 2))
+                  for material_id in material_ids))
+
+            first_restoration = next_id("Restoration")
+            restored = rng.sample(artwork_ids, int(len(artwork_ids) * RESTORATION_SHARE))
+            restoration_ids = range(first_restoration, first_restoration + len(restored))
+
+            def restorations():
+                for restoration_id, artwork_id in zip(restoration_ids, restored):
+                    start, end, _ = gen.period(5, 120)
+                    yield (restoration_id, artwork_id, gen.name(), start, end,
+                           round(rng.uniform(1000, 50000), 2), rng.choice(CONDITIONS), "Отреставрирована")
+
+            load("Restoration", "INSERT INTO Restoration (id, artwork_id, restorer_name, start_date, end_date, cost, "
+                                "condition_before, condition_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", restorations())
+            load("Restoration_Material", "INSERT INTO Restoration_Material (restoration_id, material_id, quantity_used) "
+                                         "VALUES (?, ?, ?)",
+                 ((restoration_id, material_id, rng.randint(1, 20))
+                  for restoration_id in restoration_ids
+                  for material_id in rng.sample(material_ids, min(3, len(material_ids)))))
+
+            first_exhibition = next_id("Exhibition")
+            exhibition_ids = range(first_exhibition, first_exhibition + sizes["exhibitions"])
+
+            def exhibitions():
+                for exhibition_id in exhibition_ids:
+                    start, end, _ = gen.period(30, 120, seasonal=True)
+                    yield (exhibition_id, f"{rng.choice(SUBJECTS)} и {rng.choice(SUBJECTS).lower()}",
+                           rng.choice(GENRES), start, end)
+
+            load("Exhibition", "INSERT INTO Exhibition (id, title, theme, start_date, end_date) VALUES (?, ?, ?, ?, ?)",
+                 exhibitions())
+            load("Exhibition_Artwork", "INSERT INTO Exhibition_Artwork (exhibition_id, artwork_id) VALUES (?, ?)",
+                 ((exhibition_id, artwork_id)
+                  for exhibition_id in exhibition_ids
+                  for artwork_id in rng.sample(artwork_ids, min(ARTWORKS_PER_EXHIBITION, len(artwork_ids)))))
+
+            first_visitor = next_id("Visitor")
+            visitor_ids = range(first_visitor, first_visitor + sizes["visitors"])
+            load("Visitor", "INSERT INTO Visitor (id, name, email, phone, registration_date) VALUES (?, ?, ?, ?, ?)",
+                 ((visitor_id, gen.name(), f"visitor{visitor_id}@example.com",
+                   f"+7{rng.randint(9000000000, 9999999999)}", gen.date(seasonal=True))
+                  for visitor_id in visitor_ids))
+
+            # Отзывы достаются в основном популярным выставкам и приходятся на сезон посещений
+            exhibition_weights = gen.zipf(len(exhibition_ids))
+            reviews = len(visitor_ids) * REVIEWS_PER_VISITOR
+            load("Visitor_Review", "INSERT INTO Visitor_Review (exhibition_id, review, reviewer_name, review_date) "
+                                   "VALUES (?, ?, ?, ?)",
+                 ((exhibition_id, f"{rng.choice(('Отличная', 'Интересная', 'Скучная', 'Яркая'))} выставка, "
+                                  f"особенно {rng.choice(SUBJECTS).lower()}", gen.name(), gen.date(seasonal=True))
+                  for exhibition_id in rng.choices(exhibition_ids, cum_weights=exhibition_weights, k=reviews)))
+            load("Press_Review", "INSERT INTO Press_Review (exhibition_id, review, publication_name, review_date) "
+                                 "VALUES (?, ?, ?, ?)",
+                 ((exhibition_id, f"Обзор выставки: {rng.choice(GENRES).lower()}", rng.choice(PUBLICATIONS),
+                   gen.date(seasonal=True))
+                  for exhibition_id in exhibition_ids
+                  for _ in range(PRESS_REVIEWS_PER_EXHIBITION)))
+    finally:
+        conn.close()
+
+    if log:
+        total = sum(counts.values())
+        elapsed = time.perf_counter() - started
+        log(f"Всего: {total} строк за {elapsed:.1f} с ({total / elapsed:.0f} строк/с)")
+    return counts
+
+
 if __name__ == "__main__":
-    populate()
+    parser = argparse.ArgumentParser(description="Заполнение базы галереи")
+    parser.add_argument("--scale", type=float,
+                        help="сгенерировать синтетические данные: 1.0 - 100 тыс. картин")
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+    args = parser.parse_args()
+
+    if args.scale is None:
+        populate()
+    else:
+        initialize_db()
+        generate(args.scale, args.seed)
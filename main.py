@@ -1,8 +1,11 @@
 import sys
 from PyQt5.QtWidgets import QApplication
 from gui import ArtGalleryApp
+from database import initialize_db
 
 def main():
+    # Создает недостающие таблицы и индексы в существующей базе
+    initialize_db()
     app = QApplication(sys.argv)
     with open('styles.qss', 'r') as f:
         app.setStyleSheet(f.read())
@@ -1,120 +1,127 @@
 """
 Модуль содержит модели данных для информационной системы картинной галереи.
 Каждый класс представляет собой сущность предметной области с соответствующими атрибутами.
+
+Модели - неизменяемые кортежи с доступом к полям по имени (namedtuple с
+__slots__ = ()): у экземпляров нет __dict__, поэтому объект занимает в памяти
+столько же, сколько кортеж sqlite3 с теми же значениями, а код, обращающийся
+к строкам по индексу или сравнивающий их с кортежами, продолжает работать.
+Порядок полей совпадает с порядком столбцов таблицы, поэтому строки курсора
+превращаются в модели без пересборки (см. row_factory).
 """
 
+from collections import namedtuple
 from datetime import date
-class Artwork:
-    def __init__(self, id=None, title=None, year_created=None, technique=None, dimensions=None,
-                 description=None, genre=None, current_location=None, status=None, artist_id=None, price=None):
-        self.id = id
-        self.title = title
-        self.year_created = year_created
-        self.technique = technique
-        self.dimensions = dimensions
-        self.description = description
-        self.genre = genre
-        self.current_location = current_location
-        self.status = status
-        self.artist_id = artist_id
-        self.price = price
-
-class Artist:
-    def __init__(self, id=None, name=None, biography=None, awards=None, exhibitions_participated=None):
-        self.id = id
-        self.name = name
-        self.biography = biography
-        self.awards = awards
-        self.exhibitions_participated = exhibitions_participated
-
-class Movement:
-    def __init__(self, id=None, artwork_id=None, from_location=None, to_location=None,
-                 movement_date=None, purpose=None, responsible_person=None):
-        self.id = id
-        self.artwork_id = artwork_id
-        self.from_location = from_location
-        self.to_location = to_location
-        self.movement_date = movement_date
-        self.purpose = purpose
-        self.responsible_person = responsible_person
-
-class Visitor:
-    def __init__(self, id=None, name=None, email=None, phone=None, registration_date=None):
-        self.id = id
-        self.name = name
-        self.email = email
-        self.phone = phone
-        self.registration_date = registration_date or date.today()
-
-class Exhibition:
-    def __init__(self, id=None, title=None, theme=None, start_date=None, end_date=None):
-        self.id = id
-        self.title = title
-        self.theme = theme
-        self.start_date = start_date
-        self.end_date = end_date
-
-class Provenance:
-    def __init__(self, id=None, artwork_id=None, provenance_entry=None, entry_date=None):
-        self.id = id
-        self.artwork_id = artwork_id
-        self.provenance_entry = provenance_entry
-        self.entry_date = entry_date or date.today()
-
-class Restoration:
-    def __init__(self, id=None, artwork_id=None, restorer_name=None, start_date=None, end_date=None,
-                 cost=None, condition_before=None, condition_after=None):
-        self.id = id
-        self.artwork_id = artwork_id
-        self.restorer_name = restorer_name
-        self.start_date = start_date or date.today()
-        self.end_date = end_date
-        self.cost = cost
-        self.condition_before = condition_before
-        self.condition_after = condition_after
-
-class Document:
-    def __init__(self, id=None, artwork_id=None, document_type=None, issue_date=None):
-        self.id = id
-        self.artwork_id = artwork_id
-        self.document_type = document_type
-        self.issue_date = issue_date or date.today()
-
-class Material:
-    def __init__(self, id=None, name=None, unit_price=None):
-        self.id = id
-        self.name = name
-        self.unit_price = unit_price
-
-class Sale:
-    def __init__(self, id=None, artwork_id=None, buyer_name=None, sale_date=None, price=None):
-        self.id = id
-        self.artwork_id = artwork_id
-        self.buyer_name = buyer_name
-        self.sale_date = sale_date or date.today()
-        self.price = price
-
-class Rental:
-    def __init__(self, id=None, artwork_id=None, renter_name=None, start_date=None, end_date=None, rental_fee=None):
-        self.id = id
-        self.artwork_id = artwork_id
-        self.renter_name = renter_name
-        self.start_date = start_date
-        self.end_date = end_date
-        self.rental_fee = rental_fee
-
-class VisitorReview:
-    def __init__(self, id=None, exhibition_id=None, review=None, reviewer_name=None, review_date=None):
-        self.id = id
-        self.exhibition_id = exhibition_id
-        self.review = review
-        self.reviewer_name = reviewer_name
-        self.review_date = review_date or date.today()
-
-class PressReview:
-    def __init__(self, id=None, exhibition_id=None, review=None, publication_name=None, review_date=None):
-        self.id = id
-        self.exhibition_id = exhibition_id
-        self.review = review
-        self.publication_name = publication_name
-        self.review_date = review_date or date.today()
\ No newline at end of file
+
+
+def _fields(name, fields):
+    """Базовый namedtuple: все поля необязательны (по умолчанию None)"""
+    fields = fields.split()
+    return namedtuple(name, fields, defaults=(None,) * len(fields))
+
+
+class Artwork(_fields("Artwork", "id title year_created technique dimensions description genre "
+                                 "current_location status artist_id price")):
+    __slots__ = ()
+
+
+class Artist(_fields("Artist", "id name biography awards exhibitions_participated")):
+    __slots__ = ()
+
+
+class Movement(_fields("Movement", "id artwork_id from_location to_location movement_date "
+                                   "purpose responsible_person")):
+    __slots__ = ()
+
+
+class Visitor(_fields("Visitor", "id name email phone registration_date")):
+    __slots__ = ()
+
+    def __new__(cls, id=None, name=None, email=None, phone=None, registration_date=None):
+        return super().__new__(cls, id, name, email, phone, registration_date or date.today())
+
+
+class Exhibition(_fields("Exhibition", "id title theme start_date end_date")):
+    __slots__ = ()
+
+
+class Provenance(_fields("Provenance", "id artwork_id provenance_entry entry_date")):
+    __slots__ = ()
+
+    def __new__(cls, id=None, artwork_id=None, provenance_entry=None, entry_date=None):
+        return super().__new__(cls, id, artwork_id, provenance_entry, entry_date or date.today())
+
+
+class Restoration(_fields("Restoration", "id artwork_id restorer_name start_date end_date cost "
+                                         "condition_before condition_after")):
+    __slots__ = ()
+
+    def __new__(cls, id=None, artwork_id=None, restorer_name=None, start_date=None, end_date=None,
+                cost=None, condition_before=None, condition_after=None):
+        return super().__new__(cls, id, artwork_id, restorer_name, start_date or date.today(), end_date,
+                               cost, condition_before, condition_after)
+
+
+class Document(_fields("Document", "id artwork_id document_type issue_date")):
+    __slots__ = ()
+
+    def __new__(cls, id=None, artwork_id=None, document_type=None, issue_date=None):
+        return super().__new__(cls, id, artwork_id, document_type, issue_date or date.today())
+
+
+class Material(_fields("Material", "id name unit_price")):
+    __slots__ = ()
+
+
+class Sale(_fields("Sale", "id artwork_id buyer_name sale_date price")):
+    __slots__ = ()
+
+    def __new__(cls, id=None, artwork_id=None, buyer_name=None, sale_date=None, price=None):
+        return super().__new__(cls, id, artwork_id, buyer_name, sale_date or date.today(), price)
+
+
+class Rental(_fields("Rental", "id artwork_id renter_name start_date end_date rental_fee")):
+    __slots__ = ()
+
+
+class VisitorReview(_fields("VisitorReview", "id exhibition_id review reviewer_name review_date")):
+    __slots__ = ()
+
+    def __new__(cls, id=None, exhibition_id=None, review=None, reviewer_name=None, review_date=None):
+        return super().__new__(cls, id, exhibition_id, review, reviewer_name, review_date or date.today())
+
+
+class PressReview(_fields("PressReview", "id exhibition_id review publication_name review_date")):
+    __slots__ = ()
+
+    def __new__(cls, id=None, exhibition_id=None, review=None, publication_name=None, review_date=None):
+        return super().__new__(cls, id, exhibition_id, review, publication_name, review_date or date.today())
+
+
+# Строки списков с JOIN (get_sales, get_restorations, get_documents)
+class SaleListing(_fields("SaleListing", "id artwork_title buyer_name sale_date price")):
+    __slots__ = ()
+
+
+class RestorationListing(_fields("RestorationListing", "id artwork_title restorer_name start_date end_date "
+                                                       "cost condition_before condition_after")):
+    __slots__ = ()
+
+
+class DocumentListing(_fields("DocumentListing", "id artwork_title document_type issue_date file_path")):
+    __slots__ = ()
+
+
+def row_factory(model):
+    """Фабрика строк sqlite3, создающая модели прямо из строк курсора:
+
+        cursor.row_factory = row_factory(Artwork)
+
+    Значения по умолчанию (например, сегодняшняя дата) к строкам базы не применяются.
+    """
+    make = model._make
+
+    def factory(cursor, row):
+        return make(row)
+
+    return factory
@@ -0,0 +1,287 @@
+"""
+Отчеты по истории галереи: показатели продаж, загрузка картин арендой,
+частота перемещений по местам и число отзывов о выставках.
+
+Большие таблицы агрегируются параллельно: диапазон id делится на части,
+каждую часть считает отдельный процесс со своим соединением только для чтения,
+затем частичные суммы складываются.
+
+Запуск:
+    python reports.py kpis
+    python reports.py utilization 2024-01-01 2024-12-31 --workers 4
+    python reports.py movements --start 2024-01-01 --end 2024-12-31
+    python reports.py reviews
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import pathlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+from services import DatabaseError, ValidationError, parse_period
+
+# Число процессов; None - по числу ядер
+REPORT_WORKERS = None
+# Таблицы с меньшим диапазоном id агрегируются в текущем процессе
+PARALLEL_MIN_ROWS = 200_000
+# Частей на процесс: при неравномерных данных процессы заканчивают почти одновременно
+CHUNKS_PER_WORKER = 4
+# PRAGMA для соединений только для чтения (journal_mode и synchronous им не нужны)
+READ_ONLY_PRAGMAS = ("cache_size", "mmap_size", "temp_store", "busy_timeout")
+
+
+def _connect(path):
+    """Соединение только для чтения: процессы отчетов не мешают пишущему соединению"""
+    conn = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    profile = database.PRAGMA_PROFILES[database.DEFAULT_PROFILE]
+    for name in READ_ONLY_PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {profile[name]}").fetchall()
+    return conn
+
+
+def _aggregate_range(path, sql, params):
+    """Частичный агрегат одной части: выполняется в процессе пула"""
+    conn = _connect(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _split(lo, hi, chunks):
+    """Делит [lo, hi] на chunks примерно равных диапазонов"""
+    step = math.ceil((hi - lo + 1) / chunks)
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+
+def _aggregate(parts, key_size, params=None, workers=None):
+    """Складывает частичные агрегаты запросов parts по ключу.
+
+    parts - пары (таблица, запрос); запрос группирует строки таблицы с id
+    из [:lo, :hi] и возвращает key_size столбцов ключа, затем аддитивные значения
+    (количества, суммы). Результат - словарь ключ -> список сумм значений.
+    """
+    workers = workers or REPORT_WORKERS or os.cpu_count() or 1
+    path = database.DATABASE
+    tasks = []
+    try:
+        conn = _connect(path)
+        try:
+            for table, sql in parts:
+                lo, hi = conn.execute(f"SELECT MIN(id), MAX(id) FROM {table}").fetchone()
+                if lo is None:
+                    continue
+                chunks = workers * CHUNKS_PER_WORKER if hi - lo + 1 >= PARALLEL_MIN_ROWS else 1
+                tasks.extend((sql, {**(params or {}), "lo": start, "hi": end})
+                             for start, end in _split(lo, hi, chunks))
+        finally:
+            conn.close()
+
+        if workers > 1 and len(tasks) > 1:
+            # spawn: fork процесса с потоками (GUI, пул соединений) небезопасен
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                partials = list(executor.map(_aggregate_range, [path] * len(tasks),
+                                             *zip(*tasks)))
+        else:
+            partials = [_aggregate_range(path, sql, task_params) for sql, task_params in tasks]
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+
+    totals = {}
+    for rows in partials:
+        for row in rows:
+            key, values = row[:key_size], row[key_size:]
+            total = totals.get(key)
+            if total is None:
+                totals[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    total[i] += value
+    return totals
+
+
+def _lookup(sql, ids):
+    """Словарь id -> остальные столбцы строк запроса sql по списку id"""
+    conn = _connect(database.DATABASE)
+    try:
+        return {row[0]: row[1:] for row in conn.execute(
+            f"{sql} WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(list(ids)),))}
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+    finally:
+        conn.close()
+
+
+def gallery_kpis(workers=None):
+    """Показатели продаж по годам и за всю историю.
+
+    Для каждого года (и строки "Итого"): число продаж, выручка, средняя цена
+    продажи, средняя цена по каталогу (Artwork.price) и среднее отношение
+    цены продажи к цене по каталогу.
+    """
+    totals = _aggregate([("Sale", '''
+        SELECT COALESCE(substr(s.sale_date, 1, 4), ''), COUNT(*), TOTAL(s.price),
+               COUNT(a.price), TOTAL(a.price),
+               COUNT(CASE WHEN a.price > 0 THEN 1 END), TOTAL(CASE WHEN a.price > 0 THEN s.price / a.price END)
+        FROM Sale s LEFT JOIN Artwork a ON a.id = s.artwork_id
+        WHERE s.id BETWEEN :lo AND :hi
+        GROUP BY 1
+    ''')], key_size=1, workers=workers)
+
+    overall = [sum(column) for column in zip(*totals.values())] or [0] * 6
+    rows = [(year, values) for (year,), values in sorted(totals.items())]
+    rows.append(("Итого", overall))
+    return [{
+        "year": year,
+        "sales": sales,
+        "revenue": revenue,
+        "average_sale": revenue / sales if sales else None,
+        "average_list_price": list_total / priced if priced else None,
+        "sale_to_list": ratio_total / ratios if ratios else None,
+    } for year, (sales, revenue, priced, list_total, ratios, ratio_total) in rows]
+
+
+def rental_utilization(start_date, end_date, workers=None):
+    """Загрузка картин арендой в периоде [start_date, end_date] (включительно).
+
+    Строки по убыванию загрузки: artwork_id, название, число аренд, дней в аренде
+    и доля дней периода. Картины без аренд в периоде не выводятся.
+    """
+    start_day, end_day = parse_period(start_date, end_date)
+    period_days = end_day - start_day + 1
+    totals = _aggregate([("Rental", '''
+        SELECT artwork_id, COUNT(*),
+               SUM(MIN(COALESCE(julianday(end_date), :end_jd), :end_jd) - MAX(julianday(start_date), :start_jd) + 1)
+        FROM Rental
+        WHERE id BETWEEN :lo AND :hi
+          AND julianday(start_date) <= :end_jd AND (end_date IS NULL OR julianday(end_date) >= :start_jd)
+        GROUP BY artwork_id
+    ''')], key_size=1, params={"start_jd": start_day + 2440587.5, "end_jd": end_day + 2440587.5},
+        workers=workers)
+
+    titles = _lookup("SELECT id, title FROM Artwork", [artwork_id for (artwork_id,) in totals])
+    rows = [{
+        "artwork_id": artwork_id,
+        "title": titles.get(artwork_id, (None,))[0],
+        "rentals": rentals,
+        "rented_days": int(days),
+        "utilization": days / period_days,
+    } for (artwork_id,), (rentals, days) in totals.items()]
+    rows.sort(key=lambda row: (-row["utilization"], row["artwork_id"]))
+    return rows
+
+
+def movement_frequency(start_date=None, end_date=None, workers=None):
+    """Частота перемещений по местам: сколько раз картины вывозили и привозили.
+
+    Если задан период, учитываются перемещения с movement_date в нем.
+    Строки по убыванию числа перемещений.
+    """
+    condition, params = "", {}
+    if start_date is not None or end_date is not None:
+        if start_date is None or end_date is None:
+            raise ValidationError("Период задается обеими датами.")
+        parse_period(start_date, end_date)
+        condition = "AND movement_date BETWEEN :start AND :end"
+        params = {"start": str(start_date), "end": str(end_date)}
+
+    # Одна группировка по паре мест дешевле двух группировок по местам отправления и прибытия
+    totals = _aggregate([("Movement", f'''
+        SELECT from_location, to_location, COUNT(*) FROM Movement
+        WHERE id BETWEEN :lo AND :hi {condition}
+        GROUP BY from_location, to_location
+    ''')], key_size=2, params=params, workers=workers)
+
+    counts = {}
+    for (from_location, to_location), (movements,) in totals.items():
+        counts.setdefault(from_location, [0, 0])[0] += movements
+        counts.setdefault(to_location, [0, 0])[1] += movements
+    rows = [{"location": location, "departures": departures, "arrivals": arrivals,
+             "movements": departures + arrivals}
+            for location, (departures, arrivals) in counts.items()]
+    rows.sort(key=lambda row: (-row["movements"], str(row["location"])))
+    return rows
+
+
+def exhibition_review_counts(workers=None):
+    """Число отзывов посетителей и прессы по выставкам, по убыванию общего числа.
+
+    Выставки без отзывов выводятся с нулями.
+    """
+    totals = _aggregate([
+        ("Visitor_Review", '''
+            SELECT exhibition_id, COUNT(*), 0 FROM Visitor_Review
+            WHERE id BETWEEN :lo AND :hi GROUP BY exhibition_id
+        '''),
+        ("Press_Review", '''
+            SELECT exhibition_id, 0, COUNT(*) FROM Press_Review
+            WHERE id BETWEEN :lo AND :hi GROUP BY exhibition_id
+        '''),
+    ], key_size=1, workers=workers)
+
+    conn = _connect(database.DATABASE)
+    try:
+        exhibitions = conn.execute("SELECT id, title FROM Exhibition").fetchall()
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+    finally:
+        conn.close()
+
+    rows = []
+    for exhibition_id, title in exhibitions:
+        visitor, press = totals.get((exhibition_id,), (0, 0))
+        rows.append({"exhibition_id": exhibition_id, "title": title, "visitor_reviews": visitor,
+                     "press_reviews": press, "reviews": visitor + press})
+    rows.sort(key=lambda row: (-row["reviews"], row["exhibition_id"]))
+    return rows
+
+
+def _print_rows(rows):
+    if not rows:
+        print("Нет данных")
+        return
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(line[i]) for line in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(w) for cell, w in zip(line, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Отчеты по истории галереи")
+    parser.add_argument("--db", default=database.DATABASE, help="файл базы данных")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию - по числу ядер)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("kpis", help="показатели продаж по годам")
+    utilization = commands.add_parser("utilization", help="загрузка картин арендой")
+    utilization.add_argument("start")
+    utilization.add_argument("end")
+    movements = commands.add_parser("movements", help="частота перемещений по местам")
+    movements.add_argument("--start")
+    movements.add_argument("--end")
+    commands.add_parser("reviews", help="число отзывов о выставках")
+
+    args = parser.parse_args(argv)
+    database.DATABASE = args.db
+    if args.command == "kpis":
+        rows = gallery_kpis(args.workers)
+    elif args.command == "utilization":
+        rows = rental_utilization(args.start, args.end, args.workers)
+    elif args.command == "movements":
+        rows = movement_frequency(args.start, args.end, args.workers)
+    else:
+        rows = exhibition_review_counts(args.workers)
+    _print_rows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,34 @@
-from datetime import date
-from database import get_connection
+from datetime import date, timedelta
+from database import (get_connection, get_pool_stats, SEARCH_INDEXES, AVAILABILITY_INDEX,
+                      AVAILABILITY_OPEN_END, recompute_financial_summaries,
+                      find_financial_summary_mismatches, financial_summaries_cover)
+from models import (Artwork, Artist, Exhibition, Visitor, Movement, Material, VisitorReview, PressReview,
+                    Provenance, Restoration, Document, Sale, Rental,
+                    SaleListing, RestorationListing, DocumentListing, row_factory)
 import sqlite3
+import base64
+import bisect
+import csv
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: расчет стоимости аренды работает и без него
+    np = None
+
+logger = logging.getLogger(__name__)
 
 
 class ArtGalleryError(Exception):
@@ -18,7 +46,7 @@ class ValidationError(ArtGalleryError):
     pass
 
 
-def _validate_artwork_data(title: str, artist_id: int):
+def validate_artwork_data(title: str, artist_id: int):
     """Валидация базовых данных о картине"""
     if not title or not isinstance(title, str):
         raise ValidationError("Название картины обязательно и должно быть строкой")
@@ -26,70 +54,834 @@ def _validate_artwork_data(title: str, artist_id: int):
         raise ValidationError("ID художника должен быть положительным целым числом")
 
 
-def _execute_db_operation(operation, *args, **kwargs):
-    """Обертка для выполнения операций с БД с обработкой ошибок"""
+def validate_artwork_price(price: float):
+    """Валидация цены картины"""
+    if not isinstance(price, (int, float)) or price < 0:
+        raise ValidationError("Цена должна быть положительным числом")
+
+
+def validate_artist_data(name: str, biography: str):
+    """Валидация данных о художнике"""
+    if not name or not isinstance(name, str):
+        raise ValidationError("Имя художника обязательно и должно быть строкой.")
+    if not biography or not isinstance(biography, str):
+        raise ValidationError("Биография художника обязательна и должна быть строкой.")
+
+
+def validate_visitor_data(name: str, email: str, phone: str):
+    """Валидация данных о посетителе (уникальность email проверяется при вставке)"""
+    if not name or not isinstance(name, str):
+        raise ValidationError("Имя посетителя обязательно и должно быть строкой.")
+    if not email or not isinstance(email, str) or "@" not in email:
+        raise ValidationError("Email должен содержать символ '@'.")
+    if not phone or not isinstance(phone, str):
+        raise ValidationError("Телефон обязателен и должен быть строкой.")
+
+
+def validate_movement_data(artwork_id: int, from_location: str, to_location: str, purpose: str,
+                           responsible_person: str):
+    """Валидация данных о перемещении (существование картины проверяется при вставке)"""
+    if not isinstance(artwork_id, int) or artwork_id <= 0:
+        raise ValidationError("ID картины должен быть положительным целым числом.")
+    if not from_location or not isinstance(from_location, str):
+        raise ValidationError("Место отправления обязательно и должно быть строкой.")
+    if not to_location or not isinstance(to_location, str):
+        raise ValidationError("Место назначения обязательно и должно быть строкой.")
+    if not purpose or not isinstance(purpose, str):
+        raise ValidationError("Цель перемещения обязательна и должна быть строкой.")
+    if not responsible_person or not isinstance(responsible_person, str):
+        raise ValidationError("Ответственное лицо обязательно и должно быть строкой.")
+
+
+# Профилирование запросов
+SLOW_QUERY_MS = 100.0       # запросы дольше порога попадают в журнал медленных
+QUERY_STATS_WINDOW = 512    # сколько последних замеров каждого запроса хранится
+SLOW_QUERY_LOG_SIZE = 50
+# Верхние границы корзин гистограммы времени выполнения (мс); последняя корзина - все, что дольше
+QUERY_HISTOGRAM_BOUNDS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+
+@lru_cache(maxsize=1024)
+def _normalize_sql(sql: str) -> str:
+    """Текст запроса в одну строку: одинаковые запросы с разными отступами совпадают"""
+    return " ".join(sql.split())
+
+
+def _operation_name(operation) -> str:
+    """Имя функции services, в которой определена operation (sell_artwork.<locals>.operation)"""
+    return operation.__qualname__.split(".<locals>", 1)[0]
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[round((len(sorted_values) - 1) * fraction)]
+
+
+class QueryStats:
+    """Статистика выполнения SQL-запросов в памяти процесса.
+
+    Ключ - пара (функция services, текст запроса). Кроме общих счетчиков
+    хранятся последние window замеров: по ним считаются перцентили и
+    гистограмма, поэтому они отражают текущую нагрузку, а не всю историю.
+    Запросы дольше slow_ms попадают в журнал медленных вместе с планом
+    EXPLAIN QUERY PLAN и пишутся в лог.
+    """
+
+    def __init__(self, window=QUERY_STATS_WINDOW, slow_ms=SLOW_QUERY_MS, slow_log_size=SLOW_QUERY_LOG_SIZE):
+        self.window = window
+        self.slow_ms = slow_ms
+        self.enabled = True
+        self._queries = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def record(self, function, sql, elapsed_ms, rows):
+        """Добавляет замер; возвращает True, если запрос медленный"""
+        key = (function, sql)
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None:
+                entry = self._queries[key] = {"calls": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                              "recent": deque(maxlen=self.window)}
+            entry["calls"] += 1
+            entry["rows"] += rows
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["recent"].append(elapsed_ms)
+        return elapsed_ms >= self.slow_ms
+
+    def record_slow(self, function, sql, elapsed_ms, rows, plan):
+        self._slow.append({"function": function, "sql": sql, "elapsed_ms": elapsed_ms,
+                           "rows": rows, "plan": plan, "time": time.time()})
+        logger.warning("Медленный запрос в %s: %.1f мс, строк %d\n%s\nПлан:\n%s",
+                       function, elapsed_ms, rows, sql, "\n".join(plan or ["недоступен"]))
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._slow.clear()
+
+    def snapshot(self):
+        """Сводка: запросы по убыванию суммарного времени, итоги по функциям, медленные запросы"""
+        with self._lock:
+            entries = [(key, dict(entry, recent=sorted(entry["recent"])))
+                       for key, entry in self._queries.items()]
+            slow = list(self._slow)
+
+        queries = []
+        functions = {}
+        for (function, sql), entry in entries:
+            recent = entry.pop("recent")
+            histogram = [0] * (len(QUERY_HISTOGRAM_BOUNDS) + 1)
+            for elapsed_ms in recent:
+                histogram[bisect.bisect_left(QUERY_HISTOGRAM_BOUNDS, elapsed_ms)] += 1
+            entry.update(function=function, sql=sql, mean_ms=entry["total_ms"] / entry["calls"],
+                         p50_ms=_percentile(recent, 0.50), p95_ms=_percentile(recent, 0.95),
+                         p99_ms=_percentile(recent, 0.99), histogram=histogram)
+            queries.append(entry)
+
+            totals = functions.setdefault(function, {"statements": 0, "rows": 0, "total_ms": 0.0})
+            totals["statements"] += entry["calls"]
+            totals["rows"] += entry["rows"]
+            totals["total_ms"] += entry["total_ms"]
+
+        queries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return {"queries": queries, "functions": functions, "slow_queries": slow,
+                "histogram_bounds_ms": list(QUERY_HISTOGRAM_BOUNDS), "slow_query_ms": self.slow_ms}
+
+
+_query_stats = QueryStats()
+
+
+class _ProfiledCursor:
+    """Курсор sqlite3, замеряющий время и число строк каждого запроса.
+
+    SQLite выполняет SELECT по мере чтения строк, поэтому время запроса - это
+    execute плюс все последующие fetch*. Замер записывается, когда курсор
+    переходит к следующему запросу или операция завершается (finish).
+    Для INSERT/UPDATE/DELETE число строк - rowcount.
+    session - GallerySession, в которой выполняется операция (или None).
+    """
+    __slots__ = ("_cursor", "_function", "_sql", "_params", "_elapsed", "_rows", "session")
+
+    def __init__(self, cursor, function, session=None):
+        self._cursor = cursor
+        self._function = function
+        self._sql = None
+        self.session = session
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    @property
+    def row_factory(self):
+        return self._cursor.row_factory
+
+    @row_factory.setter
+    def row_factory(self, factory):
+        self._cursor.row_factory = factory
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def _run(self, method, sql, params, explain_params):
+        self.finish()
+        start = time.perf_counter()
+        method(sql, params)
+        self._elapsed = time.perf_counter() - start
+        self._sql, self._params, self._rows = sql, explain_params, 0
+        return self
+
+    def execute(self, sql, params=()):
+        return self._run(self._cursor.execute, sql, params, params)
+
+    def executemany(self, sql, seq_of_params):
+        # План executemany строится по первой строке параметров
+        if not isinstance(seq_of_params, (list, tuple)):
+            seq_of_params = list(seq_of_params)
+        return self._run(self._cursor.executemany, sql, seq_of_params,
+                         seq_of_params[0] if seq_of_params else ())
+
+    def _fetched(self, start, count):
+        self._elapsed += time.perf_counter() - start
+        self._rows += count
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size or self._cursor.arraysize)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def finish(self):
+        """Записывает замер текущего запроса (если он был)"""
+        sql = self._sql
+        if sql is None:
+            return
+        self._sql = None
+        stats = _query_stats
+        if not stats.enabled:
+            return
+        rows = self._rows or max(self._cursor.rowcount, 0)
+        elapsed_ms = self._elapsed * 1000
+        normalized = _normalize_sql(sql)
+        if stats.record(self._function, normalized, elapsed_ms, rows):
+            stats.record_slow(self._function, normalized, elapsed_ms, rows, self._explain(sql))
+
+    def _explain(self, sql):
+        try:
+            plan = self._cursor.connection.execute(f"EXPLAIN QUERY PLAN {sql}", self._params).fetchall()
+        except sqlite3.Error:
+            return None
+        return [detail for _, _, _, detail in plan]
+
+
+def _profiled_cursor(conn, operation):
+    return _ProfiledCursor(conn.cursor(), _operation_name(operation))
+
+
+def _execute_db_operation(operation, *args, session=None, **kwargs):
+    """Обертка для выполнения операций с БД с обработкой ошибок.
+
+    Запросы operation замеряются (см. get_db_stats). Если передана session,
+    operation выполняется в ее транзакции (см. GallerySession).
+    """
+    if session is not None:
+        return session.run(operation, *args, **kwargs)
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = _profiled_cursor(conn, operation)
+        result = operation(cursor, *args, **kwargs)
+        cursor.finish()
+        conn.commit()
+        return result
+    except sqlite3.Error as e:
+        if conn:
+            conn.rollback()
+        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def _execute_db_transaction(operation, *args, session=None, **kwargs):
+    """Как _execute_db_operation, но внутри явной транзакции BEGIN IMMEDIATE:
+    все изменения operation фиксируются одним коммитом или откатываются вместе"""
+    if session is not None:
+        return session.run(operation, *args, **kwargs)
     conn = None
     try:
         conn = get_connection()
-        cursor = conn.cursor()
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = _profiled_cursor(conn, operation)
         result = operation(cursor, *args, **kwargs)
+        cursor.finish()
         conn.commit()
         return result
     except sqlite3.Error as e:
         if conn:
             conn.rollback()
         raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+    except BaseException:
+        if conn and conn.in_transaction:
+            conn.rollback()
+        raise
     finally:
         if conn:
             conn.close()
 
 
+
+# Таблицы моделей, которые GallerySession загружает и записывает
+_SESSION_TABLES = {
+    Artwork: "Artwork", Artist: "Artist", Exhibition: "Exhibition", Visitor: "Visitor",
+    Movement: "Movement", Material: "Material", Provenance: "Provenance", Restoration: "Restoration",
+    Document: "Document", Sale: "Sale", Rental: "Rental",
+    VisitorReview: "Visitor_Review", PressReview: "Press_Review",
+}
+
+
+class GallerySession:
+    """Единица работы: несколько вызовов services одной транзакцией.
+
+        with GallerySession() as session:
+            artwork = session.get(Artwork, artwork_id)
+            sell_artwork(artwork.id, "Покупатель", artwork.price, session=session)
+            add_document(artwork.id, "Договор купли-продажи", path, session=session)
+
+    Сессия держит одно соединение с транзакцией BEGIN IMMEDIATE и при выходе
+    из блока фиксирует ее одним коммитом (при исключении - откатывает). Каждый
+    вызов services в сессии выполняется в точке сохранения: при его ошибке
+    откатываются только его изменения.
+
+    Загруженные строки хранятся в карте идентичности: повторный get той же
+    строки не обращается к базе. add, update и delete только запоминают
+    изменения; flush записывает их сгруппированными executemany - перед каждым
+    вызовом services в сессии и при фиксации. После фиксации или отката карта
+    очищается: строки могли измениться другими соединениями.
+
+    Сессию используют из одного потока.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._identity = {}    # (модель, id) -> строка
+        self._new = {}         # добавленные строки, еще не записанные в базу
+        self._dirty = {}       # (модель, id) -> измененные поля
+        self._deleted = {}     # (модель, id) -> None, в порядке удаления
+        self._next_ids = {}    # модель -> следующий свободный id
+        self._reference_tables = set()  # справочники, измененные в текущей транзакции
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = get_connection()
+        if not self._conn.in_transaction:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.Error as e:
+                raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+        return self._conn
+
+    def _cursor(self, function):
+        return _ProfiledCursor(self._connection().cursor(), f"GallerySession.{function}", self)
+
+    @contextmanager
+    def _savepoint(self):
+        """Изменения блока откатываются вместе, не затрагивая остальную транзакцию"""
+        conn = self._connection()
+        conn.execute("SAVEPOINT gallery_session")
+        try:
+            yield
+        except BaseException as e:
+            conn.execute("ROLLBACK TO gallery_session")
+            conn.execute("RELEASE gallery_session")
+            # Карта могла уже отражать откаченные изменения: оставляем только
+            # еще не записанные строки, остальные загрузятся заново
+            self._identity = {**self._new, **{key: self._identity[key] for key in self._dirty}}
+            self._next_ids.clear()
+            if isinstance(e, sqlite3.Error):
+                raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+            raise
+        conn.execute("RELEASE gallery_session")
+
+    @staticmethod
+    def _key(entity):
+        if type(entity) not in _SESSION_TABLES:
+            raise ValidationError(f"Сессия не работает с объектами {type(entity).__name__}.")
+        if entity.id is None:
+            raise ValidationError("У строки нет ID.")
+        return type(entity), entity.id
+
+    # Чтение
+
+    def get(self, model, row_id):
+        """Строка model с ID row_id или None; повторные вызовы берут ее из карты"""
+        key = (model, row_id)
+        entity = self._identity.get(key)
+        if entity is not None or key in self._deleted:
+            return entity
+        return self.get_many(model, [row_id])[0]
+
+    def get_many(self, model, row_ids):
+        """Строки model по списку ID (None для отсутствующих); недостающие
+        в карте загружаются одним запросом"""
+        table = _SESSION_TABLES.get(model)
+        if table is None:
+            raise ValidationError(f"Сессия не работает с моделью {getattr(model, '__name__', model)}.")
+        missing = sorted({i for i in row_ids if (model, i) not in self._identity and (model, i) not in self._deleted})
+        if missing:
+            cursor = self._cursor("get")
+            try:
+                cursor.execute(f'SELECT * FROM {table} WHERE id IN (SELECT value FROM json_each(?))',
+                               (json.dumps(missing),))
+                for row in cursor.fetchall():
+                    self._identity[(model, row[0])] = model._make(row)
+                cursor.finish()
+            except sqlite3.Error as e:
+                raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+        return [self._identity.get((model, i)) for i in row_ids]
+
+    # Изменения
+
+    def _next_id(self, model):
+        # Внутри BEGIN IMMEDIATE других писателей нет, поэтому ID можно выдать заранее
+        next_id = self._next_ids.get(model)
+        if next_id is None:
+            cursor = self._cursor("add")
+            try:
+                cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {_SESSION_TABLES[model]}')
+                next_id = cursor.fetchone()[0] + 1
+                cursor.finish()
+            except sqlite3.Error as e:
+                raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+        self._next_ids[model] = next_id + 1
+        return next_id
+
+    def add(self, entity):
+        """Добавляет строку; без ID ей выдается следующий свободный. Возвращает строку с ID"""
+        if type(entity) not in _SESSION_TABLES:
+            raise ValidationError(f"Сессия не работает с объектами {type(entity).__name__}.")
+        if entity.id is None:
+            entity = entity._replace(id=self._next_id(type(entity)))
+        key = type(entity), entity.id
+        if key in self._identity:
+            raise ValidationError(f"{type(entity).__name__} с ID {entity.id} уже есть в сессии.")
+        self._identity[key] = self._new[key] = entity
+        return entity
+
+    def update(self, entity, **changes):
+        """Меняет поля строки; возвращает новую строку (модели неизменяемы)"""
+        key = self._key(entity)
+        unknown = [name for name in changes if name not in entity._fields or name == "id"]
+        if unknown:
+            raise ValidationError(f"Нельзя изменить поля: {', '.join(unknown)}")
+        if key in self._deleted:
+            raise ValidationError(f"{type(entity).__name__} с ID {entity.id} удален в этой сессии.")
+        entity = self._identity.get(key, entity)._replace(**changes)
+        self._identity[key] = entity
+        if key in self._new:
+            self._new[key] = entity
+        else:
+            self._dirty.setdefault(key, set()).update(changes)
+        return entity
+
+    def delete(self, entity):
+        """Удаляет строку (без связанных записей - для картин см. delete_artwork)"""
+        key = self._key(entity)
+        self._identity.pop(key, None)
+        self._dirty.pop(key, None)
+        if self._new.pop(key, None) is None:
+            self._deleted[key] = None
+
+    def flush(self):
+        """Записывает накопленные изменения; строки одной таблицы с одинаковым
+        набором полей пишутся одним executemany. Возвращает число строк"""
+        if not (self._new or self._dirty or self._deleted):
+            return 0
+        inserts, updates, deletes = {}, {}, {}
+        for entity in self._new.values():
+            inserts.setdefault(type(entity), []).append(tuple(entity))
+        for (model, row_id), fields in self._dirty.items():
+            entity = self._identity[(model, row_id)]
+            # Поля в порядке модели, чтобы одинаковые наборы давали один запрос
+            columns = tuple(name for name in model._fields if name in fields)
+            updates.setdefault((model, columns), []).append(
+                tuple(getattr(entity, name) for name in columns) + (row_id,))
+        for model, row_id in self._deleted:
+            deletes.setdefault(model, []).append((row_id,))
+
+        cursor = self._cursor("flush")
+        with self._savepoint():
+            for model, rows in inserts.items():
+                cursor.executemany(f"INSERT INTO {_SESSION_TABLES[model]} ({', '.join(model._fields)}) "
+                                   f"VALUES ({', '.join('?' * len(model._fields))})", rows)
+            for (model, columns), rows in updates.items():
+                cursor.executemany(f"UPDATE {_SESSION_TABLES[model]} SET "
+                                   f"{', '.join(f'{name} = ?' for name in columns)} WHERE id = ?", rows)
+            for model, rows in deletes.items():
+                cursor.executemany(f"DELETE FROM {_SESSION_TABLES[model]} WHERE id = ?", rows)
+            cursor.finish()
+        count = len(self._new) + len(self._dirty) + len(self._deleted)
+        self._new.clear()
+        self._dirty.clear()
+        self._deleted.clear()
+        written = {_SESSION_TABLES[model] for model in [*inserts, *(model for model, _ in updates), *deletes]}
+        self._reference_tables.update(written & _REFERENCE_TABLES)
+        return count
+
+    def run(self, operation, *args, **kwargs):
+        """Выполняет operation(cursor, ...) в транзакции сессии (см. _execute_db_operation)"""
+        self.flush()
+        cursor = _ProfiledCursor(self._connection().cursor(), _operation_name(operation), self)
+        try:
+            with self._savepoint():
+                result = operation(cursor, *args, **kwargs)
+                cursor.finish()
+        finally:
+            # operation могла добавить строки: следующий ID читается заново
+            self._next_ids.clear()
+        return result
+
+    def _synchronize(self, model, row_id, changes):
+        """Отражает в карте изменения, сделанные запросами services.
+        changes=None - строка изменена иначе или удалена: она загрузится заново"""
+        key = (model, row_id)
+        if changes is not None:
+            if key in self._identity:
+                self._identity[key] = self._identity[key]._replace(**changes)
+            return
+        self._identity.pop(key, None)
+        if model is Artwork:
+            # delete_artwork удаляет и записи, связанные с картиной
+            for key in [key for key, entity in self._identity.items()
+                        if getattr(entity, "artwork_id", None) == row_id]:
+                del self._identity[key]
+
+    # Завершение
+
+    def _reset(self):
+        # Кэш справочников, измененных в сессии, мог загрузить их прежние строки
+        for table in self._reference_tables:
+            _reference_cache.invalidate(table)
+        self._identity.clear()
+        self._new.clear()
+        self._dirty.clear()
+        self._deleted.clear()
+        self._next_ids.clear()
+        self._reference_tables.clear()
+
+    def commit(self):
+        """Записывает изменения и фиксирует транзакцию"""
+        if self._conn is None:
+            return
+        try:
+            self.flush()
+            if self._conn.in_transaction:
+                self._conn.commit()
+        except sqlite3.Error as e:
+            self.rollback()
+            raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+        self._reset()
+
+    def rollback(self):
+        """Отменяет все изменения сессии"""
+        try:
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+        finally:
+            self._reset()
+
+    def close(self):
+        """Откатывает незафиксированные изменения и возвращает соединение в пул"""
+        if self._conn is None:
+            return
+        try:
+            self.rollback()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+def _load_artwork(cursor, artwork_id):
+    """Строка картины (Artwork) или None: в сессии - из карты идентичности"""
+    if cursor.session is not None:
+        return cursor.session.get(Artwork, artwork_id)
+    cursor.execute('SELECT * FROM Artwork WHERE id = ?', (artwork_id,))
+    row = cursor.fetchone()
+    return Artwork._make(row) if row else None
+
+
+def _synchronize_session(cursor, model, row_id, changes=None):
+    """Сообщает сессии операции об изменении строки запросом (см. GallerySession._synchronize)"""
+    if cursor.session is not None:
+        cursor.session._synchronize(model, row_id, changes)
+
+
+class ReferenceCache:
+    """Кэш справочных данных (художники, материалы, выставки) в памяти процесса.
+
+    Записи живут не дольше ttl секунд, при превышении max_size вытесняются
+    давно не использованные (LRU). Ключ - кортеж, первый элемент которого имя
+    таблицы: по нему сбрасываются записи при изменении таблицы.
+    """
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key, loader):
+        """Значение по ключу; при промахе вызывает loader(). None не кэшируется"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+
+        value = loader()
+        if value is not None:
+            with self._lock:
+                self._data[key] = (now + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return value
+
+    def invalidate(self, table=None):
+        """Сбрасывает записи таблицы table (или весь кэш)"""
+        with self._lock:
+            if table is None:
+                self._data.clear()
+            else:
+                for key in [key for key in self._data if key[0] == table]:
+                    del self._data[key]
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=len(self._data))
+
+
+_reference_cache = ReferenceCache()
+# Таблицы, строки которых хранит кэш
+_REFERENCE_TABLES = frozenset({"Artist", "Exhibition", "Material"})
+
+
+def _reference_row(cursor, table: str, row_id: int):
+    """Строка справочной таблицы (кортеж столбцов) через кэш или None"""
+    def load():
+        cursor.execute(f'SELECT * FROM {table} WHERE id = ?', (row_id,))
+        return cursor.fetchone()
+    # Сессия видит свои незафиксированные строки - в общий кэш они попасть не должны
+    if cursor.session is not None:
+        return load()
+    return _reference_cache.get((table, row_id), load)
+
+
+def _reference_exists(cursor, table: str, row_id: int) -> bool:
+    """Проверка существования строки справочной таблицы через кэш"""
+    return _reference_row(cursor, table, row_id) is not None
+
+
+def _invalidate_reference(table: str, session=None):
+    """Сбрасывает кэш справочника table после его изменения. В сессии - когда
+    она завершится: до фиксации другие соединения видят прежние строки"""
+    if session is not None:
+        session._reference_tables.add(table)
+    else:
+        _reference_cache.invalidate(table)
+
+
+def _cached_table(table: str, operation):
+    """Весь справочник table из кэша; копия списка, чтобы кэш нельзя было испортить"""
+    return list(_reference_cache.get((table, "*"), lambda: _execute_db_operation(operation)))
+
+
+def get_cache_stats():
+    """Счетчики кэша справочных данных: попадания, промахи, вытеснения"""
+    return _reference_cache.stats()
+
+
+def invalidate_reference_cache(table: str = None):
+    """Сбрасывает кэш справочных данных, например после изменений в обход services"""
+    _reference_cache.invalidate(table)
+
+
+def get_db_stats():
+    """Статистика работы с базой данных.
+
+    queries - по каждому запросу и вызвавшей его функции: число вызовов и строк,
+    суммарное, среднее и максимальное время, перцентили и гистограмма последних
+    замеров (границы корзин - histogram_bounds_ms); functions - итоги по функциям;
+    slow_queries - последние медленные запросы с планами; pool и cache - счетчики
+    пула соединений и кэша справочников.
+    """
+    stats = _query_stats.snapshot()
+    stats["pool"] = get_pool_stats()
+    stats["cache"] = get_cache_stats()
+    return stats
+
+
+def reset_db_stats():
+    """Обнуляет статистику запросов (счетчики пула и кэша не меняются)"""
+    _query_stats.reset()
+
+
+def configure_query_profiling(enabled: bool = None, slow_query_ms: float = None):
+    """Включает/выключает замеры запросов и меняет порог медленного запроса"""
+    if slow_query_ms is not None:
+        if not isinstance(slow_query_ms, (int, float)) or slow_query_ms < 0:
+            raise ValidationError("Порог медленного запроса должен быть неотрицательным числом.")
+        _query_stats.slow_ms = slow_query_ms
+    if enabled is not None:
+        _query_stats.enabled = bool(enabled)
+
+
 # 1. Приобретение картины
 def acquire_artwork(title: str, year_created: int, technique: str, dimensions: str,
-                    description: str, genre: str, artist_id: int, provenance_entry: str, price: float) -> int:
+                    description: str, genre: str, artist_id: int, provenance_entry: str, price: float,
+                    session: GallerySession = None) -> int:
     """Добавляет новую картину и возвращает её ID"""
-    conn = None
     try:
-        _validate_artwork_data(title, artist_id)
-        if not isinstance(price, (int, float)) or price < 0:
-            raise ValidationError("Цена должна быть положительным числом")
+        validate_artwork_data(title, artist_id)
+        validate_artwork_price(price)
 
-        conn = get_connection()
-        cursor = conn.cursor()
+        def operation(cursor):
+            # Проверяем существование художника
+            if not _reference_exists(cursor, "Artist", artist_id):
+                raise DatabaseError(f"Художник с ID {artist_id} не существует")
 
-        # Проверяем существование художника
-        cursor.execute('SELECT 1 FROM Artist WHERE id = ?', (artist_id,))
-        if not cursor.fetchone():
-            raise DatabaseError(f"Художник с ID {artist_id} не существует")
+            # Добавление картины
+            cursor.execute('''
+                INSERT INTO Artwork (title, year_created, technique, dimensions,
+                                   description, genre, current_location, status, artist_id, price)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, year_created, technique, dimensions, description,
+                  genre, "Gallery Storage", "Acquired", artist_id, price))
+            artwork_id = cursor.lastrowid
+
+            # Добавление провенанса
+            cursor.execute('''
+                INSERT INTO Provenance (artwork_id, provenance_entry, entry_date)
+                VALUES (?, ?, ?)
+            ''', (artwork_id, provenance_entry, date.today()))
+            return artwork_id
 
-        # Добавление картины
-        cursor.execute('''
-            INSERT INTO Artwork (title, year_created, technique, dimensions,
-                               description, genre, current_location, status, artist_id, price)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (title, year_created, technique, dimensions, description,
-              genre, "Gallery Storage", "Acquired", artist_id, price))
-        artwork_id = cursor.lastrowid
+        return _execute_db_transaction(operation, session=session)
+    except ArtGalleryError:
+        raise
+    except Exception as e:
+        raise ArtGalleryError(f"Ошибка при добавлении картины: {str(e)}")
 
-        # Добавление провенанса
-        cursor.execute('''
+# 1а. Массовое приобретение картин
+# Поля строки для acquire_artworks_batch - те же, что у acquire_artwork
+_ARTWORK_BATCH_FIELDS = ("title", "year_created", "technique", "dimensions", "description",
+                         "genre", "artist_id", "provenance_entry", "price")
+
+
+def acquire_artworks_batch(artworks, session: GallerySession = None):
+    """Добавляет много картин одной транзакцией.
+
+    artworks - последовательность словарей с полями как у acquire_artwork.
+    Возвращает (ids, errors): ids - ID новых картин в порядке входных строк
+    (None для отклоненных), errors - список (номер строки, текст ошибки).
+    Ошибочные строки пропускаются, остальные добавляются.
+    """
+    ids = [None] * len(artworks)
+    errors = []
+    valid = []
+    for index, row in enumerate(artworks):
+        try:
+            missing = [field for field in _ARTWORK_BATCH_FIELDS if field not in row]
+            if missing:
+                raise ValidationError(f"Не заполнены поля: {', '.join(missing)}")
+            validate_artwork_data(row["title"], row["artist_id"])
+            validate_artwork_price(row["price"])
+            valid.append((index, row))
+        except ValidationError as e:
+            errors.append((index, str(e)))
+        except TypeError:
+            errors.append((index, "Строка должна быть словарем с полями картины"))
+    if not valid:
+        return ids, errors
+
+    def operation(cursor):
+        # Существование всех художников проверяется одним запросом
+        artist_ids = sorted({row["artist_id"] for _, row in valid})
+        cursor.execute('SELECT id FROM Artist WHERE id IN (SELECT value FROM json_each(?))',
+                       (json.dumps(artist_ids),))
+        existing = {r[0] for r in cursor.fetchall()}
+
+        accepted = []
+        for index, row in valid:
+            if row["artist_id"] in existing:
+                accepted.append((index, row))
+            else:
+                errors.append((index, f"Художник с ID {row['artist_id']} не существует"))
+        if not accepted:
+            return
+
+        # Внутри BEGIN IMMEDIATE других писателей нет, поэтому ID можно выдать заранее
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM Artwork')
+        next_id = cursor.fetchone()[0] + 1
+        today = date.today()
+        artwork_rows = []
+        provenance_rows = []
+        for offset, (index, row) in enumerate(accepted):
+            artwork_id = next_id + offset
+            ids[index] = artwork_id
+            artwork_rows.append((artwork_id, row["title"], row["year_created"], row["technique"],
+                                 row["dimensions"], row["description"], row["genre"],
+                                 "Gallery Storage", "Acquired", row["artist_id"], row["price"]))
+            provenance_rows.append((artwork_id, row["provenance_entry"], today))
+
+        cursor.executemany('''
+            INSERT INTO Artwork (id, title, year_created, technique, dimensions,
+                               description, genre, current_location, status, artist_id, price)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', artwork_rows)
+        cursor.executemany('''
             INSERT INTO Provenance (artwork_id, provenance_entry, entry_date)
             VALUES (?, ?, ?)
-        ''', (artwork_id, provenance_entry, date.today()))
-
-        conn.commit()
-        return artwork_id
+        ''', provenance_rows)
 
-    except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        raise DatabaseError(f"Ошибка при добавлении картины: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+    # При ошибке базы данных транзакция откатывается целиком
+    _execute_db_transaction(operation, session=session)
+    errors.sort()
+    return ids, errors
 
 # 2. Фиксация состояния перед реставрацией
-def record_restoration_state(artwork_id: int, restorer_name: str, condition_before: str, cost: float, end_date=None):
+def record_restoration_state(artwork_id: int, restorer_name: str, condition_before: str, cost: float, end_date=None,
+                             session: GallerySession = None):
     """Записывает информацию о начале реставрации"""
     try:
         if not isinstance(artwork_id, int) or artwork_id <= 0:
@@ -108,9 +900,15 @@ def record_restoration_state(artwork_id: int, restorer_name: str, condition_befo
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (artwork_id, restorer_name, date.today(), end_date,
                   cost, condition_before, "Restoration in progress"))
-            return cursor.lastrowid
-
-        return _execute_db_operation(operation)
+            restoration_id = cursor.lastrowid
+            if financial_summaries_cover(cursor, artwork_id):
+                cursor.execute('''
+                    INSERT INTO Restoration_Cost (restoration_id, artwork_id, labor_cost, materials_cost)
+                    VALUES (?, ?, ?, 0)
+                ''', (restoration_id, artwork_id, cost))
+            return restoration_id
+
+        return _execute_db_transaction(operation, session=session)
     except ArtGalleryError:
         raise
     except Exception as e:
@@ -123,6 +921,7 @@ def get_artworks():
     """Возвращает список всех картин"""
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(Artwork)
             cursor.execute('SELECT * FROM Artwork')
             return cursor.fetchall()
 
@@ -132,7 +931,7 @@ def get_artworks():
 
 
 # 4. Учет стоимости картин
-def update_artwork_price(artwork_id: int, new_price: float):
+def update_artwork_price(artwork_id: int, new_price: float, session: GallerySession = None):
     try:
         if not isinstance(artwork_id, int) or artwork_id <= 0:
             raise ValidationError("Некорректный ID картины.")
@@ -141,17 +940,17 @@ def update_artwork_price(artwork_id: int, new_price: float):
 
         def operation(cursor):
             # Проверяем существование картины
-            cursor.execute('SELECT 1 FROM Artwork WHERE id = ?', (artwork_id,))
-            if not cursor.fetchone():
+            if _load_artwork(cursor, artwork_id) is None:
                 raise DatabaseError(f"Картина с ID {artwork_id} не существует.")
 
             # Обновляем стоимость картины
             cursor.execute('''
                 UPDATE Artwork SET price = ? WHERE id = ?
             ''', (new_price, artwork_id))
+            _synchronize_session(cursor, Artwork, artwork_id, {"price": new_price})
             return cursor.rowcount
 
-        return _execute_db_operation(operation)
+        return _execute_db_operation(operation, session=session)
     except ArtGalleryError:
         raise
     except Exception as e:
@@ -159,7 +958,7 @@ def update_artwork_price(artwork_id: int, new_price: float):
 
 
 # 5. Документация о подлинности
-def add_document(artwork_id: int, document_type: str, file_path: str):
+def add_document(artwork_id: int, document_type: str, file_path: str, session: GallerySession = None):
     """Добавляет документ о подлинности картины"""
     try:
         if not isinstance(artwork_id, int) or artwork_id <= 0:
@@ -182,7 +981,7 @@ def add_document(artwork_id: int, document_type: str, file_path: str):
             ''', (document_id, file_path, date.today()))
             return document_id
 
-        return _execute_db_operation(operation)
+        return _execute_db_operation(operation, session=session)
     except ArtGalleryError:
         raise
     except Exception as e:
@@ -192,9 +991,10 @@ def add_document(artwork_id: int, document_type: str, file_path: str):
 def get_artists():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(Artist)
             cursor.execute('SELECT * FROM Artist')
             return cursor.fetchall()
-        return _execute_db_operation(operation)
+        return _cached_table("Artist", operation)
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка художников: {str(e)}")
 
@@ -202,56 +1002,44 @@ def get_artists():
 def get_exhibitions():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(Exhibition)
             cursor.execute('SELECT * FROM Exhibition')
             return cursor.fetchall()
-        return _execute_db_operation(operation)
+        return _cached_table("Exhibition", operation)
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка выставок: {str(e)}")
 
 # 8. Учет перемещений картин
-def record_movement(artwork_id: int, from_location: str, to_location: str, purpose: str, responsible_person: str):
+def record_movement(artwork_id: int, from_location: str, to_location: str, purpose: str, responsible_person: str,
+                    session: GallerySession = None) -> int:
+    """Записывает перемещение картины и возвращает его ID"""
     try:
         # Валидация данных
-        if not isinstance(artwork_id, int) or artwork_id <= 0:
-            raise ValidationError("ID картины должен быть положительным целым числом.")
-        if not from_location or not isinstance(from_location, str):
-            raise ValidationError("Место отправления обязательно и должно быть строкой.")
-        if not to_location or not isinstance(to_location, str):
-            raise ValidationError("Место назначения обязательно и должно быть строкой.")
-        if not purpose or not isinstance(purpose, str):
-            raise ValidationError("Цель перемещения обязательна и должна быть строкой.")
-        if not responsible_person or not isinstance(responsible_person, str):
-            raise ValidationError("Ответственное лицо обязательно и должно быть строкой.")
-
-        conn = get_connection()
-        cursor = conn.cursor()
+        validate_movement_data(artwork_id, from_location, to_location, purpose, responsible_person)
 
-        # Проверка существования картины
-        cursor.execute('SELECT id FROM Artwork WHERE id = ?', (artwork_id,))
-        if not cursor.fetchone():
-            raise ValidationError(f"Картина с ID {artwork_id} не существует.")
+        def operation(cursor):
+            # Проверка существования картины
+            if _load_artwork(cursor, artwork_id) is None:
+                raise ValidationError(f"Картина с ID {artwork_id} не существует.")
 
-        # Добавление перемещения
-        cursor.execute('''
-            INSERT INTO Movement (artwork_id, from_location, to_location, movement_date, purpose, responsible_person)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (artwork_id, from_location, to_location, date.today(), purpose, responsible_person))
+            # Добавление перемещения
+            cursor.execute('''
+                INSERT INTO Movement (artwork_id, from_location, to_location, movement_date, purpose, responsible_person)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (artwork_id, from_location, to_location, date.today(), purpose, responsible_person))
+            return cursor.lastrowid
 
-        conn.commit()
-    except ValidationError as e:
-        conn.rollback()
-        raise e
-    except sqlite3.Error as e:
-        conn.rollback()
-        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
-    finally:
-        conn.close()
+        return _execute_db_transaction(operation, session=session)
+    except ArtGalleryError:
+        raise
+    except Exception as e:
+        raise ArtGalleryError(f"Ошибка при записи перемещения: {str(e)}")
 
 # 9. Продажа картин
 from datetime import date
 
 
-def sell_artwork(artwork_id: int, buyer_name: str, sale_price: float):
+def sell_artwork(artwork_id: int, buyer_name: str, sale_price: float, session: GallerySession = None):
     try:
         # Валидация входных данных
         if not isinstance(artwork_id, int) or artwork_id <= 0:
@@ -261,41 +1049,41 @@ def sell_artwork(artwork_id: int, buyer_name: str, sale_price: float):
         if not isinstance(sale_price, (int, float)) or sale_price <= 0:
             raise ValidationError("Цена продажи должна быть положительным числом.")
 
-        conn = get_connection()
-        cursor = conn.cursor()
+        def operation(cursor):
+            # Проверка существования картины
+            artwork = _load_artwork(cursor, artwork_id)
+            if artwork is None:
+                raise DatabaseError(f"Картина с ID {artwork_id} не существует.")
 
-        # Проверка существования картины
-        cursor.execute('SELECT price FROM Artwork WHERE id = ?', (artwork_id,))
-        artwork_price = cursor.fetchone()
-        if not artwork_price:
-            raise DatabaseError(f"Картина с ID {artwork_id} не существует.")
+            '''# Проверка минимальной цены продажи (не менее 80% от текущей стоимости)
+            if sale_price < artwork.price * 0.8:
+                raise ValidationError("Цена продажи не может быть ниже 80% от стоимости картины.")'''
 
-        '''# Проверка минимальной цены продажи (не менее 80% от текущей стоимости)
-        if sale_price < artwork_price[0] * 0.8:
-            raise ValidationError("Цена продажи не может быть ниже 80% от стоимости картины.")'''
+            # Добавляем запись о продаже
+            sale_date = date.today()
+            cursor.execute('''
+                INSERT INTO Sale (artwork_id, buyer_name, sale_date, price)
+                VALUES (?, ?, ?, ?)
+            ''', (artwork_id, buyer_name, sale_date, sale_price))
 
-        # Добавляем запись о продаже
-        cursor.execute('''
-            INSERT INTO Sale (artwork_id, buyer_name, sale_date, price)
-            VALUES (?, ?, ?, ?)
-        ''', (artwork_id, buyer_name, date.today(), sale_price))
+            # Обновляем статус картины на "Продана"
+            cursor.execute('''
+                UPDATE Artwork SET status = ? WHERE id = ?
+            ''', ("Sold", artwork_id))
+            _synchronize_session(cursor, Artwork, artwork_id, {"status": "Sold"})
 
-        # Обновляем статус картины на "Продана"
-        cursor.execute('''
-            UPDATE Artwork SET status = ? WHERE id = ?
-        ''', ("Sold", artwork_id))
+            if financial_summaries_cover(cursor, artwork_id):
+                _add_artist_revenue(cursor, artwork.artist_id, sale_date.isoformat()[:7],
+                                    sales_count=1, sales_revenue=sale_price)
 
-        conn.commit()
-    except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        raise DatabaseError(f"Ошибка при продаже картины: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+        _execute_db_transaction(operation, session=session)
+    except ArtGalleryError:
+        raise
+    except Exception as e:
+        raise ArtGalleryError(f"Ошибка при продаже картины: {str(e)}")
 
 # 10. Аренда картин
-def rent_artwork(artwork_id: int, renter_name: str, start_date: str, end_date: str):
+def rent_artwork(artwork_id: int, renter_name: str, start_date: str, end_date: str, session: GallerySession = None):
     try:
         if not isinstance(artwork_id, int) or artwork_id <= 0:
             raise ValidationError("Некорректный ID картины.")
@@ -304,84 +1092,81 @@ def rent_artwork(artwork_id: int, renter_name: str, start_date: str, end_date: s
         if not start_date or not end_date:
             raise ValidationError("Даты начала и окончания аренды обязательны.")
 
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        # Проверка существования картины
-        cursor.execute('SELECT price FROM Artwork WHERE id = ?', (artwork_id,))
-        artwork_price = cursor.fetchone()
-        if not artwork_price:
-            raise DatabaseError(f"Картина с ID {artwork_id} не существует.")
-
-        # Рассчитываем арендную плату (5% от стоимости картины за месяц)
-        rental_days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days
+        # Рассчитываем длительность аренды; даты сохраняются в формате ISO
+        start_day, end_day = parse_period(start_date, end_date)
+        rental_days = end_day - start_day
         if rental_days <= 0:
             raise ValidationError("Дата окончания аренды должна быть позже даты начала.")
-        rental_fee = round(artwork_price[0] * 0.05 * (rental_days / 30), 2)
+        start_date = (_EPOCH + timedelta(days=start_day)).isoformat()
+        end_date = (_EPOCH + timedelta(days=end_day)).isoformat()
 
-        # Добавляем запись об аренде
-        cursor.execute('''
-            INSERT INTO Rental (artwork_id, renter_name, start_date, end_date, rental_fee)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (artwork_id, renter_name, start_date, end_date, rental_fee))
+        def operation(cursor):
+            # Проверка существования картины
+            artwork = _load_artwork(cursor, artwork_id)
+            if artwork is None:
+                raise DatabaseError(f"Картина с ID {artwork_id} не существует.")
 
-        # Обновляем статус картины на "Арендована"
-        cursor.execute('''
-            UPDATE Artwork SET status = ? WHERE id = ?
-        ''', ("Rented", artwork_id))
+            # Внутри BEGIN IMMEDIATE никто не займет картину между проверкой и вставкой
+            conflicts = _find_conflicts(cursor, artwork_id, start_day, end_day)
+            if conflicts:
+                raise ValidationError(f"Картина с ID {artwork_id} занята в эти даты: "
+                                      f"{_describe_conflicts(conflicts)}.")
 
-        conn.commit()
-    except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        raise DatabaseError(f"Ошибка при аренде картины: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+            # Рассчитываем арендную плату по действующим тарифам (см. RENTAL_RATES)
+            rental_fee = RENTAL_RATES.fee(artwork.price, artwork.genre, rental_days)
+
+            # Добавляем запись об аренде
+            cursor.execute('''
+                INSERT INTO Rental (artwork_id, renter_name, start_date, end_date, rental_fee)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (artwork_id, renter_name, start_date, end_date, rental_fee))
+
+            # Обновляем статус картины на "Арендована"
+            cursor.execute('''
+                UPDATE Artwork SET status = ? WHERE id = ?
+            ''', ("Rented", artwork_id))
+            _synchronize_session(cursor, Artwork, artwork_id, {"status": "Rented"})
+
+            if financial_summaries_cover(cursor, artwork_id):
+                _add_artist_revenue(cursor, artwork.artist_id, start_date[:7],
+                                    rentals_count=1, rental_revenue=rental_fee)
+                _add_rental_income(cursor, artwork_id, 1, rental_fee)
+
+        _execute_db_transaction(operation, session=session)
+    except ArtGalleryError:
+        raise
+    except Exception as e:
+        raise ArtGalleryError(f"Ошибка при аренде картины: {str(e)}")
 
 # 11. Регистрация посетителей
-def register_visitor(name: str, email: str, phone: str) -> int:
-    conn = None
+def register_visitor(name: str, email: str, phone: str, session: GallerySession = None) -> int:
     try:
         # Валидация данных
-        if not name or not isinstance(name, str):
-            raise ValidationError("Имя посетителя обязательно и должно быть строкой.")
-        if not email or "@" not in email:
-            raise ValidationError("Email должен содержать символ '@'.")
-        if not phone or not isinstance(phone, str):
-            raise ValidationError("Телефон обязателен и должен быть строкой.")
-
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        # Проверка уникальности email
-        cursor.execute('SELECT id FROM Visitor WHERE email = ?', (email,))
-        if cursor.fetchone():
-            raise ValidationError(f"Посетитель с email {email} уже зарегистрирован.")
+        validate_visitor_data(name, email, phone)
 
-        # Регистрация нового посетителя
-        cursor.execute('''
-            INSERT INTO Visitor (name, email, phone, registration_date)
-            VALUES (?, ?, ?, ?)
-        ''', (name, email, phone, date.today()))
+        def operation(cursor):
+            # Проверка уникальности email
+            cursor.execute('SELECT id FROM Visitor WHERE email = ?', (email,))
+            if cursor.fetchone():
+                raise ValidationError(f"Посетитель с email {email} уже зарегистрирован.")
 
-        visitor_id = cursor.lastrowid
-        conn.commit()
-        return visitor_id
+            # Регистрация нового посетителя
+            cursor.execute('''
+                INSERT INTO Visitor (name, email, phone, registration_date)
+                VALUES (?, ?, ?, ?)
+            ''', (name, email, phone, date.today()))
+            return cursor.lastrowid
 
-    except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        raise DatabaseError(f"Ошибка при регистрации посетителя: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+        return _execute_db_transaction(operation, session=session)
+    except ArtGalleryError:
+        raise
+    except Exception as e:
+        raise ArtGalleryError(f"Ошибка при регистрации посетителя: {str(e)}")
 
 
 # 12. Добавление отзыва посетителя
-def add_visitor_review(exhibition_id: int, review: str, reviewer_name: str):
+def add_visitor_review(exhibition_id: int, review: str, reviewer_name: str, session: GallerySession = None):
     """Добавляет отзыв посетителя с проверками"""
-    conn = None
     try:
         # Валидация входных данных
         if not isinstance(exhibition_id, int) or exhibition_id <= 0:
@@ -391,33 +1176,26 @@ def add_visitor_review(exhibition_id: int, review: str, reviewer_name: str):
         if not reviewer_name:
             raise ValidationError("Имя посетителя обязательно")
 
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        # Проверяем существование выставки
-        cursor.execute('SELECT 1 FROM Exhibition WHERE id = ?', (exhibition_id,))
-        if not cursor.fetchone():
-            raise DatabaseError("Выставка не найдена")
-
-        # Добавляем отзыв
-        cursor.execute('''
-            INSERT INTO Visitor_Review (exhibition_id, review, reviewer_name, review_date)
-            VALUES (?, ?, ?, ?)
-        ''', (exhibition_id, review, reviewer_name, date.today()))
+        def operation(cursor):
+            # Проверяем существование выставки
+            if not _reference_exists(cursor, "Exhibition", exhibition_id):
+                raise DatabaseError("Выставка не найдена")
 
-        conn.commit()
-        return cursor.lastrowid
+            # Добавляем отзыв
+            cursor.execute('''
+                INSERT INTO Visitor_Review (exhibition_id, review, reviewer_name, review_date)
+                VALUES (?, ?, ?, ?)
+            ''', (exhibition_id, review, reviewer_name, date.today()))
+            return cursor.lastrowid
 
-    except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+        return _execute_db_operation(operation, session=session)
+    except ArtGalleryError:
+        raise
+    except Exception as e:
+        raise ArtGalleryError(f"Ошибка при добавлении отзыва: {str(e)}")
 
 # 13. Добавление отзыва прессы
-def add_press_review(exhibition_id: int, review: str, publication_name: str):
+def add_press_review(exhibition_id: int, review: str, publication_name: str, session: GallerySession = None):
     try:
         if not isinstance(exhibition_id, int) or exhibition_id <= 0:
             raise ValidationError("Некорректный ID выставки.")
@@ -432,14 +1210,15 @@ def add_press_review(exhibition_id: int, review: str, publication_name: str):
                 VALUES (?, ?, ?, ?)
             ''', (exhibition_id, review, publication_name, date.today()))
             return cursor.lastrowid
-        return _execute_db_operation(operation)
+        return _execute_db_operation(operation, session=session)
     except ArtGalleryError:
         raise
     except Exception as e:
         raise ArtGalleryError(f"Ошибка при добавлении отзыва прессы: {str(e)}")
 
 # 14. Добавление материала для реставрации
-def add_restoration_material(restoration_id: int, material_id: int, quantity_used: int):
+def add_restoration_material(restoration_id: int, material_id: int, quantity_used: int,
+                             session: GallerySession = None):
     try:
         if not isinstance(restoration_id, int) or restoration_id <= 0:
             raise ValidationError("Некорректный ID реставрации.")
@@ -454,26 +1233,31 @@ def add_restoration_material(restoration_id: int, material_id: int, quantity_use
             if not cursor.fetchone():
                 raise DatabaseError(f"Реставрация с ID {restoration_id} не существует.")
 
-            # Проверяем существование материала
-            cursor.execute('SELECT 1 FROM Material WHERE id = ?', (material_id,))
-            if not cursor.fetchone():
+            # Проверяем существование материала; его цена нужна для сводки затрат
+            material = _reference_row(cursor, "Material", material_id)
+            if material is None:
                 raise DatabaseError(f"Материал с ID {material_id} не существует.")
+            unit_price = Material._make(material).unit_price
 
             # Добавляем материал для реставрации
             cursor.execute('''
                 INSERT INTO Restoration_Material (restoration_id, material_id, quantity_used)
                 VALUES (?, ?, ?)
             ''', (restoration_id, material_id, quantity_used))
-            return cursor.lastrowid
+            row_id = cursor.lastrowid
+            cursor.execute('''
+                UPDATE Restoration_Cost SET materials_cost = materials_cost + ? WHERE restoration_id = ?
+            ''', (quantity_used * (unit_price or 0), restoration_id))
+            return row_id
 
-        return _execute_db_operation(operation)
+        return _execute_db_transaction(operation, session=session)
     except ArtGalleryError:
         raise
     except Exception as e:
         raise ArtGalleryError(f"Ошибка при добавлении материала для реставрации: {str(e)}")
 
 # 15. Добавление материала
-def add_material(name: str, unit_price: float):
+def add_material(name: str, unit_price: float, session: GallerySession = None):
     try:
         if not name or not isinstance(name, str):
             raise ValidationError("Название материала обязательно и должно быть строкой.")
@@ -487,14 +1271,18 @@ def add_material(name: str, unit_price: float):
             ''', (name, unit_price))
             return cursor.lastrowid
 
-        return _execute_db_operation(operation)
+        try:
+            return _execute_db_operation(operation, session=session)
+        finally:
+            # Справочник изменился - сбрасываем его кэш
+            _invalidate_reference("Material", session)
     except ArtGalleryError:
         raise
     except Exception as e:
         raise ArtGalleryError(f"Ошибка при добавлении материала: {str(e)}")
 
 # 16. Добавление картины на выставку
-def add_artwork_to_exhibition(exhibition_id: int, artwork_id: int):
+def add_artwork_to_exhibition(exhibition_id: int, artwork_id: int, session: GallerySession = None):
     """Добавляет картину на выставку с проверками"""
     try:
         # Проверяем валидность ID
@@ -505,13 +1293,11 @@ def add_artwork_to_exhibition(exhibition_id: int, artwork_id: int):
 
         def operation(cursor):
             # Проверяем существование выставки
-            cursor.execute('SELECT 1 FROM Exhibition WHERE id = ?', (exhibition_id,))
-            if not cursor.fetchone():
+            if not _reference_exists(cursor, "Exhibition", exhibition_id):
                 raise DatabaseError("Выставка не найдена")
 
             # Проверяем существование картины
-            cursor.execute('SELECT 1 FROM Artwork WHERE id = ?', (artwork_id,))
-            if not cursor.fetchone():
+            if _load_artwork(cursor, artwork_id) is None:
                 raise DatabaseError("Картина не найдена")
 
             # Проверяем, не добавлена ли уже картина
@@ -530,7 +1316,7 @@ def add_artwork_to_exhibition(exhibition_id: int, artwork_id: int):
 
             return cursor.lastrowid
 
-        return _execute_db_operation(operation)
+        return _execute_db_operation(operation, session=session)
 
     except sqlite3.Error as e:
         raise DatabaseError(f"Ошибка базы данных: {str(e)}")
@@ -540,7 +1326,7 @@ def add_artwork_to_exhibition(exhibition_id: int, artwork_id: int):
         raise ArtGalleryError(f"Ошибка при добавлении картины: {str(e)}")
 
 # 17. Создание выставки
-def create_exhibition(title: str, theme: str, start_date: str, end_date: str):
+def create_exhibition(title: str, theme: str, start_date: str, end_date: str, session: GallerySession = None):
     try:
         if not title or not isinstance(title, str):
             raise ValidationError("Название выставки обязательно и должно быть строкой.")
@@ -558,14 +1344,18 @@ def create_exhibition(title: str, theme: str, start_date: str, end_date: str):
             ''', (title, theme, start_date, end_date))
             return cursor.lastrowid
 
-        return _execute_db_operation(operation)
+        try:
+            return _execute_db_operation(operation, session=session)
+        finally:
+            # Справочник изменился - сбрасываем его кэш
+            _invalidate_reference("Exhibition", session)
     except ArtGalleryError:
         raise
     except Exception as e:
         raise ArtGalleryError(f"Ошибка при создании выставки: {str(e)}")
 
 # 18. Обновление статуса картины
-def update_artwork_status(artwork_id: int, new_status: str):
+def update_artwork_status(artwork_id: int, new_status: str, session: GallerySession = None):
     try:
         if not isinstance(artwork_id, int) or artwork_id <= 0:
             raise ValidationError("Некорректный ID картины.")
@@ -574,17 +1364,17 @@ def update_artwork_status(artwork_id: int, new_status: str):
 
         def operation(cursor):
             # Проверяем существование картины
-            cursor.execute('SELECT 1 FROM Artwork WHERE id = ?', (artwork_id,))
-            if not cursor.fetchone():
+            if _load_artwork(cursor, artwork_id) is None:
                 raise DatabaseError(f"Картина с ID {artwork_id} не существует.")
 
             # Обновляем статус картины
             cursor.execute('''
                 UPDATE Artwork SET status = ? WHERE id = ?
             ''', (new_status, artwork_id))
+            _synchronize_session(cursor, Artwork, artwork_id, {"status": new_status})
             return cursor.rowcount
 
-        return _execute_db_operation(operation)
+        return _execute_db_operation(operation, session=session)
     except ArtGalleryError:
         raise
     except Exception as e:
@@ -594,10 +1384,11 @@ def update_artwork_status(artwork_id: int, new_status: str):
 def get_materials():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(Material)
             cursor.execute('SELECT * FROM Material')
             return cursor.fetchall()
 
-        return _execute_db_operation(operation)
+        return _cached_table("Material", operation)
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка материалов: {str(e)}")
 
@@ -605,6 +1396,7 @@ def get_materials():
 def get_visitor_reviews():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(VisitorReview)
             cursor.execute('SELECT * FROM Visitor_Review')
             return cursor.fetchall()
 
@@ -616,6 +1408,7 @@ def get_visitor_reviews():
 def get_press_reviews():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(PressReview)
             cursor.execute('SELECT * FROM Press_Review')
             return cursor.fetchall()
 
@@ -629,6 +1422,7 @@ def get_visitors():
     """Возвращает список всех посетителей"""
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(Visitor)
             cursor.execute('SELECT * FROM Visitor ORDER BY id ASC')
             return cursor.fetchall()
 
@@ -637,12 +1431,9 @@ def get_visitors():
         raise DatabaseError(f"Ошибка при получении списка посетителей: {str(e)}")
 
 # 23. Добавление художника
-def add_artist(name: str, biography: str):
+def add_artist(name: str, biography: str, session: GallerySession = None):
     try:
-        if not name or not isinstance(name, str):
-            raise ValidationError("Имя художника обязательно и должно быть строкой.")
-        if not biography or not isinstance(biography, str):
-            raise ValidationError("Биография художника обязательна и должна быть строкой.")
+        validate_artist_data(name, biography)
 
         def operation(cursor):
             cursor.execute('''
@@ -651,7 +1442,11 @@ def add_artist(name: str, biography: str):
             ''', (name, biography))
             return cursor.lastrowid
 
-        return _execute_db_operation(operation)
+        try:
+            return _execute_db_operation(operation, session=session)
+        finally:
+            # Справочник изменился - сбрасываем его кэш
+            _invalidate_reference("Artist", session)
     except ArtGalleryError:
         raise
     except Exception as e:
@@ -661,6 +1456,7 @@ def add_artist(name: str, biography: str):
 def get_movements():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(Movement)
             cursor.execute('SELECT * FROM Movement')
             return cursor.fetchall()
 
@@ -672,6 +1468,7 @@ def get_movements():
 def get_documents():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(DocumentListing)
             cursor.execute('''
                 SELECT d.id, a.title AS artwork_title, d.document_type, d.issue_date, df.file_path
                 FROM Document d
@@ -688,6 +1485,7 @@ def get_documents():
 def get_restorations():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(RestorationListing)
             cursor.execute('''
                 SELECT r.id, a.title AS artwork_title, r.restorer_name, r.start_date, r.end_date,
                        r.cost, r.condition_before, r.condition_after
@@ -705,6 +1503,7 @@ def get_restorations():
 def get_sales():
     try:
         def operation(cursor):
+            cursor.row_factory = row_factory(SaleListing)
             cursor.execute('''
                 SELECT s.id, a.title AS artwork_title, s.buyer_name, s.sale_date, s.price
                 FROM Sale s
@@ -718,7 +1517,7 @@ def get_sales():
 
 # 28. Обновление данных художника
 def update_artist(artist_id: int, name: str = None, biography: str = None,
-                  awards: str = None, exhibitions_participated: int = None):
+                  awards: str = None, exhibitions_participated: int = None, session: GallerySession = None):
     try:
         if not isinstance(artist_id, int) or artist_id <= 0:
             raise ValidationError("Некорректный ID художника.")
@@ -747,16 +1546,21 @@ def update_artist(artist_id: int, name: str = None, biography: str = None,
 
         def operation(cursor):
             cursor.execute(query, params)
+            _synchronize_session(cursor, Artist, artist_id)
             return cursor.rowcount
 
-        return _execute_db_operation(operation)
+        try:
+            return _execute_db_operation(operation, session=session)
+        finally:
+            # Справочник изменился - сбрасываем его кэш
+            _invalidate_reference("Artist", session)
     except ArtGalleryError:
         raise
     except Exception as e:
         raise ArtGalleryError(f"Ошибка при обновлении данных о художнике: {str(e)}")
 
 # 29. Удаление художника
-def delete_artist(artist_id: int):
+def delete_artist(artist_id: int, session: GallerySession = None):
     """Удаляет художника по его ID."""
     try:
         if not isinstance(artist_id, int) or artist_id <= 0:
@@ -771,9 +1575,14 @@ def delete_artist(artist_id: int):
 
             # Удаляем художника
             cursor.execute('DELETE FROM Artist WHERE id = ?', (artist_id,))
+            _synchronize_session(cursor, Artist, artist_id)
             return cursor.rowcount
 
-        return _execute_db_operation(operation)
+        try:
+            return _execute_db_operation(operation, session=session)
+        finally:
+            # Справочник изменился - сбрасываем его кэш
+            _invalidate_reference("Artist", session)
     except ArtGalleryError:
         raise
     except Exception as e:
@@ -781,13 +1590,16 @@ def delete_artist(artist_id: int):
 
 
 # 30. Удаление картины
-def delete_artwork(artwork_id: int):
+def delete_artwork(artwork_id: int, session: GallerySession = None):
     """Удаляет картину по её ID."""
     try:
         if not isinstance(artwork_id, int) or artwork_id <= 0:
             raise ValidationError("Некорректный ID картины.")
 
         def operation(cursor):
+            # Вычитаем продажи, аренды и реставрации картины из финансовых сводок
+            if financial_summaries_cover(cursor, artwork_id):
+                _remove_artwork_from_summaries(cursor, artwork_id)
             # Удаляем связанные записи
             cursor.execute('DELETE FROM Provenance WHERE artwork_id = ?', (artwork_id,))
             cursor.execute('DELETE FROM Movement WHERE artwork_id = ?', (artwork_id,))
@@ -797,10 +1609,986 @@ def delete_artwork(artwork_id: int):
             cursor.execute('DELETE FROM Exhibition_Artwork WHERE artwork_id = ?', (artwork_id,))
             # Удаляем саму картину
             cursor.execute('DELETE FROM Artwork WHERE id = ?', (artwork_id,))
+            _synchronize_session(cursor, Artwork, artwork_id)
             return cursor.rowcount
 
-        return _execute_db_operation(operation)
+        return _execute_db_transaction(operation, session=session)
     except ArtGalleryError:
         raise
     except Exception as e:
         raise ArtGalleryError(f"Ошибка при удалении картины: {str(e)}")
+
+
+# 31. Постраничное получение списков (keyset-пагинация)
+# Размер страницы по умолчанию
+PAGE_SIZE = 100
+
+# Списки, доступные постранично: столбцы, источник (FROM), ключ сортировки и модель строки.
+# Ключ должен быть уникальным, по нему строится условие "после последней строки".
+_LISTINGS = {
+    "artworks": ("*", "Artwork", ("id",), Artwork),
+    "artists": ("*", "Artist", ("id",), Artist),
+    "exhibitions": ("*", "Exhibition", ("id",), Exhibition),
+    "visitors": ("*", "Visitor", ("id",), Visitor),
+    "movements": ("*", "Movement", ("id",), Movement),
+    "materials": ("*", "Material", ("id",), Material),
+    "visitor_reviews": ("*", "Visitor_Review", ("id",), VisitorReview),
+    "press_reviews": ("*", "Press_Review", ("id",), PressReview),
+    "sales": ("s.id, a.title AS artwork_title, s.buyer_name, s.sale_date, s.price",
+              "Sale s JOIN Artwork a ON s.artwork_id = a.id", ("s.id",), SaleListing),
+    "restorations": ("r.id, a.title AS artwork_title, r.restorer_name, r.start_date, r.end_date, "
+                     "r.cost, r.condition_before, r.condition_after",
+                     "Restoration r JOIN Artwork a ON r.artwork_id = a.id", ("r.id",), RestorationListing),
+    # У документа может быть несколько файлов, поэтому ключ составной
+    "documents": ("d.id, a.title AS artwork_title, d.document_type, d.issue_date, df.file_path",
+                  "Document d JOIN Artwork a ON d.artwork_id = a.id "
+                  "LEFT JOIN Document_File df ON d.id = df.document_id",
+                  ("d.id", "COALESCE(df.id, 0)"), DocumentListing),
+}
+
+
+def _encode_page_token(listing: str, key_values) -> str:
+    """Непрозрачный токен продолжения: список и ключ последней выданной строки"""
+    payload = json.dumps([listing, list(key_values)]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_page_token(listing: str, token: str):
+    try:
+        name, key_values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError, AttributeError):
+        raise ValidationError("Некорректный токен страницы.")
+    if name != listing:
+        raise ValidationError("Токен страницы относится к другому списку.")
+    return key_values
+
+
+def _get_page(listing: str, token=None, limit: int = PAGE_SIZE):
+    """Возвращает (строки, токен следующей страницы или None)"""
+    if not isinstance(limit, int) or limit <= 0:
+        raise ValidationError("Размер страницы должен быть положительным целым числом.")
+    columns, source, key, model = _LISTINGS[listing]
+    # Ключ добавляется в конец выборки, чтобы построить токен, и затем отрезается
+    key_columns = ", ".join(key)
+    query = f"SELECT {columns}, {key_columns} FROM {source}"
+    params = []
+    if token is not None:
+        key_values = _decode_page_token(listing, token)
+        if len(key_values) != len(key):
+            raise ValidationError("Некорректный токен страницы.")
+        query += f" WHERE ({key_columns}) > ({', '.join('?' * len(key))})"
+        params.extend(key_values)
+    query += f" ORDER BY {key_columns} LIMIT ?"
+    # Запрашиваем на одну строку больше, чтобы узнать, есть ли следующая страница
+    params.append(limit + 1)
+
+    def operation(cursor):
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    rows = _execute_db_operation(operation)
+    next_token = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_token = _encode_page_token(listing, rows[-1][-len(key):])
+    return [model._make(row[:-len(key)]) for row in rows], next_token
+
+
+def count_rows(listing: str) -> int:
+    """Общее количество строк списка.
+
+    SQLite считает COUNT(*) по самому узкому покрывающему индексу таблицы
+    (например, idx_movement_artwork_id), а не по самой таблице.
+    """
+    if listing not in _LISTINGS:
+        raise ValidationError(f"Неизвестный список: {listing}")
+    _, source, _, _ = _LISTINGS[listing]
+
+    def operation(cursor):
+        cursor.execute(f"SELECT COUNT(*) FROM {source}")
+        return cursor.fetchone()[0]
+
+    return _execute_db_operation(operation)
+
+
+def get_artworks_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка картин: (строки, токен следующей страницы)"""
+    return _get_page("artworks", token, limit)
+
+
+def get_artists_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка художников"""
+    return _get_page("artists", token, limit)
+
+
+def get_exhibitions_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка выставок"""
+    return _get_page("exhibitions", token, limit)
+
+
+def get_visitors_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка посетителей"""
+    return _get_page("visitors", token, limit)
+
+
+def get_movements_page(token=None, limit: int = PAGE_SIZE):
+    """Страница журнала перемещений"""
+    return _get_page("movements", token, limit)
+
+
+def get_materials_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка материалов"""
+    return _get_page("materials", token, limit)
+
+
+def get_visitor_reviews_page(token=None, limit: int = PAGE_SIZE):
+    """Страница отзывов посетителей"""
+    return _get_page("visitor_reviews", token, limit)
+
+
+def get_press_reviews_page(token=None, limit: int = PAGE_SIZE):
+    """Страница отзывов прессы"""
+    return _get_page("press_reviews", token, limit)
+
+
+def get_sales_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка продаж (как get_sales)"""
+    return _get_page("sales", token, limit)
+
+
+def get_restorations_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка реставраций (как get_restorations)"""
+    return _get_page("restorations", token, limit)
+
+
+def get_documents_page(token=None, limit: int = PAGE_SIZE):
+    """Страница списка документов (как get_documents)"""
+    return _get_page("documents", token, limit)
+
+
+# 32. Потоковое получение больших списков
+# Сколько строк забирать из курсора за один раз
+ITER_BATCH_SIZE = 500
+
+
+def _iter_listing(listing: str, batch_size: int):
+    """Генератор строк списка, читающий курсор порциями через fetchmany.
+
+    Соединение берется из пула при первом обращении и возвращается, как только
+    строки закончились или генератор закрыт (break, close(), сборка мусора).
+    """
+    if not isinstance(batch_size, int) or batch_size <= 0:
+        raise ValidationError("Размер порции должен быть положительным целым числом.")
+    columns, source, key, model = _LISTINGS[listing]
+    query = f"SELECT {columns} FROM {source} ORDER BY {', '.join(key)}"
+
+    def rows():
+        conn = get_connection()
+        cursor = _ProfiledCursor(conn.cursor(), f"iter_{listing}")
+        cursor.row_factory = row_factory(model)
+        try:
+            cursor.execute(query)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield from batch
+        except sqlite3.Error as e:
+            raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+        finally:
+            cursor.finish()
+            conn.close()
+
+    return rows()
+
+
+def iter_artworks(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает все картины, не загружая таблицу в память целиком"""
+    return _iter_listing("artworks", batch_size)
+
+
+def iter_artists(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает всех художников"""
+    return _iter_listing("artists", batch_size)
+
+
+def iter_exhibitions(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает все выставки"""
+    return _iter_listing("exhibitions", batch_size)
+
+
+def iter_visitors(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает всех посетителей"""
+    return _iter_listing("visitors", batch_size)
+
+
+def iter_movements(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает журнал перемещений"""
+    return _iter_listing("movements", batch_size)
+
+
+def iter_materials(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает все материалы"""
+    return _iter_listing("materials", batch_size)
+
+
+def iter_visitor_reviews(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает отзывы посетителей"""
+    return _iter_listing("visitor_reviews", batch_size)
+
+
+def iter_press_reviews(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает отзывы прессы"""
+    return _iter_listing("press_reviews", batch_size)
+
+
+def iter_sales(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает продажи (строки как в get_sales)"""
+    return _iter_listing("sales", batch_size)
+
+
+def iter_restorations(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает реставрации (строки как в get_restorations)"""
+    return _iter_listing("restorations", batch_size)
+
+
+def iter_documents(batch_size: int = ITER_BATCH_SIZE):
+    """Перебирает документы (строки как в get_documents)"""
+    return _iter_listing("documents", batch_size)
+
+
+# 33. Полнотекстовый поиск
+# Разделы поиска: индекс FTS5, столбец с заголовком результата и веса столбцов для bm25
+SEARCH_SOURCES = {
+    "artworks": ("Artwork_Search", "title", (10.0, 2.0, 5.0, 5.0)),
+    "artists": ("Artist_Search", "name", (10.0, 2.0)),
+    "visitor_reviews": ("Visitor_Review_Search", "reviewer_name", (5.0, 1.0)),
+    "press_reviews": ("Press_Review_Search", "publication_name", (5.0, 1.0)),
+}
+SEARCH_KINDS = tuple(SEARCH_SOURCES)
+SEARCH_LIMIT = 20
+# Сколько самых новых совпадений ранжировать в каждом разделе. Для редких слов
+# это все совпадения, а для слов, встречающихся в каждой второй записи, ограничение
+# не дает считать bm25 по сотням тысяч строк
+SEARCH_CANDIDATES = 1000
+# Длина сниппета в словах
+SNIPPET_WORDS = 12
+
+# Индекс FTS5 -> (таблица с данными, индексируемые столбцы)
+_SEARCH_TABLES = {name: (table, columns) for name, table, columns in SEARCH_INDEXES}
+
+
+def _search_words(query: str):
+    """Слова поискового запроса"""
+    if not isinstance(query, str):
+        raise ValidationError("Поисковый запрос должен быть строкой.")
+    words = re.findall(r"\w+", query)
+    if not words:
+        raise ValidationError("Поисковый запрос не содержит слов.")
+    return words
+
+
+def _fts_query(words):
+    """Запрос FTS5: все слова обязательны, последнее ищется по префиксу (поиск по мере набора).
+    Слова берутся в кавычки, чтобы операторы FTS5 (AND, NEAR, *) не разбирались"""
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def _snippet(texts, words, highlight):
+    """Фрагмент текста вокруг найденных слов с подсветкой.
+
+    Строится только для отобранных строк: snippet() FTS5 заново вычисляет
+    MATCH по всему индексу и для частых слов стоит десятки миллисекунд.
+    """
+    exact = {word.lower() for word in words[:-1]}
+    prefix = words[-1].lower()
+    start, end = highlight
+
+    best = None
+    for text in texts:
+        if not text:
+            continue
+        text = str(text)
+        tokens = list(re.finditer(r"\w+", text))
+        hits = {i for i, token in enumerate(tokens)
+                if token.group().lower() in exact or token.group().lower().startswith(prefix)}
+        if hits and (best is None or len(hits) > len(best[2])):
+            best = (text, tokens, hits)
+    if best is None:
+        return ""
+
+    text, tokens, hits = best
+    first = max(0, min(min(hits) - 2, len(tokens) - SNIPPET_WORDS))
+    window = tokens[first:first + SNIPPET_WORDS]
+    parts = ["…" if first > 0 else ""]
+    position = window[0].start()
+    for i, token in enumerate(window, first):
+        parts.append(text[position:token.start()])
+        parts.append(f"{start}{token.group()}{end}" if i in hits else token.group())
+        position = token.end()
+    parts.append("…" if first + SNIPPET_WORDS < len(tokens) else "")
+    return "".join(parts)
+
+
+def search(query: str, kinds=SEARCH_KINDS, limit: int = SEARCH_LIMIT,
+           highlight=("[", "]")):
+    """Ищет картины, художников и отзывы по словам запроса.
+
+    Возвращает до limit кортежей (раздел, id, заголовок, сниппет, оценка),
+    отсортированных по релевантности (меньшая оценка bm25 - лучше).
+    Найденные слова в сниппете обрамляются строками из highlight.
+    """
+    if not isinstance(limit, int) or limit <= 0:
+        raise ValidationError("Лимит должен быть положительным целым числом.")
+    unknown = [kind for kind in kinds if kind not in SEARCH_SOURCES]
+    if unknown:
+        raise ValidationError(f"Неизвестные разделы поиска: {', '.join(unknown)}")
+    words = _search_words(query)
+    match = _fts_query(words)
+
+    def operation(cursor):
+        results = []
+        for kind in kinds:
+            index, title, weights = SEARCH_SOURCES[kind]
+            table, columns = _SEARCH_TABLES[index]
+            cursor.execute(f"""
+                SELECT rowid, score FROM (
+                    SELECT rowid, bm25({index}, {", ".join(map(str, weights))}) AS score
+                    FROM {index} WHERE {index} MATCH ?
+                    ORDER BY rowid DESC LIMIT ?
+                ) ORDER BY score LIMIT ?
+            """, (match, SEARCH_CANDIDATES, limit))
+            scores = dict(cursor.fetchall())
+            if not scores:
+                continue
+            cursor.execute(f"""
+                SELECT id, {title}, {", ".join(columns)} FROM {table}
+                WHERE id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(scores)),))
+            for row_id, row_title, *texts in cursor.fetchall():
+                results.append((kind, row_id, row_title, _snippet(texts, words, highlight), scores[row_id]))
+        results.sort(key=lambda row: row[4])
+        return results[:limit]
+
+    return _execute_db_operation(operation)
+
+
+# 34. Занятость картин
+# Картина занята, пока она в аренде, на реставрации или на выставке, и бессрочно после
+# продажи. Интервалы хранятся в R*Tree-индексе database.AVAILABILITY_INDEX.
+AVAILABILITY_SOURCE_LABELS = {
+    "rental": "аренда",
+    "sale": "продажа",
+    "restoration": "реставрация",
+    "exhibition": "выставка",
+}
+_EPOCH = date(1970, 1, 1)
+
+
+def parse_period(start_date, end_date):
+    """Диапазон дат (включительно) в днях от 1970-01-01; даты - строки ISO или date"""
+    try:
+        start, end = (value if isinstance(value, date) else date.fromisoformat(value)
+                      for value in (start_date, end_date))
+    except (TypeError, ValueError):
+        raise ValidationError("Даты должны быть в формате ГГГГ-ММ-ДД.")
+    if end < start:
+        raise ValidationError("Дата окончания не может быть раньше даты начала.")
+    return (start - _EPOCH).days, (end - _EPOCH).days
+
+
+def _find_conflicts(cursor, artwork_id: int, start_day: int, end_day: int):
+    cursor.execute(f'''
+        SELECT source, source_id, start_day, end_day FROM {AVAILABILITY_INDEX}
+        WHERE artwork_lo <= ? AND artwork_hi >= ? AND start_day <= ? AND end_day >= ?
+        ORDER BY start_day
+    ''', (artwork_id, artwork_id, end_day, start_day))
+    return [(source, source_id, (_EPOCH + timedelta(days=start)).isoformat(),
+             None if end == AVAILABILITY_OPEN_END else (_EPOCH + timedelta(days=end)).isoformat())
+            for source, source_id, start, end in cursor.fetchall()]
+
+
+def _describe_conflicts(conflicts):
+    return "; ".join(f"{AVAILABILITY_SOURCE_LABELS[source]} с {start}" + (f" по {end}" if end else "")
+                     for source, _, start, end in conflicts)
+
+
+def get_availability_conflicts(artwork_id: int, start_date, end_date):
+    """Что мешает картине быть свободной в диапазоне [start_date, end_date].
+
+    Список (источник, ID записи, начало, окончание) по возрастанию начала;
+    источник - ключ AVAILABILITY_SOURCE_LABELS, окончание None - бессрочно.
+    Пустой список - картина свободна.
+    """
+    if not isinstance(artwork_id, int) or artwork_id <= 0:
+        raise ValidationError("Некорректный ID картины.")
+    start_day, end_day = parse_period(start_date, end_date)
+    return _execute_db_operation(lambda cursor: _find_conflicts(cursor, artwork_id, start_day, end_day))
+
+
+def get_available_artworks(start_date, end_date, artwork_ids=None):
+    """ID картин, свободных на весь диапазон [start_date, end_date], по возрастанию.
+
+    artwork_ids - картины-кандидаты (по умолчанию все). Занятые картины находятся
+    одним запросом к R*Tree по диапазону дат, а не проверкой каждой картины.
+    """
+    start_day, end_day = parse_period(start_date, end_date)
+    if artwork_ids is not None:
+        artwork_ids = sorted(set(artwork_ids))
+        if not all(isinstance(i, int) for i in artwork_ids):
+            raise ValidationError("ID картин должны быть целыми числами.")
+        if not artwork_ids:
+            return []
+
+    def operation(cursor):
+        busy = f'''
+            SELECT artwork_lo FROM {AVAILABILITY_INDEX}
+            WHERE start_day <= ? AND end_day >= ? AND artwork_lo <= ? AND artwork_hi >= ?
+        '''
+        if artwork_ids is None:
+            cursor.execute(f"SELECT id FROM Artwork WHERE id NOT IN ({busy}) ORDER BY id",
+                           (end_day, start_day, AVAILABILITY_OPEN_END, 0))
+        else:
+            # Диапазон ID кандидатов дополнительно сужает поиск по дереву
+            cursor.execute(f'''
+                SELECT id FROM Artwork
+                WHERE id IN (SELECT value FROM json_each(?)) AND id NOT IN ({busy})
+                ORDER BY id
+            ''', (json.dumps(artwork_ids), end_day, start_day, artwork_ids[-1], artwork_ids[0]))
+        return [row[0] for row in cursor.fetchall()]
+
+    return _execute_db_operation(operation)
+
+
+# 35. Расчет стоимости аренды
+class RateTable:
+    """Тарифы аренды.
+
+    Плата = цена * monthly_rate * (дни / 30) * множитель длительности * множитель жанра.
+    duration_discounts - пары (минимум дней, скидка), например [(90, 0.1), (180, 0.2)]:
+    действует скидка с наибольшим подходящим порогом. genre_multipliers - словарь
+    жанр -> множитель (по умолчанию 1). Другие правила можно подключить, переопределив
+    duration_factor и genre_factor в подклассе.
+    """
+
+    def __init__(self, monthly_rate=0.05, duration_discounts=(), genre_multipliers=None):
+        if not isinstance(monthly_rate, (int, float)) or monthly_rate < 0:
+            raise ValidationError("Ставка аренды должна быть неотрицательным числом.")
+        self.monthly_rate = monthly_rate
+        self.duration_discounts = sorted(duration_discounts)
+        if any(not 0 <= discount < 1 for _, discount in self.duration_discounts):
+            raise ValidationError("Скидка за длительность должна быть в диапазоне [0, 1).")
+        self.genre_multipliers = dict(genre_multipliers or {})
+
+    def duration_factor(self, days: int) -> float:
+        factor = 1.0
+        for min_days, discount in self.duration_discounts:
+            if days >= min_days:
+                factor = 1.0 - discount
+        return factor
+
+    def genre_factor(self, genre) -> float:
+        return self.genre_multipliers.get(genre, 1.0)
+
+    def fee(self, price: float, genre, days: int) -> float:
+        """Плата за аренду одной картины на days дней"""
+        # Порядок умножений тот же, что в quote_rentals: суммы совпадают до копейки
+        return round(price * self.monthly_rate * ((days / 30) * self.duration_factor(days))
+                     * self.genre_factor(genre), 2)
+
+
+# Тарифы, по которым rent_artwork начисляет плату и считаются расчеты по умолчанию
+RENTAL_RATES = RateTable()
+
+
+def _load_quote_artworks(artwork_ids):
+    """Цены и жанры картин одним запросом: {id: (цена, жанр)}"""
+    unique_ids = sorted(set(artwork_ids))
+    if not all(isinstance(i, int) for i in unique_ids):
+        raise ValidationError("ID картин должны быть целыми числами.")
+
+    def operation(cursor):
+        cursor.execute('SELECT id, price, genre FROM Artwork WHERE id IN (SELECT value FROM json_each(?))',
+                       (json.dumps(unique_ids),))
+        return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    artworks = _execute_db_operation(operation)
+    missing = [i for i in unique_ids if i not in artworks]
+    if missing:
+        raise ValidationError(f"Картины не найдены: {', '.join(map(str, missing[:10]))}"
+                              + (" и др." if len(missing) > 10 else ""))
+    return artworks
+
+
+def _quote_factors(artwork_ids, periods, rates):
+    """Множители по уникальным картинам и периодам.
+
+    Возвращает (artwork_index, artwork_base, genre_factors, period_index, period_base):
+    плата за пару (картина i, период j) - artwork_base[a] * period_base[period_index[j]]
+    * genre_factors[a], где a = artwork_index[i]. Тарифы вызываются по одному разу на
+    уникальную картину и длительность.
+    """
+    artworks = _load_quote_artworks(artwork_ids)
+    positions = {}
+    artwork_base = array("d")
+    for artwork_id, (price, genre) in artworks.items():
+        positions[artwork_id] = len(artwork_base)
+        artwork_base.append(price * rates.monthly_rate)
+    genre_factors = array("d", (rates.genre_factor(genre) for price, genre in artworks.values()))
+    artwork_index = array("q", (positions[i] for i in artwork_ids))
+
+    # Пакет обычно состоит из немногих разных периодов: каждый разбирается один раз
+    period_positions = {}
+    day_positions = {}
+    day_values = []
+    period_index = array("q")
+    for number, period in enumerate(periods):
+        try:
+            key = tuple(period)
+            position = period_positions.get(key)
+            if position is None:
+                start_date, end_date = key
+                start_day, end_day = parse_period(start_date, end_date)
+        except (TypeError, ValueError, ValidationError) as e:
+            raise ValidationError(f"Период {number + 1}: {e}")
+        if position is None:
+            days = end_day - start_day
+            if days <= 0:
+                raise ValidationError(f"Период {number + 1}: дата окончания аренды должна быть позже даты начала.")
+            if days not in day_positions:
+                day_positions[days] = len(day_values)
+                day_values.append(days)
+            position = period_positions[key] = day_positions[days]
+        period_index.append(position)
+    period_base = array("d", ((days / 30) * rates.duration_factor(days) for days in day_values))
+    return artwork_index, artwork_base, genre_factors, period_index, period_base
+
+
+def _round_fees(fees):
+    # Округляем как rent_artwork (round), чтобы расчет совпадал с начисленной платой
+    return [round(fee, 2) for fee in fees]
+
+
+def quote_rentals(artwork_ids, periods, rates: RateTable = None):
+    """Плата за аренду для пар (artwork_ids[i], periods[i]).
+
+    periods - последовательность пар (начало, окончание), строки ISO или date;
+    rates - тарифы (по умолчанию RENTAL_RATES). Возвращает список сумм в порядке пар.
+    Цены загружаются одним запросом, плата считается одним векторным проходом
+    (NumPy, если установлен).
+    """
+    rates = rates or RENTAL_RATES
+    if len(artwork_ids) != len(periods):
+        raise ValidationError("Число картин и периодов должно совпадать.")
+    if not artwork_ids:
+        return []
+    artwork_index, artwork_base, genre_factors, period_index, period_base = \
+        _quote_factors(artwork_ids, periods, rates)
+
+    if np is not None:
+        a = np.frombuffer(artwork_index, dtype=np.int64)
+        p = np.frombuffer(period_index, dtype=np.int64)
+        fees = (np.frombuffer(artwork_base)[a] * np.frombuffer(period_base)[p]
+                * np.frombuffer(genre_factors)[a])
+        return _round_fees(fees.tolist())
+    return _round_fees([artwork_base[a] * period_base[p] * genre_factors[a]
+                        for a, p in zip(artwork_index, period_index)])
+
+
+def quote_package(artwork_ids, periods, rates: RateTable = None):
+    """Плата за аренду каждой картины пакета на каждый из периодов.
+
+    Возвращает список строк: строка i - суммы для artwork_ids[i] по всем periods.
+    """
+    rates = rates or RENTAL_RATES
+    if not artwork_ids or not periods:
+        return [[] for _ in artwork_ids]
+    artwork_index, artwork_base, genre_factors, period_index, period_base = \
+        _quote_factors(artwork_ids, periods, rates)
+
+    if np is not None:
+        a = np.frombuffer(artwork_index, dtype=np.int64)
+        row = np.frombuffer(period_base)[np.frombuffer(period_index, dtype=np.int64)]
+        fees = np.outer(np.frombuffer(artwork_base)[a], row) * np.frombuffer(genre_factors)[a][:, None]
+        return [_round_fees(line) for line in fees.tolist()]
+    row = [period_base[p] for p in period_index]
+    return [_round_fees([base * period * genre for period in row])
+            for base, genre in ((artwork_base[a], genre_factors[a]) for a in artwork_index)]
+
+
+# 36. Финансовые сводки
+# Выручка по художникам и месяцам, доход от аренды по картинам и затраты на реставрации
+# хранятся в таблицах-сводках (database.FINANCIAL_SUMMARIES). Они обновляются в тех же
+# транзакциях, что и продажи, аренды и реставрации, поэтому отчеты читают только строки
+# результата, а не всю историю. Пока миграция заполняет сводки порциями, строки картин,
+# до которых она не дошла, не меняются (database.financial_summaries_cover).
+_ARTIST_REVENUE_UPSERT = '''
+    INSERT INTO Artist_Monthly_Revenue (artist_id, month, sales_count, sales_revenue,
+                                        rentals_count, rental_revenue)
+    {rows}
+    ON CONFLICT (artist_id, month) DO UPDATE SET
+        sales_count = sales_count + excluded.sales_count,
+        sales_revenue = sales_revenue + excluded.sales_revenue,
+        rentals_count = rentals_count + excluded.rentals_count,
+        rental_revenue = rental_revenue + excluded.rental_revenue
+'''
+_MONTH_PATTERN = re.compile(r"\d{4}-\d{2}")
+
+
+def _add_artist_revenue(cursor, artist_id, month, sales_count=0, sales_revenue=0.0,
+                        rentals_count=0, rental_revenue=0.0):
+    cursor.execute(_ARTIST_REVENUE_UPSERT.format(rows="VALUES (?, ?, ?, ?, ?, ?)"),
+                   (artist_id, month, sales_count, sales_revenue or 0.0, rentals_count, rental_revenue or 0.0))
+
+
+def _add_rental_income(cursor, artwork_id, rentals_count, rental_income):
+    cursor.execute('''
+        INSERT INTO Artwork_Rental_Income (artwork_id, rentals_count, rental_income) VALUES (?, ?, ?)
+        ON CONFLICT (artwork_id) DO UPDATE SET
+            rentals_count = rentals_count + excluded.rentals_count,
+            rental_income = rental_income + excluded.rental_income
+    ''', (artwork_id, rentals_count, rental_income or 0.0))
+
+
+def _remove_artwork_from_summaries(cursor, artwork_id):
+    """Вычитает из сводок продажи, аренды и реставрации картины (перед их удалением)"""
+    cursor.execute(_ARTIST_REVENUE_UPSERT.format(rows='''
+        SELECT a.artist_id, COALESCE(substr(s.sale_date, 1, 7), '') AS month, -COUNT(*), -TOTAL(s.price), 0, 0
+        FROM Sale s JOIN Artwork a ON a.id = s.artwork_id
+        WHERE s.artwork_id = ? GROUP BY month
+    '''), (artwork_id,))
+    cursor.execute(_ARTIST_REVENUE_UPSERT.format(rows='''
+        SELECT a.artist_id, COALESCE(substr(r.start_date, 1, 7), '') AS month, 0, 0, -COUNT(*), -TOTAL(r.rental_fee)
+        FROM Rental r JOIN Artwork a ON a.id = r.artwork_id
+        WHERE r.artwork_id = ? GROUP BY month
+    '''), (artwork_id,))
+    cursor.execute('''
+        DELETE FROM Artist_Monthly_Revenue
+        WHERE artist_id = (SELECT artist_id FROM Artwork WHERE id = ?) AND sales_count = 0 AND rentals_count = 0
+    ''', (artwork_id,))
+    cursor.execute('DELETE FROM Artwork_Rental_Income WHERE artwork_id = ?', (artwork_id,))
+    cursor.execute('DELETE FROM Restoration_Cost WHERE artwork_id = ?', (artwork_id,))
+
+
+def get_artist_revenue(artist_id: int = None, start_month: str = None, end_month: str = None):
+    """Выручка по художникам и месяцам (месяц - строка ГГГГ-ММ, границы включаются).
+
+    Строки (artist_id, месяц, продаж, выручка от продаж, аренд, доход от аренды)
+    по возрастанию художника и месяца.
+    """
+    if artist_id is not None and (not isinstance(artist_id, int) or artist_id <= 0):
+        raise ValidationError("Некорректный ID художника.")
+    for month in (start_month, end_month):
+        if month is not None and not (isinstance(month, str) and _MONTH_PATTERN.fullmatch(month)):
+            raise ValidationError("Месяц должен быть в формате ГГГГ-ММ.")
+
+    conditions, params = [], []
+    if artist_id is not None:
+        conditions.append("artist_id = ?")
+        params.append(artist_id)
+    if start_month is not None:
+        conditions.append("month >= ?")
+        params.append(start_month)
+    if end_month is not None:
+        conditions.append("month <= ?")
+        params.append(end_month)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    def operation(cursor):
+        cursor.execute(f'''
+            SELECT artist_id, month, sales_count, sales_revenue, rentals_count, rental_revenue
+            FROM Artist_Monthly_Revenue {where} ORDER BY artist_id, month
+        ''', params)
+        return cursor.fetchall()
+
+    return _execute_db_operation(operation)
+
+
+def get_top_rental_income(limit: int = 10):
+    """Картины с наибольшим доходом от аренды: (artwork_id, название, аренд, доход)"""
+    if not isinstance(limit, int) or limit <= 0:
+        raise ValidationError("Лимит должен быть положительным целым числом.")
+
+    def operation(cursor):
+        cursor.execute('''
+            SELECT i.artwork_id, a.title, i.rentals_count, i.rental_income
+            FROM Artwork_Rental_Income i LEFT JOIN Artwork a ON a.id = i.artwork_id
+            ORDER BY i.rental_income DESC LIMIT ?
+        ''', (limit,))
+        return cursor.fetchall()
+
+    return _execute_db_operation(operation)
+
+
+def get_restoration_costs(artwork_id: int = None):
+    """Затраты на реставрации: (restoration_id, artwork_id, работа, материалы, итого).
+
+    Материалы - сумма quantity_used * unit_price; artwork_id ограничивает одной картиной.
+    """
+    if artwork_id is not None and (not isinstance(artwork_id, int) or artwork_id <= 0):
+        raise ValidationError("Некорректный ID картины.")
+
+    def operation(cursor):
+        query = '''
+            SELECT restoration_id, artwork_id, labor_cost, materials_cost, labor_cost + materials_cost
+            FROM Restoration_Cost
+        '''
+        if artwork_id is None:
+            cursor.execute(query + " ORDER BY restoration_id")
+        else:
+            cursor.execute(query + " WHERE artwork_id = ? ORDER BY restoration_id", (artwork_id,))
+        return cursor.fetchall()
+
+    return _execute_db_operation(operation)
+
+
+def rebuild_financial_summaries():
+    """Пересчитывает все финансовые сводки по исходным таблицам одной транзакцией"""
+    _execute_db_transaction(recompute_financial_summaries)
+
+
+def check_financial_summaries():
+    """Расхождения сводок с исходными таблицами: (таблица, ключ, ожидалось, в сводке)"""
+    return _execute_db_operation(find_financial_summary_mismatches)
+
+
+# 37. Экспорт таблиц в CSV и JSON Lines
+# Сколько строк забирать из курсора за одну запись в файл
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FORMATS = ("csv", "jsonl")
+# Уровень сжатия gzip: 6 (как у утилиты gzip) втрое быстрее 9 и почти не уступает в размере
+EXPORT_GZIP_LEVEL = 6
+# Таблицы, выгружаемые целиком, и списки с JOIN в том же виде, что get_sales/get_documents/get_restorations
+EXPORT_TABLES = ("Artwork", "Artist", "Exhibition", "Visitor", "Movement", "Material", "Sale", "Rental",
+                 "Restoration", "Document", "Visitor_Review", "Press_Review")
+EXPORT_LISTINGS = ("sales", "documents", "restorations")
+
+
+def _export_query(source: str):
+    if source in EXPORT_TABLES:
+        return f"SELECT * FROM {source} ORDER BY id", f"SELECT COUNT(*) FROM {source}"
+    if source in EXPORT_LISTINGS:
+        columns, from_clause, key, _ = _LISTINGS[source]
+        return (f"SELECT {columns} FROM {from_clause} ORDER BY {', '.join(key)}",
+                f"SELECT COUNT(*) FROM {from_clause}")
+    raise ValidationError(f"Неизвестный источник экспорта: {source}")
+
+
+def detect_file_format(path: str, fmt, compress):
+    """Формат и сжатие: явно заданные или по расширению файла (.csv, .jsonl, .gz)"""
+    name = path.lower()
+    if compress is None:
+        compress = name.endswith(".gz")
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if fmt is None:
+        fmt = os.path.splitext(name)[1].lstrip(".")
+    if fmt not in EXPORT_FORMATS:
+        raise ValidationError(f"Формат файла должен быть одним из: {', '.join(EXPORT_FORMATS)}.")
+    return fmt, compress
+
+
+def export_rows(source: str, path: str, fmt: str = None, compress: bool = None,
+                batch_size: int = EXPORT_BATCH_SIZE, progress=None, cancel=None):
+    """Выгружает таблицу или список source в файл path (CSV с заголовком или JSON Lines).
+
+    Строки читаются из курсора порциями fetchmany и сразу пишутся в файл, поэтому
+    расход памяти не зависит от размера таблицы. Файл пишется под именем path + ".part"
+    и переименовывается в path после успешного окончания.
+    progress(выгружено, всего) вызывается после каждой порции; если cancel.is_set(),
+    экспорт прерывается, временный файл удаляется и возвращается None.
+    Возвращает число выгруженных строк.
+    """
+    query, count_query = _export_query(source)
+    fmt, compress = detect_file_format(path, fmt, compress)
+    if not isinstance(batch_size, int) or batch_size <= 0:
+        raise ValidationError("Размер порции должен быть положительным целым числом.")
+
+    partial = path + ".part"
+    conn = None
+    written = 0
+    try:
+        conn = get_connection(profile="streaming")
+        cursor = _ProfiledCursor(conn.cursor(), f"export_{source}")
+        total = cursor.execute(count_query).fetchone()[0]
+        cursor.execute(query)
+        columns = [column[0] for column in cursor.description]
+        if compress:
+            output = gzip.open(partial, "wt", compresslevel=EXPORT_GZIP_LEVEL, encoding="utf-8", newline="")
+        else:
+            output = open(partial, "w", encoding="utf-8", newline="")
+        with output:
+            if fmt == "csv":
+                writer = csv.writer(output)
+                writer.writerow(columns)
+                write = writer.writerows
+            else:
+                # Один кодировщик на весь экспорт: json.dumps с параметрами создает новый на каждый вызов
+                encode = json.JSONEncoder(ensure_ascii=False).encode
+
+                def write(batch):
+                    output.write("".join(encode(dict(zip(columns, row))) + "\n" for row in batch))
+            while True:
+                if cancel is not None and cancel.is_set():
+                    break
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                write(batch)
+                written += len(batch)
+                if progress is not None:
+                    progress(written, total)
+        cursor.finish()
+        if cancel is not None and cancel.is_set():
+            os.remove(partial)
+            return None
+        os.replace(partial, path)
+        return written
+    except sqlite3.Error as e:
+        raise DatabaseError(f"Ошибка базы данных: {str(e)}")
+    except ArtGalleryError:
+        raise
+    except Exception as e:
+        raise ArtGalleryError(f"Ошибка при экспорте: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+# 38. Групповая фиксация частых изменений
+# Частые одиночные записи (сканеры перемещений, киоск отзывов и регистрации) по
+# отдельности платят за фиксацию - синхронизацию диска - на каждой строке.
+# GroupCommitWriter выполняет накопившиеся вызовы одной GallerySession: каждый вызов
+# в своей точке сохранения, фиксация - одна на порцию.
+# Наибольший размер порции и время (с) ожидания следующих вызовов после первого.
+# Без ожидания порцию составляют вызовы, пришедшие во время предыдущей фиксации,
+# так что порции растут вместе с нагрузкой сами. Вызывающий, который ждет
+# результата, не может поставить следующий вызов, пока идет окно, и окно только
+# задерживает его; оно полезно, когда вызовы ставятся без ожидания результата.
+GROUP_COMMIT_MAX_BATCH = 256
+GROUP_COMMIT_MAX_DELAY = 0.0
+
+
+class GroupCommitWriter:
+    """Очередь изменений с групповой фиксацией (по выбору вызывающего кода):
+
+        writer = GroupCommitWriter()
+        future = writer.record_movement(artwork_id, "Зал 1", "Зал 2", "Выставка", "Смотритель")
+        movement_id = future.result()
+        writer.close()
+
+    Поток записи забирает из очереди до max_batch вызовов (дожидаясь
+    следующих не дольше max_delay секунд с первого) и выполняет их одной
+    транзакцией. Каждый вызов возвращает Future с результатом функции (ID
+    строки). Ошибка вызова откатывает только его изменения и попадает в его
+    Future; если не удалась сама фиксация, вызовы порции повторяются каждый
+    своей транзакцией.
+    """
+
+    def __init__(self, max_batch: int = GROUP_COMMIT_MAX_BATCH, max_delay: float = GROUP_COMMIT_MAX_DELAY):
+        if not isinstance(max_batch, int) or max_batch <= 0:
+            raise ValidationError("Размер порции должен быть положительным целым числом.")
+        if max_delay < 0:
+            raise ValidationError("Время ожидания порции не может быть отрицательным.")
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"calls": 0, "batches": 0, "fallbacks": 0}
+        self._thread = threading.Thread(target=self._run, name="gallery-group-commit", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, function, *args, **kwargs) -> Future:
+        """Ставит в очередь вызов function(*args, session=..., **kwargs) - функции
+        services с параметром session"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise ArtGalleryError("Очередь групповой фиксации закрыта.")
+            self._queue.put((future, function, args, kwargs))
+        return future
+
+    def record_movement(self, artwork_id: int, from_location: str, to_location: str, purpose: str,
+                        responsible_person: str) -> Future:
+        return self.submit(record_movement, artwork_id, from_location, to_location, purpose, responsible_person)
+
+    def register_visitor(self, name: str, email: str, phone: str) -> Future:
+        return self.submit(register_visitor, name, email, phone)
+
+    def add_visitor_review(self, exhibition_id: int, review: str, reviewer_name: str) -> Future:
+        return self.submit(add_visitor_review, exhibition_id, review, reviewer_name)
+
+    def add_press_review(self, exhibition_id: int, review: str, publication_name: str) -> Future:
+        return self.submit(add_press_review, exhibition_id, review, publication_name)
+
+    def close(self, timeout: float = None):
+        """Выполняет уже поставленные вызовы и останавливает поток записи"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Число вызовов, порций и порций, повторенных по одному после ошибки фиксации"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit(batch)
+                    return
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            with GallerySession() as session:
+                for future, function, args, kwargs in batch:
+                    try:
+                        results.append((future, function(*args, session=session, **kwargs), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            logger.warning("Групповая фиксация не удалась (%s), вызовы повторяются по одному", e)
+            for future, function, args, kwargs in batch:
+                try:
+                    future.set_result(function(*args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+            fallback = 1
+        else:
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+            fallback = 0
+        with self._lock:
+            self._stats["calls"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["fallbacks"] += fallback
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+import pytest
+
+import aservices
+import database
+import services
+
+
+@pytest.fixture
+def async_db(temp_db):
+    """Временная база; потоки aservices останавливаются до закрытия пула."""
+    yield
+    aservices.shutdown()
+
+
+async def _until(event):
+    while not event.is_set():
+        await asyncio.sleep(0.01)
+
+
+def test_async_services(async_db):
+    """Корутины и асинхронные итераторы повторяют функции services."""
+    assert {"get_artworks", "sell_artwork", "iter_sales", "export_rows"} <= set(aservices.__all__)
+    assert aservices.get_artworks.__doc__ == services.get_artworks.__doc__
+    assert aservices.detect_file_format is services.detect_file_format
+
+    async def scenario():
+        artist = await aservices.add_artist("Artist", "Bio")
+        ids = await asyncio.gather(*(aservices.acquire_artwork(f"Art {i}", 2000, "Oil", "1x1", "", "Genre",
+                                                               artist, "", 100.0 + i) for i in range(5)))
+        await aservices.sell_artwork(ids[0], "Buyer", 150.0)
+        titles = [artwork.title async for artwork in aservices.iter_artworks()]
+        with pytest.raises(services.ValidationError):
+            await aservices.add_artist("", "Bio")
+        with pytest.raises(services.ValidationError):
+            await aservices.add_artist("Other", "Bio", session=object())
+
+        def move_all(session, location):
+            for artwork_id in ids:
+                services.record_movement(artwork_id, "Склад", location, "Выставка", "Куратор", session=session)
+            return len(ids)
+
+        moved = await aservices.in_session(move_all, "Зал 1")
+        return ids, titles, moved, await aservices.get_artworks(), await aservices.count_rows("movements")
+
+    ids, titles, moved, artworks, movements = asyncio.run(scenario())
+    assert sorted(titles) == [f"Art {i}" for i in range(5)]
+    assert moved == movements == 5
+    assert [artwork.id for artwork in artworks] == sorted(ids)
+    assert artworks[0].status == "Sold"
+
+
+def test_async_reads_do_not_wait_for_writes(async_db):
+    """Чтения выполняются, пока поток записи держит открытую транзакцию."""
+    started, release = threading.Event(), threading.Event()
+
+    def slow_write(session):
+        services.add_artist("Pending", "Bio", session=session)
+        session.flush()
+        started.set()
+        return release.wait(5)
+
+    async def scenario():
+        write = asyncio.ensure_future(aservices.in_session(slow_write))
+        await _until(started)
+        artists = await aservices.get_artists()
+        release.set()
+        return artists, await write, await aservices.get_artists()
+
+    during, released, after = asyncio.run(scenario())
+    assert during == []
+    assert released  # запись не ждала таймаута: чтение не стояло за ней
+    assert [artist.name for artist in after] == ["Pending"]
+
+
+def test_async_backpressure_and_cancellation(async_db, monkeypatch):
+    """Заполненная очередь, отмена ожидающего и выполняющегося вызова."""
+    monkeypatch.setattr(aservices, "MAX_PENDING_WRITES", 2)
+    monkeypatch.setattr(aservices, "READ_WORKERS", 1)
+    monkeypatch.setattr(aservices, "QUEUE_TIMEOUT", 0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def endless_query():
+        conn = database.get_connection()
+        try:
+            started.set()
+            conn.execute("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) "
+                         "SELECT count(*) FROM n").fetchone()
+        finally:
+            conn.close()
+
+    async def scenario():
+        blocker = asyncio.ensure_future(aservices.run_write(release.wait, 5))
+        queued = asyncio.ensure_future(aservices.add_artist("Cancelled", "Bio"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(aservices.QueueFullError):
+            await aservices.add_artist("Rejected", "Bio")
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        release.set()
+        await blocker
+        await aservices.add_artist("Accepted", "Bio")
+
+        # Выполняющийся запрос прерывается, единственный поток чтения освобождается
+        query = asyncio.ensure_future(aservices.run_read(endless_query))
+        await _until(started)
+        await asyncio.sleep(0.05)
+        query.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await query
+        return await asyncio.wait_for(aservices.get_artists(), 5)
+
+    artists = asyncio.run(scenario())
+    assert [artist.name for artist in artists] == ["Accepted"]
@@ -0,0 +1,181 @@
+"""Замеры задержек и пропускной способности функций services.py.
+
+Базы заполняются initial_data.generate на нескольких масштабах (по умолчанию
+1 тыс., 100 тыс. и 1 млн картин). Обычный прогон тестов эти замеры пропускает:
+
+    ART_GALLERY_BENCH=1 python -m pytest test_benchmarks.py -s
+
+Переменные окружения:
+    ART_GALLERY_BENCH_SCALES   масштабы через запятую (1 = 100 тыс. картин), по умолчанию 0.01,1,10
+    ART_GALLERY_BENCH_REPEAT   число вызовов на замер, по умолчанию 200
+    ART_GALLERY_BENCH_DIR      каталог для сгенерированных баз, чтобы не создавать их заново
+    ART_GALLERY_BENCH_OUTPUT   файл результатов, по умолчанию benchmark_results.json
+    ART_GALLERY_BENCH_BASELINE базовая линия; рост p50 больше чем на 20% считается ошибкой
+"""
+import os
+import random
+import shutil
+
+import pytest
+
+import benchmarks
+import database
+import initial_data
+import services
+
+pytestmark = pytest.mark.skipif(not os.environ.get("ART_GALLERY_BENCH"),
+                                reason="замеры запускаются с ART_GALLERY_BENCH=1")
+
+SCALES = [float(s) for s in os.environ.get("ART_GALLERY_BENCH_SCALES", "0.01,1,10").split(",")]
+REPEAT = int(os.environ.get("ART_GALLERY_BENCH_REPEAT", "200"))
+LISTING_REPEAT = 5
+# Полные списки больше этого размера не загружаются: для них есть get_*_page и iter_*
+LISTING_MAX_ROWS = 2_000_000
+REGRESSION_THRESHOLD = 0.2
+LISTINGS = ["artworks", "artists", "exhibitions", "visitors", "movements", "materials",
+            "visitor_reviews", "press_reviews", "sales", "restorations", "documents"]
+
+RESULTS = {}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def report():
+    """Сохраняет результаты и сравнивает их с базовой линией после всех замеров."""
+    yield
+    if not RESULTS:
+        return
+    benchmarks.save_results(os.environ.get("ART_GALLERY_BENCH_OUTPUT", "benchmark_results.json"), RESULTS)
+    baseline = os.environ.get("ART_GALLERY_BENCH_BASELINE")
+    if baseline:
+        rows = benchmarks.compare_results(benchmarks.load_results(baseline), RESULTS,
+                                          threshold=REGRESSION_THRESHOLD)
+        benchmarks._print_table(rows, ["name", "baseline", "current", "change", "regression"])
+        regressions = [row["name"] for row in rows if row["regression"]]
+        assert not regressions, f"Замедлились относительно {baseline}: {', '.join(regressions)}"
+
+
+@pytest.fixture(scope="module", params=SCALES, ids=lambda scale: f"{int(scale * 100_000)}-artworks")
+def gallery(request, tmp_path_factory):
+    """Копия сгенерированной базы нужного масштаба: замеры записи ее изменяют."""
+    scale = request.param
+    cache = os.environ.get("ART_GALLERY_BENCH_DIR") or str(tmp_path_factory.getbasetemp())
+    source = os.path.join(cache, f"gallery_{scale:g}.db")
+    previous = database.DATABASE
+    if not os.path.exists(source):
+        database.DATABASE = source
+        database.initialize_db()
+        initial_data.generate(scale, seed=42, log=None)
+        database.close_pool()
+
+    database.DATABASE = str(tmp_path_factory.mktemp("bench") / "gallery.db")
+    shutil.copy(source, database.DATABASE)
+    database.initialize_db()
+    services.invalidate_reference_cache()
+    yield f"{int(scale * 100_000)}"
+
+    database.close_pool()
+    database.DATABASE = previous
+    services.invalidate_reference_cache()
+
+
+def _record(gallery, name, func, repeat=REPEAT):
+    stats = benchmarks.measure(func, repeat)
+    RESULTS[f"{gallery}/{name}"] = stats
+    print(f"\n{gallery}/{name}: p50 {stats['p50_ms']:.3f} мс, p95 {stats['p95_ms']:.3f} мс, "
+          f"p99 {stats['p99_ms']:.3f} мс, {stats['ops_per_s']:.0f} вызовов/с")
+    return stats
+
+
+def _sample_ids(table, count, seed):
+    """count различных существующих id таблицы"""
+    conn = database.get_connection()
+    try:
+        ids = [row[0] for row in conn.execute(f"SELECT id FROM {table}")]
+    finally:
+        conn.close()
+    return random.Random(seed).sample(ids, min(count, len(ids)))
+
+
+def test_acquire_artwork(gallery):
+    artist_id = _sample_ids("Artist", 1, seed=1)[0]
+    _record(gallery, "acquire_artwork", lambda i: services.acquire_artwork(
+        f"Замер {i}", 2000, "Масло", "50x70", "Описание", "Портрет", artist_id, "Собрание", 1000.0))
+
+
+def test_sell_artwork(gallery):
+    ids = _sample_ids("Artwork", REPEAT + 1, seed=2)
+    _record(gallery, "sell_artwork", lambda i: services.sell_artwork(ids[i], "Покупатель", 1000.0),
+            repeat=len(ids) - 1)
+
+
+def test_rent_artwork(gallery):
+    # Проданные и уже занятые в эти даты картины сдать в аренду нельзя
+    ids = services.get_available_artworks("2030-01-01", "2030-02-01",
+                                          _sample_ids("Artwork", 2 * REPEAT, seed=3))[:REPEAT + 1]
+    _record(gallery, "rent_artwork",
+            lambda i: services.rent_artwork(ids[i], "Арендатор", "2030-01-01", "2030-02-01"),
+            repeat=len(ids) - 1)
+
+
+def test_record_movement(gallery):
+    ids = _sample_ids("Artwork", REPEAT + 1, seed=4)
+    _record(gallery, "record_movement",
+            lambda i: services.record_movement(ids[i], "Зал 1", "Зал 2", "Экспозиция", "Смотритель"),
+            repeat=len(ids) - 1)
+
+
+def test_register_visitor(gallery):
+    _record(gallery, "register_visitor", lambda i: services.register_visitor(
+        "Посетитель", f"bench-{i}@example.org", "+70000000000"))
+
+
+def test_available_artworks(gallery):
+    candidates = _sample_ids("Artwork", 1000, seed=6)
+    _record(gallery, "get_available_artworks", lambda i: services.get_available_artworks(
+        f"{2015 + i % 10}-03-01", f"{2015 + i % 10}-03-31", candidates), repeat=min(REPEAT, 50))
+
+
+def test_quote_package(gallery):
+    # 500 картин x 200 периодов = 100 тыс. расчетов за вызов
+    ids = _sample_ids("Artwork", 500, seed=7)
+    periods = [(f"2025-{month:02d}-01", f"2026-{month:02d}-{day:02d}") for month in range(1, 11) for day in range(1, 21)]
+    _record(gallery, "quote_package", lambda i: services.quote_package(ids, periods), repeat=min(REPEAT, 10))
+
+
+def test_search(gallery):
+    words = ["утро", "река", "портрет", "собор", "гавань"]
+    _record(gallery, "search", lambda i: services.search(words[i % len(words)]))
+
+
+@pytest.mark.parametrize("listing", LISTINGS)
+def test_get_listing(gallery, listing):
+    rows = services.count_rows(listing)
+    if rows > LISTING_MAX_ROWS:
+        pytest.skip(f"{listing}: {rows} строк, полный список не загружается")
+    get = getattr(services, f"get_{listing}")
+    stats = _record(gallery, f"get_{listing}", lambda i: get(), repeat=LISTING_REPEAT)
+    stats["rows_per_s"] = rows * stats["ops_per_s"]
+
+
+@pytest.mark.parametrize("listing", LISTINGS)
+def test_get_listing_page(gallery, listing):
+    get_page = getattr(services, f"get_{listing}_page")
+    token = None
+
+    def next_page(i):
+        nonlocal token
+        _, token = get_page(token)
+
+    _record(gallery, f"get_{listing}_page", next_page, repeat=min(REPEAT, 50))
+
+
+def test_financial_dashboards(gallery):
+    artist_ids = _sample_ids("Artist", 50, seed=8)
+    _record(gallery, "get_artist_revenue", lambda i: services.get_artist_revenue(artist_ids[i % len(artist_ids)]))
+    _record(gallery, "get_top_rental_income", lambda i: services.get_top_rental_income(10))
+
+
+def test_delete_artwork(gallery):
+    ids = _sample_ids("Artwork", REPEAT + 1, seed=5)
+    _record(gallery, "delete_artwork", lambda i: services.delete_artwork(ids[i]), repeat=len(ids) - 1)
+
@@ -0,0 +1,355 @@
+import sqlite3
+import threading
+import pytest
+import database
+from database import ConnectionPool, PoolTimeoutError
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Пул соединений к временной базе данных."""
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+
+def test_pool_reuses_connections(pool):
+    """Возвращенное соединение выдается повторно, а не открывается заново."""
+    conn = pool.acquire()
+    raw = conn.raw
+    conn.close()
+
+    conn = pool.acquire()
+    assert conn.raw is raw
+    conn.close()
+
+    stats = pool.stats()
+    assert stats["opens"] == 1
+    assert stats["hits"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_pool_is_bounded(pool):
+    """При исчерпании пула запрос ждет и завершается ошибкой по таймауту."""
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats()["waits"] == 1
+
+    # Освобожденное другим потоком соединение достается ожидающему
+    threading.Timer(0.05, first.close).start()
+    conn = pool.acquire()
+    conn.close()
+    second.close()
+
+
+def test_pool_rolls_back_and_evicts(pool):
+    """Незавершенная транзакция откатывается, простаивающие соединения закрываются."""
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.close()
+
+    pool.max_idle = 0
+    conn = pool.acquire()
+    assert pool.stats()["evictions"] == 1
+    conn.close()
+
+
+def test_closed_connection_is_unusable(pool):
+    """После close() обертка больше не дает доступа к соединению."""
+    conn = pool.acquire()
+    conn.close()
+    conn.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+def test_get_connection_follows_database_path(tmp_path, monkeypatch):
+    """Смена DATABASE приводит к созданию нового пула."""
+    monkeypatch.setattr(database, "DATABASE", str(tmp_path / "other.db"))
+    conn = database.get_connection()
+    conn.execute("CREATE TABLE marker (x INTEGER)")
+    conn.close()
+    assert database.get_pool().database == str(tmp_path / "other.db")
+    assert database.get_pool_stats()["opens"] == 1
+    database.close_pool()
+
+
+def test_default_profile_enables_wal(pool):
+    """Каждое соединение получает профиль PRAGMA по умолчанию."""
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    conn.close()
+
+
+def test_bulk_load_profile_is_switched_per_checkout(pool):
+    """Профиль bulk_load действует только на время выдачи соединения."""
+    conn = pool.acquire("bulk_load")
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 0  # OFF
+    conn.close()
+
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    conn.close()
+
+    with pytest.raises(ValueError):
+        pool.acquire("no_such_profile")
+
+
+def test_create_indexes_is_idempotent(temp_db):
+    """Миграция индексов создает их один раз и не падает при повторном запуске."""
+    database.initialize_db()
+    conn = database.get_connection()
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM Visitor WHERE email = ?", ("a@b.c",)).fetchall()
+
+    assert {name for name, *_ in database.INDEXES} <= names
+    assert "idx_visitor_email" in plan[-1][-1]
+
+    # Повторное применение шага поверх уже созданных индексов
+    database._create_indexes(conn.cursor())
+    conn.close()
+    assert database.migrate() == []
+
+
+def test_unique_email_index_reports_duplicates(temp_db):
+    """Уникальный индекс не создается поверх повторяющихся email."""
+    database.initialize_db()
+    conn = database.get_connection()
+    conn.execute("DROP INDEX idx_visitor_email")
+    conn.executemany("INSERT INTO Visitor (name, email) VALUES (?, ?)",
+                     [("A", "same@test.com"), ("B", "same@test.com")])
+    with pytest.raises(sqlite3.IntegrityError, match="same@test.com"):
+        database._create_indexes(conn.cursor())
+    conn.close()
+
+
+@pytest.fixture
+def extra_migrations(temp_db, monkeypatch):
+    """Тестовые миграции поверх стандартных."""
+    migrations = list(database.MIGRATIONS)
+    monkeypatch.setattr(database, "MIGRATIONS", migrations)
+    monkeypatch.setattr(database, "BACKFILL_PAUSE", 0)
+    database.initialize_db()
+    return migrations
+
+
+def test_migrate_records_versions_and_supports_dry_run(extra_migrations):
+    """Миграции применяются по порядку, dry-run ничего не меняет."""
+    version = database.get_schema_version()
+    extra_migrations.append(database.Migration(
+        version + 1, "Тестовая таблица",
+        lambda cursor: cursor.execute("CREATE TABLE IF NOT EXISTS Test_Table (x INTEGER)")))
+
+    planned = database.migrate(dry_run=True, log=None)
+    assert [step[0] for step in planned] == [version + 1]
+    assert database.get_schema_version() == version
+
+    applied = database.migrate(log=None)
+    assert [step[0] for step in applied] == [version + 1]
+    assert database.get_schema_version() == version + 1
+    conn = database.get_connection()
+    conn.execute("SELECT * FROM Test_Table")
+    conn.close()
+
+
+def test_failed_migration_is_rolled_back(extra_migrations):
+    """Ошибка в шаге откатывает его целиком и не повышает версию."""
+    version = database.get_schema_version()
+
+    def broken(cursor):
+        cursor.execute("CREATE TABLE Half_Done (x INTEGER)")
+        cursor.execute("SELECT * FROM No_Such_Table")
+
+    extra_migrations.append(database.Migration(version + 1, "Сломанная миграция", broken))
+    with pytest.raises(sqlite3.OperationalError):
+        database.migrate(log=None)
+
+    assert database.get_schema_version() == version
+    conn = database.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'Half_Done'").fetchone()[0] == 0
+    conn.close()
+
+
+def test_backfill_runs_in_chunks_and_resumes(extra_migrations):
+    """Заполнение идет порциями и после сбоя продолжается с сохраненной позиции."""
+    conn = database.get_connection()
+    conn.executemany("INSERT INTO Artist (name) VALUES (?)", [(f"Artist {i}",) for i in range(25)])
+    conn.close()
+
+    version = database.get_schema_version()
+    calls = []
+
+    def fail_once(start):
+        if start == 11 and 11 not in calls:
+            calls.append(start)
+            raise RuntimeError("сбой посреди заполнения")
+        calls.append(start)
+        return 1
+
+    def upgrade(cursor):
+        cursor.connection.create_function("fail_once", 1, fail_once)
+        cursor.execute("CREATE TABLE IF NOT EXISTS Artist_Copy (id INTEGER PRIMARY KEY, name TEXT)")
+
+    extra_migrations.append(database.Migration(
+        version + 1, "Копия художников", upgrade,
+        backfill=[("Artist", "INSERT OR IGNORE INTO Artist_Copy SELECT id, name FROM Artist "
+                             "WHERE rowid BETWEEN :start AND :end AND fail_once(:start)")]))
+
+    with pytest.raises(Exception):
+        database.migrate(chunk_size=10, log=None)
+    assert database.get_schema_version() == version
+
+    database.migrate(chunk_size=10, log=None)
+    assert database.get_schema_version() == version + 1
+    # Первая порция (10 строк) не повторялась: продолжение началось со второй
+    assert calls.count(1) == 10
+    assert list(dict.fromkeys(calls)) == [1, 11, 21]
+    conn = database.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM Artist_Copy").fetchone()[0] == 25
+    conn.close()
+
+
+def test_data_migrations_backfill_alongside_writes(temp_db, monkeypatch):
+    """Индексы поиска и занятости и финансовые сводки заполняются порциями, а
+    изменения между порциями не теряются и не учитываются дважды."""
+    import services
+    database.initialize_db()
+    services.invalidate_reference_cache()
+    artist = services.add_artist("Artist", "Bio")
+    ids = [services.acquire_artwork(f"Artwork {i}", 2000, "Oil", "1x1", "", "Портрет", artist, "", 100.0)
+           for i in range(30)]
+    services.sell_artwork(ids[0], "Buyer", 150.0)
+    services.rent_artwork(ids[2], "Renter", "2030-01-01", "2030-02-01")
+    restoration = services.record_restoration_state(ids[3], "Restorer", "Poor", 50.0)
+    material = services.add_material("Лак", 10.0)
+    services.add_restoration_material(restoration, material, 2)
+    exhibition = services.create_exhibition("Show", "Theme", "2031-01-01", "2031-02-01")
+    services.add_artwork_to_exhibition(exhibition, ids[4])
+    services.add_visitor_review(exhibition, "Отличная выставка", "Visitor")
+
+    # Возвращаем базу к версии 1: производных данных еще нет
+    conn = database.get_connection()
+    cursor = conn.cursor()
+    database._drop_search_triggers(cursor)
+    database._drop_availability_triggers(cursor)
+    for name, _, _ in database.SEARCH_INDEXES:
+        cursor.execute(f"DROP TABLE {name}")
+    for table in [database.AVAILABILITY_INDEX, *database.FINANCIAL_SUMMARIES]:
+        cursor.execute(f"DROP TABLE {table}")
+    cursor.execute("DELETE FROM schema_version WHERE version > 1")
+    conn.close()
+
+    def sql(statement, *params):
+        def run():
+            conn = database.get_connection()
+            conn.execute(statement, params)
+            conn.close()
+        return run
+
+    # Изменения между порциями: строки и до, и после позиции заполнения
+    actions = {
+        database.SEARCH_INDEX_MIGRATION: [
+            sql("UPDATE Artwork SET title = 'Переименованная' WHERE id IN (?, ?)", ids[1], ids[27]),
+            sql("DELETE FROM Artwork WHERE id IN (?, ?)", ids[5], ids[28]),
+            sql("INSERT INTO Artwork (title, artist_id, price) VALUES ('Новая', ?, 1)", artist),
+            sql("DELETE FROM Visitor_Review"),
+        ],
+        database.AVAILABILITY_MIGRATION: [
+            sql("INSERT INTO Rental (artwork_id, renter_name, start_date, end_date, rental_fee) "
+                "VALUES (?, 'Renter', '2030-03-01', '2030-04-01', 5)", ids[10]),
+            sql("UPDATE Exhibition SET start_date = '2031-05-01', end_date = '2031-06-01'"),
+            sql("INSERT INTO Exhibition_Artwork (exhibition_id, artwork_id) VALUES (?, ?)", exhibition, ids[11]),
+        ],
+        database.FINANCIAL_SUMMARIES_MIGRATION: [
+            lambda: services.sell_artwork(ids[25], "Buyer", 300.0),
+            lambda: services.rent_artwork(ids[24], "Renter", "2030-01-01", "2030-02-01"),
+            lambda: services.delete_artwork(ids[2]),
+            lambda: services.sell_artwork(ids[6], "Buyer", 120.0),
+            lambda: services.add_restoration_material(
+                services.record_restoration_state(ids[22], "Restorer", "Poor", 30.0), material, 1),
+        ],
+    }
+
+    def between_chunks(_):
+        conn = database.get_connection()
+        version = conn.execute("SELECT MIN(version) FROM schema_backfill_progress "
+                               "WHERE position IS NOT NULL").fetchone()[0]
+        conn.close()
+        if actions.get(version):
+            actions[version].pop(0)()
+
+    monkeypatch.setattr(database, "BACKFILL_PAUSE", 1)
+    monkeypatch.setattr(database.time, "sleep", between_chunks)
+    database.migrate(chunk_size=4, log=None)
+    assert not any(actions.values())
+
+    conn = database.get_connection()
+    cursor = conn.cursor()
+    assert database.get_schema_version() == database.MIGRATIONS[-1].version
+    assert cursor.execute("SELECT COUNT(*) FROM schema_backfill_progress").fetchone()[0] == 0
+    assert database.find_financial_summary_mismatches(cursor) == []
+    for name, _, _ in database.SEARCH_INDEXES:
+        cursor.execute(f"INSERT INTO {name} ({name}, rank) VALUES ('integrity-check', 1)")
+    expected = sorted(row for source in database.AVAILABILITY_SOURCES
+                      for row in cursor.execute(database._availability_select(source, "1")))
+    assert sorted(cursor.execute(f"SELECT * FROM {database.AVAILABILITY_INDEX}")) == expected
+    assert len(expected) == 9
+    conn.close()
+    assert sorted(hit[1] for hit in services.search("Переименованная")) == [ids[1], ids[27]]
+    services.invalidate_reference_cache()
+
+
+def test_generate_is_deterministic(tmp_path, monkeypatch):
+    """Генератор с одинаковым seed создает одинаковые данные и рабочий поиск."""
+    import initial_data
+
+    snapshots = []
+    for name in ("first.db", "second.db"):
+        monkeypatch.setattr(database, "DATABASE", str(tmp_path / name))
+        database.initialize_db()
+        counts = initial_data.generate(scale=0.002, seed=7, log=None)
+        conn = database.get_connection()
+        snapshots.append((
+            conn.execute("SELECT * FROM Artwork ORDER BY id").fetchall(),
+            conn.execute("SELECT * FROM Movement ORDER BY id").fetchall(),
+            conn.execute("SELECT * FROM Visitor_Review ORDER BY id").fetchall(),
+            conn.execute("SELECT * FROM Sale ORDER BY id").fetchall(),
+            conn.execute("SELECT * FROM Rental ORDER BY id").fetchall(),
+        ))
+        # Статусы и даты такие же, как после sell_artwork и rent_artwork: проданные
+        # картины в статусе Sold, аренда проданной картины закончилась до продажи
+        assert conn.execute("SELECT COUNT(*) FROM Sale JOIN Artwork ON Artwork.id = Sale.artwork_id "
+                            "WHERE Artwork.status != 'Sold'").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM Artwork WHERE status = 'Sold'").fetchone()[0] == counts["Sale"]
+        assert conn.execute("SELECT COUNT(*) FROM Rental JOIN Sale ON Sale.artwork_id = Rental.artwork_id "
+                            "WHERE Rental.end_date >= Sale.sale_date").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM Rental JOIN Artwork ON Artwork.id = Rental.artwork_id "
+                            "WHERE Artwork.status NOT IN ('Rented', 'Sold')").fetchone()[0] == 0
+        # Все ссылки указывают на существующие картины, поисковый индекс перестроен
+        assert conn.execute("SELECT COUNT(*) FROM Movement WHERE artwork_id NOT IN "
+                            "(SELECT id FROM Artwork)").fetchone()[0] == 0
+        conn.execute("INSERT INTO Artwork_Search (Artwork_Search, rank) VALUES ('integrity-check', 1)")
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                            "AND name LIKE '%Search%'").fetchone()[0] == 12
+        # Индекс занятости заполнен триггерами по ходу загрузки
+        assert conn.execute("SELECT COUNT(*) FROM Artwork_Availability").fetchone()[0] == sum(
+            counts[table] for table in ("Rental", "Sale", "Restoration", "Exhibition_Artwork"))
+        # Финансовые сводки пересчитаны после загрузки
+        assert database.find_financial_summary_mismatches(conn.cursor()) == []
+        assert conn.execute("SELECT COUNT(*) FROM Restoration_Cost").fetchone()[0] == counts["Restoration"]
+        conn.close()
+        database.close_pool()
+
+    assert counts["Artwork"] == 200
+    assert counts["Sale"] == 20 and counts["Rental"] == 40
+    assert counts["Movement"] > counts["Artwork"]
+    assert snapshots[0] == snapshots[1]
@@ -0,0 +1,99 @@
+import pytest
+
+import database
+import frames
+import services
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "array"])
+def use_numpy(request, monkeypatch):
+    if request.param and frames.np is None:
+        pytest.skip("NumPy не установлен")
+    if not request.param:
+        monkeypatch.setattr(frames, "np", None)
+    return request.param
+
+
+@pytest.fixture
+def catalogue(temp_db):
+    artist = services.add_artist("Artist", "Bio")
+    other = services.add_artist("Other", "Bio")
+    ids = [services.acquire_artwork(title, year, "Oil", "1x1", "", genre, artist_id, "", price)
+           for title, year, genre, artist_id, price in [
+               ("First", 1890, "Портрет", artist, 100.0),
+               ("Second", 1950, "Портрет", artist, 300.0),
+               ("Third", 2001, "Пейзаж", other, 50.0),
+               ("Fourth", None, "Пейзаж", other, 150.0),
+           ]]
+    services.sell_artwork(ids[1], "Buyer", 350.0)
+    return ids
+
+
+def _snapshot(frame):
+    """Содержимое таблицы в виде строк с раскодированными значениями"""
+    return [(frame.ids[i], *(column[i] for column in frame.numeric.values()),
+             *(frame.categories[name].values[frame.codes[name][i]] for name in frames.ENCODED_COLUMNS))
+            for i in range(len(frame))]
+
+
+def test_frame_queries(catalogue, use_numpy):
+    """Фильтры, агрегаты и группировки по столбцам."""
+    first, second, third, fourth = catalogue
+    frame = frames.ArtworkFrame.load()
+    assert len(frame) == 4
+
+    assert frame.filter(genre="Портрет") == [first, second]
+    assert frame.filter(genre=("Пейзаж", "Нет такого"), price=(100, None)) == [fourth]
+    assert frame.filter(year_created=(1900, None)) == [second, third]
+    assert frame.count(status="Sold") == 1
+    assert frame.count(genre="Нет такого") == 0
+
+    assert frame.aggregate("price") == {"count": 4, "total": 600.0, "mean": 150.0, "min": 50.0, "max": 300.0}
+    assert frame.aggregate("year_created")["count"] == 3
+    assert frame.aggregate("price", genre="Нет такого")["mean"] is None
+
+    assert frame.group_by("genre") == [
+        {"genre": "Пейзаж", "count": 2, "price_total": 200.0, "price_mean": 100.0,
+         "price_min": 50.0, "price_max": 150.0},
+        {"genre": "Портрет", "count": 2, "price_total": 400.0, "price_mean": 200.0,
+         "price_min": 100.0, "price_max": 300.0},
+    ]
+    assert [row["artist_id"] for row in frame.group_by("artist_id", genre="Пейзаж")] == [2]
+    assert None in [row["year_created"] for row in frame.group_by("year_created")]
+    assert frame.value_counts("status", genre="Портрет") == {"Acquired": 1, "Sold": 1}
+    assert [row["count"] for row in frame.histogram("price", bins=[0, 100, 200, 300])] == [1, 2, 1]
+
+    with pytest.raises(services.ValidationError):
+        frame.filter(title="First")
+    with pytest.raises(services.ValidationError):
+        frame.group_by("price")
+
+
+def test_frame_refresh(catalogue, monkeypatch):
+    """Изменения после загрузки применяются к таблице без полной перезагрузки."""
+    monkeypatch.setattr(frames, "FULL_RELOAD_FRACTION", 10)
+    first, second, third, fourth = catalogue
+    frame = frames.ArtworkFrame.load()
+    assert frame.refresh() == 0
+
+    services.update_artwork_status(first, "restoration")
+    services.delete_artwork(third)
+    added = services.acquire_artwork("Fifth", 2020, "Acrylic", "1x1", "", "Абстракция", 1, "", 75.0)
+    conn = database.get_connection()
+    conn.execute("UPDATE Artwork SET id = 100 WHERE id = ?", (fourth,))
+    conn.commit()
+    conn.close()
+
+    assert frame.refresh() == 5
+    assert frame.filter() == [first, second, added, 100]
+    assert frame.filter(status="restoration") == [first]
+    assert _snapshot(frame) == _snapshot(frames.ArtworkFrame.load())
+
+    # Массовая загрузка идет в обход журнала: таблица загружается заново
+    conn = database.get_connection()
+    with database.derived_indexes_deferred(conn):
+        conn.execute("DELETE FROM Artwork WHERE id = ?", (second,))
+        conn.commit()
+    conn.close()
+    assert frame.refresh() == 1
+    assert frame.filter() == [first, added, 100]
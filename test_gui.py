@@ -3,6 +3,7 @@ import pytest
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QPushButton, QTabWidget, QDialog, QLineEdit, QMessageBox, QTextEdit, QSpinBox
 from gui import ArtGalleryApp
+from models import Artist
 from unittest.mock import patch
 
 
@@ -79,9 +80,11 @@ def test_show_artists(app, qtbot):
         refresh_btn = artists_tab.findChild(QPushButton)
         text_edit = artists_tab.findChild(QTextEdit)
 
-        test_data = [(1, "Van Gogh", "France"), (2, "Picasso", "Spain")]
+        test_data = [Artist(1, "Van Gogh", "France"), Artist(2, "Picasso", "Spain")]
         with patch('services.get_artists', return_value=test_data):
             qtbot.mouseClick(refresh_btn, Qt.LeftButton)
+            # Список загружается в фоновом потоке
+            qtbot.waitUntil(lambda: "Picasso" in text_edit.toPlainText())
 
             content = text_edit.toPlainText()
             assert "Van Gogh" in content, "Данные Van Gogh не найдены"
@@ -91,3 +94,147 @@ def test_show_artists(app, qtbot):
     except AssertionError as e:
         print_result(False, str(e))
         raise
+
+
+def test_artwork_model_fetches_pages(qtbot):
+    """Модель списка картин подгружает страницы по требованию"""
+    print_test_header("Постраничная модель картин")
+    from gui import ArtworkTableModel
+
+    pages = {
+        None: ([(1, "A", 2000, "", "", "", "", "", "Sold", 1, 10.0)], "next"),
+        "next": ([(2, "B", 2001, "", "", "", "", "", "Acquired", 1, 20.0)], None),
+    }
+    with patch('services.get_artworks_page', side_effect=lambda token, limit: pages[token]):
+        model = ArtworkTableModel(page_size=1)
+        assert model.rowCount() == 0
+
+        model.fetchMore()
+        assert model.rowCount() == 1
+        assert model.data(model.index(0, 8)) == "Продана"
+        assert model.canFetchMore()
+
+        model.fetchMore()
+        assert model.rowCount() == 2
+        assert not model.canFetchMore()
+    print_result(True, "Страницы загружаются по мере прокрутки")
+
+
+def test_task_runner_drops_stale_results(qtbot):
+    """Повторный запрос с тем же ключом отменяет предыдущий"""
+    print_test_header("Фоновые задачи")
+    import threading
+    from PyQt5.QtCore import QThreadPool
+    from gui import TaskRunner
+
+    pool = QThreadPool()
+    pool.setMaxThreadCount(1)
+    runner = TaskRunner(pool)
+    gate = threading.Event()
+    results, errors = [], []
+
+    runner.run("blocker", lambda: gate.wait(5))
+    runner.run("sales", lambda: "old", on_result=results.append)
+    runner.run("sales", lambda: "new", on_result=results.append)
+    runner.run("error", lambda: 1 / 0, on_error=errors.append)
+    assert runner.is_busy()
+
+    gate.set()
+    qtbot.waitUntil(lambda: not runner.is_busy())
+    assert results == ["new"]
+    assert isinstance(errors[0], ZeroDivisionError)
+    print_result(True, "Устаревшие результаты отброшены")
+
+
+def test_task_runner_ignores_repeated_writes(qtbot):
+    """Повторное изменение с тем же ключом не выполняется, пока идет первое"""
+    print_test_header("Фоновые изменения")
+    import threading
+    from PyQt5.QtCore import QThreadPool
+    from gui import TaskRunner
+
+    runner = TaskRunner(QThreadPool())
+    gate = threading.Event()
+    calls, results = [], []
+
+    def add_artist(name):
+        calls.append(name)
+        gate.wait(5)
+        return len(calls)
+
+    assert runner.run_write("add_artist", add_artist, "first", on_result=results.append) is not None
+    assert runner.run_write("add_artist", add_artist, "second", on_result=results.append) is None
+    runner.cancel("add_artist")
+
+    gate.set()
+    qtbot.waitUntil(lambda: not runner.is_busy())
+    assert calls == ["first"]
+    assert results == [1]
+
+    # После завершения изменения следующее с тем же ключом выполняется
+    runner.run_write("add_artist", add_artist, "third", on_result=results.append)
+    qtbot.waitUntil(lambda: not runner.is_busy())
+    assert calls == ["first", "third"] and results == [1, 2]
+    print_result(True, "Повторное изменение проигнорировано")
+
+
+def test_search_box_shows_results(app, qtbot):
+    """Результаты поиска отображаются над вкладками"""
+    print_test_header("Поиск")
+    results = [("artworks", 7, "Звёздная ночь", "[Звёздная] ночь", -1.5)]
+    with patch('services.search', return_value=results):
+        app.search_input.setText("звёздная")
+        app.run_search()
+        qtbot.waitUntil(lambda: "Звёздная ночь" in app.search_results.toPlainText())
+    assert "Картина (ID 7)" in app.search_results.toPlainText()
+
+    app.search_input.clear()
+    app.run_search()
+    assert app.search_results.isHidden()
+    print_result(True, "Результаты поиска отображены")
+
+
+def test_diagnostics_panel(app):
+    """Панель диагностики показывает статистику запросов"""
+    print_test_header("Диагностика")
+    stats = {
+        "queries": [{"function": "sell_artwork", "sql": "SELECT price FROM Artwork WHERE id = ?",
+                     "calls": 3, "rows": 3, "total_ms": 1.5, "mean_ms": 0.5, "p95_ms": 0.7,
+                     "max_ms": 0.9}],
+        "slow_queries": [{"function": "get_artworks", "sql": "SELECT * FROM Artwork",
+                          "elapsed_ms": 250.0, "rows": 100000, "plan": ["SCAN Artwork"],
+                          "time": 0}],
+        "pool": {"in_use": 1, "max_size": 8, "waits": 0},
+        "cache": {"hits": 5, "misses": 2},
+        "slow_query_ms": 100.0,
+    }
+    with patch('services.get_db_stats', return_value=stats):
+        app.open_diagnostics()
+        assert app.diagnostics_table.rowCount() == 1
+        assert app.diagnostics_table.item(0, 0).text() == "sell_artwork"
+        assert "SCAN Artwork" in app.diagnostics_slow.toPlainText()
+        app.diagnostics_dialog.close()
+    assert app.diagnostics_dialog is None
+    print_result(True, "Статистика запросов отображена")
+
+
+def test_export_dialog(app, qtbot, tmp_path):
+    """Экспорт запускается в фоне и показывает прогресс"""
+    print_test_header("Экспорт")
+
+    def export_rows(source, path, fmt, compress, progress=None, cancel=None):
+        progress(5, 10)
+        return 10
+
+    with patch('services.export_rows', side_effect=export_rows) as export:
+        app.open_export_dialog()
+        app.export_source.setCurrentIndex(app.export_source.findData("Movement"))
+        app.export_format.setCurrentIndex(app.export_format.findData("jsonl"))
+        app.export_path.setText(str(tmp_path / "movements.jsonl"))
+        app.start_export()
+        qtbot.waitUntil(lambda: "Выгружено строк: 10." in app.export_status.text())
+    assert export.call_args[0][:4] == ("Movement", str(tmp_path / "movements.jsonl"), "jsonl", False)
+    assert app.export_progress_bar.value() == 100
+    app.export_dialog.close()
+    assert app.export_dialog is None
+    print_result(True, "Экспорт выполнен")
@@ -0,0 +1,90 @@
+import csv
+import json
+
+import pytest
+
+import database
+import importer
+import services
+
+
+def _write_csv(path, header, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_import_validates_and_resolves_artists(temp_db, tmp_path, monkeypatch):
+    """Импорт отклоняет строки по правилам services и разрешает художников по имени."""
+    profiles = []
+    get_connection = database.get_connection
+    monkeypatch.setattr(database, "get_connection", lambda profile=None: (
+        profiles.append(profile), get_connection(profile))[1])
+    _write_csv(tmp_path / "artists.csv", ["name", "biography"],
+               [["Моне", "Импрессионист"], ["Ренуар", "Импрессионист"], ["", "Без имени"]])
+    report = importer.import_file("artists", str(tmp_path / "artists.csv"), log=None)
+    assert (report["records"], report["inserted"], report["rejected"]) == (3, 2, 1)
+    # Все обращения импорта к базе идут через соединения массовой загрузки
+    assert profiles and set(profiles) == {"bulk_load"}
+    monkeypatch.setattr(database, "get_connection", get_connection)
+
+    artworks = [
+        {"title": "Кувшинки", "artist": "Моне", "price": "1000", "year_created": "1906"},
+        {"title": "Бал", "artist": "Ренуар", "price": 500.5},
+        {"title": "Без художника", "artist": "Неизвестный", "price": 10},
+        {"title": "Отрицательная цена", "artist": "Моне", "price": -1},
+        {"title": "", "artist": "Моне", "price": 10},
+        {"title": "Чужой ID", "artist_id": 999, "price": 10},
+    ]
+    with open(tmp_path / "artworks.jsonl", "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in artworks)
+        f.write("{не JSON\n")
+    report = importer.import_file("artworks", str(tmp_path / "artworks.jsonl"), chunk_size=3, log=None)
+    assert (report["records"], report["inserted"], report["rejected"]) == (7, 2, 5)
+    assert [(row[1], row[10]) for row in services.get_artworks()] == [("Кувшинки", 1000.0), ("Бал", 500.5)]
+
+    with open(report["rejected_report"], encoding="utf-8") as f:
+        rejected = [json.loads(line) for line in f]
+    assert [row["record"] for row in rejected] == [3, 4, 5, 6, 7]
+    assert "Неизвестный" in rejected[0]["error"] and rejected[0]["data"]["title"] == "Без художника"
+    assert rejected[4]["data"] is None
+
+    _write_csv(tmp_path / "visitors.csv", ["name", "email", "phone"],
+               [["Анна", "anna@example.org", "+7900"], ["Дубль", "anna@example.org", "+7901"],
+                ["Без почты", "nomail", "+7902"]])
+    report = importer.import_file("visitors", str(tmp_path / "visitors.csv"), log=None)
+    assert (report["inserted"], report["rejected"]) == (1, 2)
+
+    with pytest.raises(services.ValidationError):
+        importer.import_file("paintings", str(tmp_path / "visitors.csv"), log=None)
+
+
+def test_import_resumes_after_interruption(temp_db, tmp_path):
+    """Прерванный импорт продолжается с первой незафиксированной порции без дублей."""
+    artist = services.add_artist("Artist", "Bio")
+    artwork = services.acquire_artwork("Artwork", 2020, "Oil", "1x1", "", "", artist, "", 100.0)
+    rows = [[artwork if i % 10 else 999, f"Зал {i}", "Запасник", "Хранение", "Смотритель", "2024-01-01"]
+            for i in range(1, 101)]
+    path = str(tmp_path / "movements.csv")
+    _write_csv(path, ["artwork_id", "from_location", "to_location", "purpose", "responsible_person",
+                      "movement_date"], rows)
+
+    def interrupt(done):
+        if done == 40:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        importer.import_file("movements", path, chunk_size=20, progress=interrupt, log=None)
+    assert services.count_rows("movements") == 36
+
+    report = importer.import_file("movements", path, chunk_size=20, log=None)
+    assert report["resumed_from"] == 40
+    assert (report["records"], report["inserted"], report["rejected"]) == (100, 90, 10)
+    assert [row[2] for row in services.get_movements()] == [f"Зал {i}" for i in range(1, 101) if i % 10]
+
+    # Повторный запуск завершенного импорта ничего не добавляет, restart начинает заново
+    assert importer.import_file("movements", path, log=None)["inserted"] == 90
+    assert services.count_rows("movements") == 90
+    assert importer.import_file("movements", path, restart=True, log=None)["resumed_from"] == 0
+    assert services.count_rows("movements") == 180
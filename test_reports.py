@@ -0,0 +1,68 @@
+import pytest
+from datetime import date
+
+import reports
+import services
+
+
+@pytest.fixture
+def generated_db(temp_db):
+    import initial_data
+    return initial_data.generate(scale=0.002, seed=7, log=None)
+
+
+def test_reports_on_known_data(temp_db):
+    """Значения отчетов на небольшом наборе данных."""
+    artist = services.add_artist("Artist", "Bio")
+    first = services.acquire_artwork("First", 2020, "Oil", "1x1", "", "Портрет", artist, "", 100.0)
+    second = services.acquire_artwork("Second", 2020, "Oil", "1x1", "", "Портрет", artist, "", 200.0)
+    services.rent_artwork(first, "Renter", "2024-01-01", "2024-01-10")
+    services.rent_artwork(first, "Renter", "2024-01-25", "2024-02-15")
+    services.sell_artwork(second, "Buyer", 300.0)
+    services.record_movement(first, "Запасник", "Зал 1", "Экспозиция", "Смотритель")
+    services.record_movement(first, "Зал 1", "Зал 2", "Экспозиция", "Смотритель")
+    exhibition = services.create_exhibition("Exhibition", "Theme", "2024-01-01", "2024-02-01")
+    services.create_exhibition("Empty", "Theme", "2024-03-01", "2024-04-01")
+    services.add_visitor_review(exhibition, "Review", "Visitor")
+    services.add_press_review(exhibition, "Review", "Press")
+
+    # Январь: 10 дней первой аренды и 7 дней второй
+    assert reports.rental_utilization("2024-01-01", "2024-01-31") == [{
+        "artwork_id": first, "title": "First", "rentals": 2, "rented_days": 17, "utilization": 17 / 31}]
+    assert reports.rental_utilization("2025-01-01", "2025-01-31") == []
+
+    kpis = reports.gallery_kpis()
+    assert [row["year"] for row in kpis] == [str(date.today().year), "Итого"]
+    assert kpis[-1]["sales"] == 1 and kpis[-1]["average_sale"] == 300.0
+    assert kpis[-1]["average_list_price"] == 200.0 and kpis[-1]["sale_to_list"] == 1.5
+
+    movements = {row["location"]: row for row in reports.movement_frequency()}
+    assert movements["Зал 1"]["departures"] == 1 and movements["Зал 1"]["arrivals"] == 1
+    assert movements["Зал 2"]["movements"] == 1
+
+    assert [(row["title"], row["visitor_reviews"], row["press_reviews"])
+            for row in reports.exhibition_review_counts()] == [("Exhibition", 1, 1), ("Empty", 0, 0)]
+
+    with pytest.raises(services.ValidationError):
+        reports.rental_utilization("2024-02-01", "2024-01-01")
+    with pytest.raises(services.ValidationError):
+        reports.movement_frequency(start_date="2024-01-01")
+
+
+def test_parallel_reports_match_sequential(generated_db, monkeypatch):
+    """Слияние частичных агрегатов процессов дает тот же результат, что и один проход."""
+    sequential = [reports.gallery_kpis(workers=1),
+                  reports.rental_utilization("2015-01-01", "2024-12-31", workers=1),
+                  reports.movement_frequency("2015-01-01", "2019-12-31", workers=1),
+                  reports.exhibition_review_counts(workers=1)]
+    monkeypatch.setattr(reports, "PARALLEL_MIN_ROWS", 1)
+    parallel = [reports.gallery_kpis(workers=2),
+                reports.rental_utilization("2015-01-01", "2024-12-31", workers=2),
+                reports.movement_frequency("2015-01-01", "2019-12-31", workers=2),
+                reports.exhibition_review_counts(workers=2)]
+
+    # Суммы с плавающей точкой складываются в другом порядке
+    for one, many in zip(sequential, parallel):
+        assert len(one) > 0 and many == [pytest.approx(row) for row in one]
+    assert sequential[0][-1]["sales"] == generated_db["Sale"]
+    assert sum(row["reviews"] for row in sequential[3]) == generated_db["Visitor_Review"] + generated_db["Press_Review"]
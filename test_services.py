@@ -3,6 +3,7 @@ import time
 from datetime import date
 from services import *
 from database import initialize_db, get_connection
+from models import Artwork, Artist, SaleListing
 
 @pytest.fixture(scope="function")
 def setup_db():
@@ -20,12 +21,15 @@ def setup_db():
         "Artwork", "Artist", "Visitor", "Exhibition",
         "Provenance", "Restoration", "Document", "Material",
         "Sale", "Rental", "Visitor_Review", "Press_Review",
-        "Movement", "Exhibition_Artwork"
+        "Movement", "Exhibition_Artwork", "Restoration_Material",
+        "Artist_Monthly_Revenue", "Artwork_Rental_Income", "Restoration_Cost"
     ]
     for table in tables:
         cursor.execute(f"DELETE FROM {table}")
     conn.commit()
     conn.close()
+    # Таблицы очищены в обход services - кэш справочников больше не актуален
+    invalidate_reference_cache()
 
 @pytest.fixture
 def sample_artist(setup_db):
@@ -241,4 +245,415 @@ def test_nonexistent_artwork_movement(setup_db):
             to_location="Hall",
             purpose="Test",
             responsible_person="Test"
-        )
\ No newline at end of file
+        )
+
+def test_keyset_pagination(setup_db, sample_artist):
+    """Тест постраничного получения картин по токену продолжения."""
+    for i in range(5):
+        acquire_artwork(f"Paged {i}", 2000 + i, "Oil", "10x10", "Test", "Test",
+                        sample_artist, "Test provenance", 10.0)
+
+    pages = []
+    token = None
+    while True:
+        rows, token = get_artworks_page(token, limit=2)
+        pages.append(rows)
+        if token is None:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [row for page in pages for row in page] == get_artworks()
+    assert count_rows("artworks") == 5
+
+
+def test_invalid_page_token(setup_db):
+    """Тест отказа от чужого или испорченного токена страницы."""
+    with pytest.raises(ValidationError):
+        get_artworks_page("not-a-token")
+    create_exhibition("Ex 1", "Theme", "2023-01-01", "2023-02-01")
+    create_exhibition("Ex 2", "Theme", "2023-01-01", "2023-02-01")
+    _, token = get_exhibitions_page(limit=1)
+    with pytest.raises(ValidationError):
+        get_artworks_page(token)
+
+
+def test_iter_artworks_streams_in_batches(setup_db, sample_artist):
+    """Тест потокового перебора картин и возврата соединения в пул."""
+    for i in range(5):
+        acquire_artwork(f"Streamed {i}", 2000, "Oil", "10x10", "Test", "Test",
+                        sample_artist, "Test provenance", 10.0)
+
+    assert list(iter_artworks(batch_size=2)) == get_artworks()
+
+    in_use = get_pool_stats()["in_use"]
+    rows = iter_artworks(batch_size=2)
+    next(rows)
+    assert get_pool_stats()["in_use"] == in_use + 1
+    rows.close()
+    assert get_pool_stats()["in_use"] == in_use
+
+    with pytest.raises(ValidationError):
+        iter_movements(batch_size=0)
+
+
+def test_getters_return_models(setup_db, sample_artist, sample_artwork):
+    """Тест типизированных строк: модели вместо кортежей, доступ к полям по имени."""
+    artwork = get_artworks()[0]
+    assert type(artwork) is Artwork
+    assert artwork.id == sample_artwork and artwork.title == "Sample Artwork"
+    assert artwork.status == artwork[Artwork._fields.index("status")]
+    assert isinstance(get_artists()[0], Artist)
+    assert type(next(iter_artworks())) is Artwork
+    assert type(get_artworks_page()[0][0]) is Artwork
+
+    # Модели неизменяемы и не хранят __dict__
+    with pytest.raises(AttributeError):
+        artwork.title = "Changed"
+    assert not hasattr(artwork, "__dict__")
+
+    sell_artwork(sample_artwork, "Buyer", 150.0)
+    sale = get_sales()[0]
+    assert type(sale) is SaleListing and sale.artwork_title == "Sample Artwork"
+    assert tuple(sale) == (sale.id, "Sample Artwork", "Buyer", sale.sale_date, 150.0)
+
+
+def test_acquire_artworks_batch(setup_db, sample_artist):
+    """Тест массового добавления картин с отклонением ошибочных строк."""
+    row = dict(title="Batch", year_created=2020, technique="Oil", dimensions="10x10",
+               description="Test", genre="Test", artist_id=sample_artist,
+               provenance_entry="Batch provenance", price=50.0)
+    rows = [row, dict(row, title=""), dict(row, artist_id=999999), dict(row, title="Batch 2"),
+            {"title": "No fields"}]
+
+    ids, errors = acquire_artworks_batch(rows)
+
+    assert [index for index, _ in errors] == [1, 2, 4]
+    assert ids[1] is None and ids[2] is None and ids[4] is None
+    artworks = {artwork[0]: artwork for artwork in get_artworks()}
+    assert artworks[ids[0]][1] == "Batch"
+    assert artworks[ids[3]][1] == "Batch 2"
+    assert artworks[ids[3]][8] == "Acquired"
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) FROM Provenance WHERE artwork_id IN (?, ?)', (ids[0], ids[3]))
+    assert cursor.fetchone()[0] == 2
+    conn.close()
+
+
+def test_reference_cache(setup_db):
+    """Тест кэширования справочников и его сброса при изменениях."""
+    artist_id = add_artist("Cached Artist", "Biography")
+    hits = get_cache_stats()["hits"]
+
+    first = get_artists()
+    second = get_artists()
+    assert first == second
+    assert get_cache_stats()["hits"] == hits + 1
+
+    update_artist(artist_id, name="Renamed Artist")
+    assert [a[1] for a in get_artists() if a[0] == artist_id] == ["Renamed Artist"]
+
+    # Проверка существования художника обслуживается кэшем
+    acquire_artwork("Cached", 2020, "Oil", "10x10", "Test", "Test", artist_id, "Test", 10.0)
+    hits = get_cache_stats()["hits"]
+    acquire_artwork("Cached 2", 2020, "Oil", "10x10", "Test", "Test", artist_id, "Test", 10.0)
+    assert get_cache_stats()["hits"] == hits + 1
+
+    # Материал для реставрации и его цена для сводки затрат тоже берутся из кэша
+    artwork_id = get_artworks()[0].id
+    material_id = add_material("Cached Material", 4.0)
+    first, second = (record_restoration_state(artwork_id, "Restorer", "Poor", 10.0) for _ in range(2))
+    add_restoration_material(first, material_id, 1)
+    hits = get_cache_stats()["hits"]
+    add_restoration_material(second, material_id, 2)
+    assert get_cache_stats()["hits"] == hits + 1
+    assert [row[3] for row in get_restoration_costs()] == [4.0, 8.0]
+
+
+def test_reference_cache_lru_and_ttl():
+    """Тест вытеснения давно не использованных и устаревших записей."""
+    cache = ReferenceCache(max_size=2, ttl=60)
+    cache.get(("Artist", 1), lambda: "a")
+    cache.get(("Artist", 2), lambda: "b")
+    cache.get(("Artist", 1), lambda: "unused")
+    cache.get(("Artist", 3), lambda: "c")
+    assert cache.get(("Artist", 2), lambda: "reloaded") == "reloaded"
+    assert cache.stats()["evictions"] == 2
+
+    cache = ReferenceCache(ttl=0)
+    cache.get(("Material", 1), lambda: "old")
+    assert cache.get(("Material", 1), lambda: "new") == "new"
+
+
+def test_search(setup_db, sample_artist):
+    """Тест полнотекстового поиска и синхронизации индекса с таблицами."""
+    artwork_id = acquire_artwork("Звёздная ночь над Роной", 1888, "Масло", "72x92",
+                                 "Отражения огней в воде", "Пейзаж", sample_artist, "Test", 100.0)
+    update_artist(sample_artist, biography="Голландский постимпрессионист")
+
+    results = search("звёздная ноч")
+    assert [(kind, row_id) for kind, row_id, *_ in results] == [("artworks", artwork_id)]
+    assert "[Звёздная]" in results[0][3]
+
+    assert [row[1] for row in search("постимпрессионист", kinds=("artists",))] == [sample_artist]
+    assert search("постимпрессионист", kinds=("artworks",)) == []
+
+    update_artwork_status(artwork_id, "Sold")
+    delete_artwork(artwork_id)
+    assert search("звёздная") == []
+
+    with pytest.raises(ValidationError):
+        search("  * ")
+    with pytest.raises(ValidationError):
+        search("ночь", kinds=("paintings",))
+
+
+def test_db_stats(setup_db, sample_artwork):
+    """Тест замеров запросов по функциям services и журнала медленных запросов."""
+    reset_db_stats()
+    configure_query_profiling(slow_query_ms=0)
+    try:
+        sell_artwork(sample_artwork, "Buyer", 100.0)
+    finally:
+        configure_query_profiling(slow_query_ms=SLOW_QUERY_MS)
+
+    stats = get_db_stats()
+    # Картина, продажа, статус, проверка заполнения сводок, сводка
+    assert stats["functions"]["sell_artwork"]["statements"] == 5
+    select = [q for q in stats["queries"] if q["sql"] == "SELECT * FROM Artwork WHERE id = ?"]
+    assert len(select) == 1
+    assert select[0]["function"] == "sell_artwork"
+    assert select[0]["calls"] == select[0]["rows"] == 1
+    assert sum(select[0]["histogram"]) == 1
+    assert "INTEGER PRIMARY KEY" in stats["slow_queries"][0]["plan"][0]
+    assert "in_use" in stats["pool"] and "hits" in stats["cache"]
+
+    reset_db_stats()
+    assert get_db_stats()["queries"] == []
+
+
+def test_gallery_session(setup_db, sample_artist, sample_artwork):
+    """Тест сессии: одна транзакция, карта идентичности и сгруппированная запись."""
+    other = acquire_artwork("Other", 2000, "Oil", "10x10", "Test", "Test", sample_artist, "Test", 50.0)
+    reset_db_stats()
+    with GallerySession() as session:
+        artwork = session.get(Artwork, sample_artwork)
+        assert session.get(Artwork, sample_artwork) is artwork
+        sell_artwork(sample_artwork, "Buyer", 150.0, session=session)
+        add_document(sample_artwork, "Договор", "/docs/sale.pdf", session=session)
+        # Изменение, сделанное services, видно в карте без повторного чтения
+        assert session.get(Artwork, sample_artwork).status == "Sold"
+        # Другие соединения не видят незафиксированную транзакцию
+        assert get_sales() == []
+
+        # Одинаковые изменения нескольких строк - один UPDATE
+        for artwork in session.get_many(Artwork, [sample_artwork, other]):
+            session.update(artwork, current_location="Зал 2")
+        artist = session.add(Artist(name="New Artist", biography="Bio"))
+        assert artist.id is not None
+        assert session.flush() == 3
+
+    stats = get_db_stats()["functions"]
+    assert stats["GallerySession.get"]["statements"] == 2
+    assert stats["GallerySession.flush"]["statements"] == 2
+    assert get_sales()[0].artwork_title == "Sample Artwork"
+    assert {a.current_location for a in get_artworks()} == {"Зал 2"}
+    assert artist in get_artists()
+
+    # Ошибка вызова откатывает только его изменения, исключение в блоке - всю сессию
+    with GallerySession() as session:
+        with pytest.raises(DatabaseError):
+            sell_artwork(99999, "Buyer", 10.0, session=session)
+        update_artwork_status(other, "Reserved", session=session)
+    assert [a.status for a in get_artworks() if a.id == other] == ["Reserved"]
+    with pytest.raises(ValidationError):
+        with GallerySession() as session:
+            delete_artwork(other, session=session)
+            raise ValidationError("отмена")
+    assert other in [a.id for a in get_artworks()]
+
+    # Кэш справочников сбрасывается только для таблиц, измененных в сессии
+    artists = get_artists()
+    with GallerySession() as session:
+        record_movement(other, "Зал 2", "Зал 3", "Экспозиция", "Смотритель", session=session)
+    hits = get_cache_stats()["hits"]
+    assert get_artists() == artists
+    assert get_cache_stats()["hits"] == hits + 1
+    with GallerySession() as session:
+        add_artist("Session Artist", "Bio", session=session)
+        session.add(Artist(name="Flushed Artist", biography="Bio"))
+    assert {"Session Artist", "Flushed Artist"} <= {a.name for a in get_artists()}
+
+
+def test_group_commit_writer(setup_db, sample_artwork, sample_exhibition, monkeypatch):
+    """Тест групповой фиксации: одна транзакция на порцию, ошибки - по вызовам."""
+    with GroupCommitWriter(max_delay=0.2) as writer:
+        moves = [writer.record_movement(sample_artwork, f"Зал {i}", f"Зал {i + 1}", "Экспозиция", "Смотритель")
+                 for i in range(3)]
+        missing = writer.record_movement(99999, "Зал 1", "Зал 2", "Экспозиция", "Смотритель")
+        visitor = writer.register_visitor("Visitor", "visitor@example.com", "+1234567890")
+        duplicate = writer.register_visitor("Other", "visitor@example.com", "+1234567890")
+        review = writer.add_visitor_review(sample_exhibition, "Отлично", "Visitor")
+    assert writer.stats() == {"calls": 7, "batches": 1, "fallbacks": 0}
+    assert [m.id for m in get_movements()] == [future.result() for future in moves]
+    with pytest.raises(ValidationError):
+        missing.result()
+    with pytest.raises(ValidationError):
+        duplicate.result()
+    assert [v.id for v in get_visitors()] == [visitor.result()]
+    assert [r.id for r in get_visitor_reviews()] == [review.result()]
+    with pytest.raises(ArtGalleryError):
+        writer.add_press_review(sample_exhibition, "Рецензия", "Газета")
+
+    # Если фиксация порции не удалась, вызовы повторяются каждый своей транзакцией
+    def failing_commit(session):
+        raise DatabaseError("disk I/O error")
+
+    monkeypatch.setattr(GallerySession, "commit", failing_commit)
+    with GroupCommitWriter(max_delay=0.2) as writer:
+        press = writer.add_press_review(sample_exhibition, "Рецензия", "Газета")
+        invalid = writer.add_press_review(sample_exhibition, "", "Газета")
+    assert writer.stats()["fallbacks"] == 1
+    assert [r.id for r in get_press_reviews()] == [press.result()]
+    with pytest.raises(ValidationError):
+        invalid.result()
+
+
+def test_rental_availability(setup_db, sample_artist, sample_artwork, sample_exhibition):
+    """Тест отказа в пересекающейся аренде и поиска свободных картин."""
+    other = acquire_artwork("Other", 2020, "Oil", "10x10", "Test", "Test", sample_artist, "Test", 100.0)
+    add_artwork_to_exhibition(sample_exhibition, sample_artwork)  # 2023-01-01 - 2023-02-01
+
+    with pytest.raises(ValidationError, match="выставка"):
+        rent_artwork(sample_artwork, "Renter", "2023-01-20", "2023-03-01")
+    rent_artwork(sample_artwork, "Renter", "2023-03-01", "2023-04-01")
+    with pytest.raises(ValidationError, match="аренда"):
+        rent_artwork(sample_artwork, "Renter", "2023-03-15", "2023-03-20")
+
+    assert get_available_artworks("2023-03-10", "2023-03-12") == [other]
+    assert get_available_artworks("2023-05-01", "2023-05-31", [sample_artwork, other, 999]) == [sample_artwork, other]
+    assert [c[0] for c in get_availability_conflicts(sample_artwork, "2023-01-01", "2023-12-31")] == \
+        ["exhibition", "rental"]
+
+    # Проданная картина занята бессрочно начиная с даты продажи
+    sell_artwork(other, "Buyer", 150.0)
+    assert get_available_artworks("2099-01-01", "2099-01-02", [other]) == []
+    assert get_availability_conflicts(other, "2099-01-01", "2099-01-02")[0][3] is None
+
+    with pytest.raises(ValidationError):
+        get_available_artworks("2023-03-12", "2023-03-10")
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_rental_quotes(setup_db, sample_artist, sample_artwork, monkeypatch, use_numpy):
+    """Тест пакетного расчета стоимости аренды с NumPy и без него."""
+    import services
+    if use_numpy and services.np is None:
+        pytest.skip("NumPy не установлен")
+    if not use_numpy:
+        monkeypatch.setattr(services, "np", None)
+    landscape = acquire_artwork("Landscape", 2020, "Oil", "10x10", "Test", "Landscape",
+                                sample_artist, "Test", 300.0)
+
+    # Расчет совпадает с платой, которую начисляет rent_artwork
+    rent_artwork(sample_artwork, "Renter", "2024-01-01", "2024-01-16")
+    conn = get_connection()
+    charged = conn.execute("SELECT rental_fee FROM Rental").fetchone()[0]
+    conn.close()
+    assert quote_rentals([sample_artwork], [("2024-01-01", "2024-01-16")]) == [charged] == [2.5]
+
+    periods = [("2024-01-01", "2024-01-31"), (date(2024, 1, 1), date(2024, 7, 1))]
+    assert quote_package([sample_artwork, landscape], periods) == [[5.0, 30.33], [15.0, 91.0]]
+
+    rates = RateTable(duration_discounts=[(90, 0.1), (180, 0.5)], genre_multipliers={"Landscape": 2})
+    assert quote_package([sample_artwork, landscape], periods, rates) == [[5.0, 15.17], [30.0, 91.0]]
+    assert quote_rentals([landscape, sample_artwork], periods, rates) == [30.0, 15.17]
+
+    with pytest.raises(ValidationError, match="не найдены: 999"):
+        quote_rentals([999], [periods[0]])
+    with pytest.raises(ValidationError, match="Период 2"):
+        quote_package([sample_artwork], [periods[0], ("2024-02-01", "2024-02-01")])
+    with pytest.raises(ValidationError):
+        quote_rentals([sample_artwork], periods)
+
+
+def test_financial_summaries(setup_db, sample_artist, sample_artwork):
+    """Тест инкрементного обновления финансовых сводок, проверки и перестройки."""
+    other = acquire_artwork("Other", 2020, "Oil", "10x10", "Test", "Test", sample_artist, "Test", 300.0)
+    month = date.today().isoformat()[:7]
+
+    rent_artwork(sample_artwork, "Renter", "2024-01-01", "2024-01-31")   # 5.0
+    rent_artwork(sample_artwork, "Renter", "2024-02-01", "2024-03-02")   # 5.0
+    rent_artwork(other, "Renter", "2024-01-10", "2024-02-09")            # 15.0
+    sell_artwork(other, "Buyer", 500.0)
+    restoration_id = record_restoration_state(sample_artwork, "Restorer", "Cracks", 40.0)
+    add_restoration_material(restoration_id, add_material("Varnish", 2.5), 4)
+
+    assert get_artist_revenue(sample_artist) == [
+        (sample_artist, "2024-01", 0, 0.0, 2, 20.0),
+        (sample_artist, "2024-02", 0, 0.0, 1, 5.0),
+        (sample_artist, month, 1, 500.0, 0, 0.0),
+    ]
+    assert get_artist_revenue(start_month="2024-02", end_month="2024-02") == [
+        (sample_artist, "2024-02", 0, 0.0, 1, 5.0)]
+    assert [row[0] for row in get_top_rental_income(1)] == [other]
+    assert get_restoration_costs(sample_artwork) == [(restoration_id, sample_artwork, 40.0, 10.0, 50.0)]
+    assert check_financial_summaries() == []
+
+    # Удаление картины вычитает ее операции из сводок
+    delete_artwork(other)
+    assert get_artist_revenue(sample_artist, end_month="2024-12") == [
+        (sample_artist, "2024-01", 0, 0.0, 1, 5.0),
+        (sample_artist, "2024-02", 0, 0.0, 1, 5.0),
+    ]
+    assert check_financial_summaries() == []
+
+    # Изменения в обход services обнаруживаются проверкой и исправляются перестройкой
+    conn = get_connection()
+    conn.execute("UPDATE Material SET unit_price = 3.0")
+    conn.close()
+    assert [m[0] for m in check_financial_summaries()] == ["Restoration_Cost"]
+    rebuild_financial_summaries()
+    assert check_financial_summaries() == []
+    assert get_restoration_costs()[0][3] == 12.0
+
+    with pytest.raises(ValidationError):
+        get_artist_revenue(start_month="2024-1")
+
+
+def test_export_rows(setup_db, sample_artwork, tmp_path):
+    """Тест потокового экспорта в CSV и сжатый JSON Lines."""
+    import csv
+    import gzip
+    import json
+    import threading
+    for i in range(7):
+        record_movement(sample_artwork, f"Зал {i}", f"Зал {i + 1}", "Экспозиция", "Смотритель")
+    sell_artwork(sample_artwork, "Buyer", 150.0)
+
+    progress = []
+    assert export_rows("Movement", str(tmp_path / "movements.csv"), batch_size=3,
+                       progress=lambda written, total: progress.append((written, total))) == 7
+    assert progress == [(3, 7), (6, 7), (7, 7)]
+    with open(tmp_path / "movements.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "artwork_id", "from_location", "to_location", "movement_date",
+                       "purpose", "responsible_person"]
+    assert [row[2] for row in rows[1:]] == [f"Зал {i}" for i in range(7)]
+
+    assert export_rows("sales", str(tmp_path / "sales.jsonl.gz")) == 1
+    with gzip.open(tmp_path / "sales.jsonl.gz", "rt", encoding="utf-8") as f:
+        sales = [json.loads(line) for line in f]
+    assert sales[0]["artwork_title"] == "Sample Artwork" and sales[0]["price"] == 150.0
+
+    # Отмена удаляет незаконченный файл
+    cancel = threading.Event()
+    assert export_rows("Movement", str(tmp_path / "cancelled.csv"), batch_size=2,
+                       progress=lambda written, total: cancel.set(), cancel=cancel) is None
+    assert not list(tmp_path.glob("cancelled*"))
+
+    with pytest.raises(ValidationError):
+        export_rows("Secret", str(tmp_path / "x.csv"))
+    with pytest.raises(ValidationError):
+        export_rows("Movement", str(tmp_path / "movements.xml"))